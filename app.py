@@ -20,7 +20,7 @@ ssm_stack = SSMStack(scope=app, construct_id="SSMStack")
 iam_role_stack = IamRoleStack(scope=app, construct_id="IamRoleStack")
 kms_stack = KmsStack(scope=app, construct_id="KmsStack", iam_role_arn=iam_role_stack.iam_role_arn)
 s3_stack = S3Stack(scope=app, construct_id="S3Stack", kms_key=kms_stack.kms_key, iam_role_arn=iam_role_stack.iam_role_arn)
-notification_lambda_stack = LambdaStack(scope=app, construct_id="NotificationLambdaStack", iam_role_arn=iam_role_stack.iam_role_arn, s3_bucket_arn=s3_stack.bucket_arn)
+notification_lambda_stack = LambdaStack(scope=app, construct_id="NotificationLambdaStack", iam_role_arn=iam_role_stack.iam_role_arn, s3_bucket_arn=s3_stack.bucket_arn, kms_key=kms_stack.kms_key)
 sns_stack = SnsStack(scope=app, construct_id="SnsStack")
 dynamo_stack = DynamoStack(scope=app, construct_id="DynamoStack", iam_role_arn=iam_role_stack.iam_role_arn)
 glue_stack = GlueStack(
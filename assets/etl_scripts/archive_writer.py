@@ -0,0 +1,194 @@
+import logging
+import math
+from datetime import datetime, timezone
+from botocore.exceptions import ClientError
+from pyspark.sql.functions import col, hash as murmur3_hash, lit, pmod
+
+logger = logging.getLogger()
+
+ARCHIVE_FORMATS = ('none', 'parquet')
+
+# Partition column added when the archive is partitioned by ingest date
+INGEST_DATE_COLUMN = "ingest_date"
+
+# batch_create_partition accepts at most 100 partitions per call
+MAX_PARTITIONS_PER_CALL = 100
+
+PARQUET_INPUT_FORMAT = "org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat"
+PARQUET_OUTPUT_FORMAT = "org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat"
+PARQUET_SERDE = "org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe"
+
+# Directory name Spark gives the partition of null values
+NULL_PARTITION_VALUE = "__HIVE_DEFAULT_PARTITION__"
+
+# Characters Spark escapes in partition directory names
+ESCAPED_PATH_CHARACTERS = set('"#%\'*/:=?\\\x7f{[]^') | {chr(code) for code in range(1, 32)}
+
+def archive_file_count(input_bytes, target_file_bytes):
+    """
+    Returns the most files written per partition value. The CSV input size
+    is an upper bound for the compressed Parquet size, so files stay at or
+    below the target instead of exploding into many small files.
+    """
+    return max(1, math.ceil(input_bytes / target_file_bytes))
+
+def write_parquet_archive(df, path, partition_column, file_count):
+    """
+    Appends df to the archive as Snappy-compressed Parquet, partitioned by
+    partition_column (the ingest date when it is INGEST_DATE_COLUMN).
+
+    The rows are shuffled by the partition column and a salt of file_count
+    values, so every task writes the rows of few partition values and each
+    value ends up in at most file_count files. A plain repartition would
+    spread every value over every task, file_count files per value.
+
+    Args:
+    - df: The typed, schema-projected DataFrame.
+    - path: S3 path of the archive table.
+    - partition_column: Column the archive is partitioned by.
+    - file_count: Most files written per partition value.
+
+    Returns:
+    - The DataFrame as written, including the partition column.
+    """
+    if partition_column == INGEST_DATE_COLUMN and INGEST_DATE_COLUMN not in df.columns:
+        # Taken once on the driver, so the write and the partition registration agree across midnight
+        df = df.withColumn(INGEST_DATE_COLUMN, lit(datetime.now(timezone.utc).date()))
+    if partition_column not in df.columns:
+        raise ValueError(f"Archive partition column '{partition_column}' is not in the data")
+
+    logger.info(f"[GLUE_ETL_JOB] Writing Parquet archive to {path} partitioned by {partition_column} in at most {file_count} files per partition")
+    if file_count > 1:
+        # Deterministic salt, a retried task writes the same rows
+        salt = pmod(murmur3_hash(*[col(f"`{name}`") for name in df.columns]), lit(file_count))
+        partitioned = df.repartition(file_count, col(partition_column), salt)
+    else:
+        partitioned = df.repartition(1, col(partition_column))
+    (
+        partitioned
+        .write
+        .mode("append")
+        .partitionBy(partition_column)
+        .option("compression", "snappy")
+        .parquet(path)
+    )
+    return df
+
+def _storage_descriptor(columns, location):
+    return {
+        'Columns': columns,
+        'Location': location,
+        'InputFormat': PARQUET_INPUT_FORMAT,
+        'OutputFormat': PARQUET_OUTPUT_FORMAT,
+        'SerdeInfo': {'SerializationLibrary': PARQUET_SERDE, 'Parameters': {'serialization.format': '1'}}
+    }
+
+def _get_table(glue_client, database_name, table_name):
+    try:
+        return glue_client.get_table(DatabaseName=database_name, Name=table_name)['Table']
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'EntityNotFoundException':
+            raise
+        return None
+
+def _table_layout(table):
+    descriptor = table.get('StorageDescriptor', {})
+    return (
+        [(column['Name'], column['Type']) for column in descriptor.get('Columns', [])],
+        [(key['Name'], key['Type']) for key in table.get('PartitionKeys', [])],
+        descriptor.get('Location'),
+    )
+
+def _ensure_table(glue_client, database_name, table_name, columns, partition_key, location):
+    """
+    Creates the archive table, or updates it when its columns, partition key
+    or location changed. An unchanged table is left alone, so runs do not
+    add table versions.
+    """
+    table_input = {
+        'Name': table_name,
+        'TableType': 'EXTERNAL_TABLE',
+        'Parameters': {'classification': 'parquet', 'EXTERNAL': 'TRUE'},
+        'PartitionKeys': [partition_key],
+        'StorageDescriptor': _storage_descriptor(columns, location)
+    }
+    existing = _get_table(glue_client, database_name, table_name)
+    if existing is None:
+        try:
+            glue_client.create_table(DatabaseName=database_name, TableInput=table_input)
+            logger.info(f"[GLUE_ETL_JOB] Created archive table {database_name}.{table_name}")
+            return
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'AlreadyExistsException':
+                raise
+            existing = _get_table(glue_client, database_name, table_name)
+    if existing is not None and _table_layout(existing) == _table_layout(table_input):
+        return
+    glue_client.update_table(DatabaseName=database_name, TableInput=table_input, SkipArchive=True)
+    logger.info(f"[GLUE_ETL_JOB] Updated archive table {database_name}.{table_name}")
+
+def _escape_path_name(value):
+    return "".join(f"%{ord(char):02X}" if char in ESCAPED_PATH_CHARACTERS else char for char in value)
+
+def partition_directory_value(value):
+    """
+    Returns the partition value as it appears in the directory name Spark
+    writes (col=<value>), escaped the way Spark escapes it.
+    """
+    if value is None:
+        return NULL_PARTITION_VALUE
+    if isinstance(value, bool):
+        value = str(value).lower()
+    return _escape_path_name(str(value))
+
+def written_partition_values(df, partition_column):
+    """
+    Returns the distinct partition values of the rows written, as they
+    appear in the directory names.
+    """
+    rows = df.select(partition_column).distinct().collect()
+    return sorted(partition_directory_value(row[0]) for row in rows)
+
+def register_archive_partitions(glue_client, database_name, table_name, df, partition_column, bucket, prefix):
+    """
+    Creates or updates the archive table in the Glue catalog and registers
+    the partitions this run wrote that are not registered yet. Partitions
+    written by earlier runs are not listed again.
+
+    Args:
+    - glue_client: boto3 Glue client.
+    - database_name: Glue catalog database (created by DatabaseStack).
+    - table_name: Name of the archive table.
+    - df: The DataFrame returned by write_parquet_archive.
+    - partition_column: Column the archive is partitioned by.
+    - bucket, prefix: Location of the archive table.
+    """
+    fields = {field.name: field.dataType.simpleString() for field in df.schema.fields}
+    columns = [{'Name': name, 'Type': col_type} for name, col_type in fields.items() if name != partition_column]
+    location = f"s3://{bucket}/{prefix}/"
+    _ensure_table(glue_client, database_name, table_name, columns,
+                  {'Name': partition_column, 'Type': fields[partition_column]}, location)
+
+    values = written_partition_values(df, partition_column)
+    created = 0
+    for start in range(0, len(values), MAX_PARTITIONS_PER_CALL):
+        chunk = values[start:start + MAX_PARTITIONS_PER_CALL]
+        response = glue_client.batch_create_partition(
+            DatabaseName=database_name,
+            TableName=table_name,
+            PartitionInputList=[
+                {
+                    'Values': [value],
+                    'StorageDescriptor': _storage_descriptor(columns, f"{location}{partition_column}={value}/")
+                }
+                for value in chunk
+            ]
+        )
+        errors = [
+            error for error in response.get('Errors', [])
+            if error['ErrorDetail']['ErrorCode'] != 'AlreadyExistsException'
+        ]
+        if errors:
+            raise Exception(f"Failed to register {len(errors)} archive partitions: {errors[:5]}")
+        created += len(chunk) - len(response.get('Errors', []))
+    logger.info(f"[GLUE_ETL_JOB] Registered {created} new partitions on archive table {database_name}.{table_name}")
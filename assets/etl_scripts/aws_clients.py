@@ -0,0 +1,81 @@
+import os
+import threading
+import boto3
+from botocore.config import Config
+
+# Shared boto3 clients of the job process. A client is built on first use and
+# reused by every later caller, including the thread pools of s3_transfer and
+# ledger, and the partition writers of an executor's Python worker.
+
+# Connections per client, at least the number of threads sharing it
+DEFAULT_MAX_POOL_CONNECTIONS = 10
+
+# Attempts per call in adaptive retry mode, which also rate limits the
+# client on throttling errors
+DEFAULT_MAX_ATTEMPTS = 10
+
+_clients = {}
+_lock = threading.Lock()
+
+def client_config(max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Returns the botocore Config of the shared clients.
+    """
+    options = {
+        'max_pool_connections': max_pool_connections,
+        'retries': {'mode': 'adaptive', 'max_attempts': max_attempts},
+        'connect_timeout': 5,
+        'read_timeout': 60,
+    }
+    try:
+        return Config(tcp_keepalive=True, **options)
+    except TypeError:  # botocore releases before tcp_keepalive (Glue 3.0 ships one)
+        return Config(**options)
+
+def endpoint_url(service_name):
+    """
+    Returns the endpoint of a service from AWS_ENDPOINT_URL_<SERVICE> or
+    AWS_ENDPOINT_URL, so tests and benchmarks can point the job at local
+    stand-ins. Read explicitly, as older boto3 releases ignore both.
+    """
+    service_variable = f"AWS_ENDPOINT_URL_{service_name.upper().replace('-', '_')}"
+    return os.environ.get(service_variable) or os.environ.get('AWS_ENDPOINT_URL')
+
+def get_client(service_name, max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS):
+    """
+    Returns the shared client of a service, building it on first use. A
+    later call asking for a larger connection pool replaces the client.
+    """
+    with _lock:
+        entry = _clients.get(service_name)
+        if entry is None or entry[1] < max_pool_connections:
+            client = boto3.client(
+                service_name,
+                endpoint_url=endpoint_url(service_name),
+                config=client_config(max_pool_connections)
+            )
+            entry = _clients[service_name] = (client, max_pool_connections)
+        return entry[0]
+
+def set_client(service_name, client):
+    """
+    Injects the client returned for a service, for tests.
+    """
+    with _lock:
+        _clients[service_name] = (client, float('inf'))
+
+def reset_clients():
+    with _lock:
+        _clients.clear()
+
+class LazyClient:
+    """
+    Stands in for the shared client of a service and builds it on the first
+    attribute access, so a job only creates the clients its run uses.
+    """
+    def __init__(self, service_name, max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS):
+        self.service_name = service_name
+        self.max_pool_connections = max_pool_connections
+
+    def __getattr__(self, name):
+        return getattr(get_client(self.service_name, self.max_pool_connections), name)
@@ -0,0 +1,162 @@
+import datetime
+import decimal
+import re
+
+# Cast and default rules shared by the Spark job (projection.py) and the
+# Python shell job (small_file_job.py). The Python casts follow Spark's
+# non-ANSI string-to-type casts, which the projection applies to string
+# columns, so both engines write identical items. With --read_mode=catalog
+# Spark parses typed columns while reading, which can differ on malformed
+# values only.
+
+# Value used for a catalog column when the data is missing or empty
+DEFAULT_VALUES = {
+    "string": "", "int": 0, "bigint": 0, "double": 0.0,
+    "float": 0.0, "boolean": False, "binary": bytearray(),
+    "timestamp": "1970-01-01 00:00:00"
+}
+
+INTEGER_RANGES = {
+    "tinyint": (-2 ** 7, 2 ** 7 - 1),
+    "smallint": (-2 ** 15, 2 ** 15 - 1),
+    "int": (-2 ** 31, 2 ** 31 - 1),
+    "integer": (-2 ** 31, 2 ** 31 - 1),
+    "bigint": (-2 ** 63, 2 ** 63 - 1),
+}
+
+TRUE_STRINGS = {"t", "true", "y", "yes", "1"}
+FALSE_STRINGS = {"f", "false", "n", "no", "0"}
+
+DECIMAL_PATTERN = re.compile(r"^decimal\((\d+),\s*(\d+)\)$")
+INTEGER_PATTERN = re.compile(r"^[+-]?\d+(\.\d*)?$")
+TIMESTAMP_PATTERN = re.compile(
+    r"^(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T](\d{1,2}):(\d{1,2})(?::(\d{1,2})(?:\.(\d{1,6}))?)?)?$"
+)
+
+def normalize_type(col_type):
+    return col_type.lower().strip()
+
+def default_for(col_type):
+    """
+    Returns the default of a catalog type, None when the type has none.
+    """
+    return DEFAULT_VALUES.get(normalize_type(col_type), None)
+
+def _cast_integer(value, col_type):
+    # Spark truncates the fraction of a decimal string cast to an integer type
+    if not INTEGER_PATTERN.match(value):
+        return None
+    number = int(value.split('.')[0])
+    low, high = INTEGER_RANGES[col_type]
+    return number if low <= number <= high else None
+
+def _cast_float(value):
+    if "_" in value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+def _cast_boolean(value):
+    lowered = value.lower()
+    if lowered in TRUE_STRINGS:
+        return True
+    if lowered in FALSE_STRINGS:
+        return False
+    return None
+
+def _cast_timestamp(value):
+    match = TIMESTAMP_PATTERN.match(value)
+    if not match:
+        return None
+    year, month, day, hour, minute, second, fraction = match.groups()
+    try:
+        parsed = datetime.datetime(
+            int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0),
+            int((fraction or "0").ljust(6, "0"))
+        )
+    except ValueError:
+        return None
+    # Same text as Spark's timestamp to string cast
+    text = parsed.strftime("%Y-%m-%d %H:%M:%S")
+    if parsed.microsecond:
+        text += f".{parsed.microsecond:06d}".rstrip("0")
+    return text
+
+def _cast_date(value):
+    match = TIMESTAMP_PATTERN.match(value)
+    if not match:
+        return None
+    try:
+        return datetime.date(int(match.group(1)), int(match.group(2)), int(match.group(3))).isoformat()
+    except ValueError:
+        return None
+
+def _cast_decimal(value, precision, scale):
+    try:
+        number = decimal.Decimal(value).quantize(decimal.Decimal(1).scaleb(-scale), rounding=decimal.ROUND_HALF_UP)
+    except decimal.InvalidOperation:
+        return None
+    # Values with more integer digits than the type allows become null
+    if number and number.adjusted() + 1 > precision - scale:
+        return None
+    return number
+
+def cast_value(value, col_type):
+    """
+    Casts a CSV string to the value of a catalog type, None when the string
+    does not parse (like a Spark cast).
+    """
+    col_type = normalize_type(col_type)
+    value = value.strip() if col_type != "string" else value
+    if col_type == "string":
+        return value
+    if col_type in INTEGER_RANGES:
+        return _cast_integer(value, col_type)
+    if col_type in ("double", "float"):
+        return _cast_float(value)
+    if col_type == "boolean":
+        return _cast_boolean(value)
+    if col_type == "timestamp":
+        return _cast_timestamp(value)
+    if col_type == "date":
+        return _cast_date(value)
+    if col_type == "binary":
+        return value.encode("utf-8")
+    match = DECIMAL_PATTERN.match(col_type)
+    if match:
+        return _cast_decimal(value, int(match.group(1)), int(match.group(2)))
+    return value
+
+def project_row(row, catalog_schema, source_columns):
+    """
+    Applies the catalog schema and defaults to one CSV row, with the same
+    result as projection.build_projection in Spark: columns found in the data
+    are cast (empty values replaced by the type default), data columns unknown
+    to the catalog pass through, catalog columns missing from the data get
+    their default and 'id' is a bigint.
+
+    Args:
+    - row: Mapping of column name to the raw CSV string.
+    - catalog_schema: Mapping of column name to catalog type.
+    - source_columns: Column names of the CSV header.
+
+    Returns:
+    - A dict of column name to typed value.
+    """
+    projected = {}
+    for col_name in source_columns:
+        value = row.get(col_name)
+        if col_name in catalog_schema:
+            col_type = catalog_schema[col_name]
+            projected[col_name] = default_for(col_type) if value is None or value == "" else cast_value(value, col_type)
+        else:
+            projected[col_name] = value
+    for col_name, col_type in catalog_schema.items():
+        if col_name not in projected:
+            projected[col_name] = default_for(col_type)
+    # 'id' is the DynamoDB partition key and is always written as a bigint
+    if projected.get('id') is not None and not isinstance(projected['id'], int):
+        projected['id'] = _cast_integer(str(projected['id']).strip(), "bigint")
+    return projected
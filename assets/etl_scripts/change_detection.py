@@ -0,0 +1,123 @@
+import logging
+from botocore.exceptions import ClientError
+from pyspark import StorageLevel
+from pyspark.sql.functions import coalesce, col, concat_ws, lit, xxhash64
+
+logger = logging.getLogger()
+
+LOAD_MODES = ('full', 'delta')
+
+HASH_COLUMN = "_row_hash"
+PREVIOUS_HASH_COLUMN = "_previous_hash"
+# Attribute written on tombstone items for rows missing from the new extract
+DELETED_COLUMN = "_deleted"
+
+# Separator and null marker used when concatenating the row for hashing
+_SEPARATOR = "\u0001"
+_NULL_MARKER = "\u0000"
+
+def add_row_hash(df, columns):
+    """
+    Adds a 64-bit content hash over the given columns. Columns are hashed in
+    name order and nulls are encoded explicitly, so the hash only changes when
+    a value does.
+    """
+    parts = [coalesce(col(col_name).cast("string"), lit(_NULL_MARKER)) for col_name in sorted(columns)]
+    return df.withColumn(HASH_COLUMN, xxhash64(concat_ws(_SEPARATOR, *parts)))
+
+def _index_root(prefix, table_name):
+    return f"{prefix}/_hash_index/{table_name}"
+
+def index_path_for(bucket, prefix, table_name, run_id):
+    """
+    Returns the S3 path the hash index of a run is written to, the run id is
+    the index version.
+    """
+    return f"s3://{bucket}/{_index_root(prefix, table_name)}/run={run_id}"
+
+def latest_index_path(s3_client, bucket, prefix, table_name):
+    """
+    Returns the S3 path of the hash index of the last successful load, or None
+    before the first delta load.
+    """
+    pointer_key = f"{_index_root(prefix, table_name)}/_LATEST"
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=pointer_key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return None
+        raise
+    return response['Body'].read().decode('utf-8').strip()
+
+def detect_changes(spark, df, columns, previous_index_path, emit_tombstones=False):
+    """
+    Keeps only the rows of df that are new or changed since the last load.
+
+    Args:
+    - spark: The SparkSession.
+    - df: The projected DataFrame, keyed on 'id'.
+    - columns: Catalog columns the content hash is computed over.
+    - previous_index_path: Path returned by latest_index_path.
+    - emit_tombstones: Also return a tombstone (id plus _deleted=true) for
+      every id of the previous load that is missing from df. Only meaningful
+      when every file is a full extract.
+
+    Returns:
+    - A tuple of the rows to write and the hashed DataFrame (persisted) that
+      the new index is built from.
+    """
+    hashed = add_row_hash(df, columns).persist(StorageLevel.MEMORY_AND_DISK)
+    if previous_index_path is None:
+        logger.info("[GLUE_ETL_JOB] No previous hash index, loading every row")
+        changes = hashed.drop(HASH_COLUMN)
+        if emit_tombstones:
+            changes = changes.withColumn(DELETED_COLUMN, lit(False))
+        return changes, hashed
+
+    logger.info(f"[GLUE_ETL_JOB] Comparing rows against hash index: {previous_index_path}")
+    previous = spark.read.parquet(previous_index_path)
+    changes = (
+        hashed
+        .join(previous.withColumnRenamed(HASH_COLUMN, PREVIOUS_HASH_COLUMN), on="id", how="left")
+        .filter(col(PREVIOUS_HASH_COLUMN).isNull() | (col(PREVIOUS_HASH_COLUMN) != col(HASH_COLUMN)))
+        .drop(PREVIOUS_HASH_COLUMN, HASH_COLUMN)
+    )
+    if emit_tombstones:
+        tombstones = (
+            previous.select("id")
+            .join(hashed.select("id"), on="id", how="left_anti")
+            .withColumn(DELETED_COLUMN, lit(True))
+        )
+        changes = changes.withColumn(DELETED_COLUMN, lit(False)).unionByName(tombstones, allowMissingColumns=True)
+    return changes, hashed
+
+def write_index(spark, s3_client, hashed, previous_index_path, index_path, bucket, prefix, table_name, snapshot):
+    """
+    Writes the hash index of this load as Parquet and points _LATEST at it.
+    Called only after the DynamoDB write succeeded.
+
+    Args:
+    - spark: The SparkSession.
+    - s3_client: boto3 S3 client.
+    - hashed: The hashed DataFrame returned by detect_changes.
+    - previous_index_path: The index the changes were computed against.
+    - index_path: Where to write the index, see index_path_for.
+    - bucket, prefix: Location of the archive (destination) folder.
+    - table_name: DynamoDB table the index belongs to.
+    - snapshot: True when the load was a full extract (ids missing from it
+      were tombstoned), False to carry the previous entries forward.
+    """
+    index = hashed.select("id", HASH_COLUMN)
+    if previous_index_path is not None and not snapshot:
+        carried = spark.read.parquet(previous_index_path).join(index.select("id"), on="id", how="left_anti")
+        index = index.unionByName(carried)
+
+    index.write.mode("overwrite").parquet(index_path)
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=f"{_index_root(prefix, table_name)}/_LATEST",
+        Body=index_path.encode('utf-8'),
+        ContentType='text/plain'
+    )
+    hashed.unpersist()
+    logger.info(f"[GLUE_ETL_JOB] Hash index written to {index_path}")
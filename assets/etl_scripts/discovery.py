@@ -0,0 +1,131 @@
+import logging
+import time
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+DISCOVERY_MODES = ('off', 'watermark')
+
+def _position(obj):
+    # Objects are discovered in (LastModified, key) order, the watermark is the last position processed
+    return (obj['last_modified_ms'], obj['key'])
+
+def read_watermark(dynamodb_client, state_table_name, job_name):
+    """
+    Returns the discovery watermark of a job as a dict with last_modified_ms
+    and key, None before the first discovery run.
+    """
+    response = dynamodb_client.get_item(
+        TableName=state_table_name,
+        Key={'job_name': {'S': job_name}},
+        ConsistentRead=True
+    )
+    item = response.get('Item')
+    if item is None:
+        return None
+    return {'last_modified_ms': int(item['last_modified_ms']['N']), 'key': item['key']['S']}
+
+def advance_watermark(dynamodb_client, state_table_name, job_name, previous, latest):
+    """
+    Moves the watermark of a job to the last object of a processed batch. The
+    update is conditional on the watermark read at the start of the run, so a
+    concurrent discovery run cannot move it backwards.
+
+    Returns:
+    - True when the watermark was moved, False when another run moved it first.
+    """
+    item = {
+        'job_name': {'S': job_name},
+        'last_modified_ms': {'N': str(latest['last_modified_ms'])},
+        'key': {'S': latest['key']}
+    }
+    if previous is None:
+        condition = {'ConditionExpression': 'attribute_not_exists(job_name)'}
+    else:
+        condition = {
+            'ConditionExpression': 'last_modified_ms = :last_modified_ms AND #key = :key',
+            'ExpressionAttributeNames': {'#key': 'key'},
+            'ExpressionAttributeValues': {
+                ':last_modified_ms': {'N': str(previous['last_modified_ms'])},
+                ':key': {'S': previous['key']}
+            }
+        }
+    try:
+        dynamodb_client.put_item(TableName=state_table_name, Item=item, **condition)
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            logger.warning(f"[GLUE_ETL_JOB] Watermark of {job_name} was moved by another run, keeping it")
+            return False
+        raise
+    logger.info(f"[GLUE_ETL_JOB] Advanced watermark of {job_name} to {latest['key']} ({latest['last_modified_ms']})")
+    return True
+
+def settled_position(listed, unsettled_keys):
+    """
+    Returns the object the watermark can move to after a run: the last listed
+    object before the first one that is still unsettled (held by another run
+    or failed in this one), so a later run lists that one again. None when
+    the first listed object is unsettled.
+
+    Args:
+    - listed: The result of list_pending_objects, oldest first.
+    - unsettled_keys: Keys of the listed objects that may stay in the source prefix.
+    """
+    latest = None
+    for obj in listed:
+        if obj['key'] in unsettled_keys:
+            break
+        latest = obj
+    return latest
+
+def list_pending_objects(s3_client, bucket, prefix, watermark, min_age_seconds, max_files, max_bytes, now=None):
+    """
+    Lists the objects directly under a source prefix that are past the
+    watermark and older than min_age_seconds, oldest first. The minimum age
+    leaves recent uploads to the trigger Lambda, so discovery only picks up
+    what that path has left behind. It also covers multipart uploads, whose
+    LastModified is the time the upload started.
+
+    Args:
+    - s3_client: boto3 S3 client.
+    - bucket, prefix: The source folder.
+    - watermark: The result of read_watermark.
+    - min_age_seconds: Objects modified more recently than this are skipped.
+    - max_files, max_bytes: Limits of one batch; the rest is left for the next run.
+    - now: Current time in epoch seconds, for tests.
+
+    Returns:
+    - A list of dicts with key, file_name, size and last_modified_ms, in the
+      same shape as job_inputs.resolve_input_files.
+    """
+    cutoff_ms = int(((now if now is not None else time.time()) - min_age_seconds) * 1000)
+    pending = []
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=f"{prefix}/"):
+        for entry in page.get('Contents', []):
+            file_name = entry['Key'][len(prefix) + 1:]
+            # Skip folder markers and objects in nested folders
+            if not file_name or '/' in file_name:
+                continue
+            obj = {
+                'key': entry['Key'],
+                'file_name': file_name,
+                'size': entry['Size'],
+                'last_modified_ms': int(entry['LastModified'].timestamp() * 1000)
+            }
+            if obj['last_modified_ms'] > cutoff_ms:
+                continue
+            if watermark is not None and _position(obj) <= _position(watermark):
+                continue
+            pending.append(obj)
+
+    pending.sort(key=_position)
+    batch = []
+    batch_bytes = 0
+    for obj in pending:
+        if batch and (len(batch) >= max_files or batch_bytes + obj['size'] > max_bytes):
+            break
+        batch.append(obj)
+        batch_bytes += obj['size']
+    logger.info(f"[GLUE_ETL_JOB] Discovered {len(pending)} pending objects, processing {len(batch)} ({batch_bytes} bytes)")
+    return batch
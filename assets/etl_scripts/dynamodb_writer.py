@@ -0,0 +1,164 @@
+import datetime
+import decimal
+import logging
+import random
+import time
+from aws_clients import get_client
+from boto3.dynamodb.types import TypeSerializer
+
+try:
+    from pyspark.accumulators import AccumulatorParam
+except ImportError:  # Python shell jobs write with write_partition and have no Spark
+    AccumulatorParam = object
+
+logger = logging.getLogger()
+
+WRITERS = ('connector', 'batch')
+
+# BatchWriteItem accepts at most 25 put requests per call
+MAX_BATCH_SIZE = 25
+
+_serializer = TypeSerializer()
+
+def connector_options(table_name, write_percent, parallel_tasks):
+    """
+    Returns the connection options of the Glue DynamoDB connector.
+
+    Args:
+    - table_name: Name of the DynamoDB table.
+    - write_percent: Share of the table write capacity the job may use
+      (dynamodb.throughput.write.percent, 0.1 to 1.5).
+    - parallel_tasks: Number of parallel write tasks, 0 lets Glue derive it
+      from the table capacity and the job workers.
+    """
+    options = {
+        "tableName": table_name,
+        "overwrite": "true",
+        "dynamodb.output.tableName": table_name,
+        "dynamodb.throughput.write.percent": str(write_percent)
+    }
+    if int(parallel_tasks) > 0:
+        options["dynamodb.output.numParallelTasks"] = str(parallel_tasks)
+    return options
+
+class ListAccumulatorParam(AccumulatorParam):
+    """
+    Collects the per-partition write statistics on the driver.
+    """
+    def zero(self, value):
+        return []
+
+    def addInPlace(self, stats, other):
+        stats.extend(other)
+        return stats
+
+def _attribute_value(value):
+    if isinstance(value, float):
+        return decimal.Decimal(str(value))
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, bytearray):
+        return bytes(value)
+    return value
+
+def serialize_row(row):
+    """
+    Converts a Row (as a dict) to a DynamoDB item, dropping null attributes.
+    """
+    return {
+        name: _serializer.serialize(_attribute_value(value))
+        for name, value in row.items()
+        if value is not None
+    }
+
+def _write_batch(dynamodb_client, table_name, requests, max_retries, base_delay):
+    """
+    Sends one BatchWriteItem request and retries the unprocessed items with
+    exponential backoff and full jitter.
+
+    Returns:
+    - The number of retries needed.
+    """
+    pending = {table_name: requests}
+    for attempt in range(max_retries + 1):
+        response = dynamodb_client.batch_write_item(RequestItems=pending)
+        pending = response.get('UnprocessedItems') or {}
+        if not pending:
+            return attempt
+        if attempt < max_retries:
+            time.sleep(random.uniform(0, base_delay * (2 ** attempt)))
+    raise Exception(f"{len(pending[table_name])} items still unprocessed after {max_retries} retries")
+
+def write_partition(rows, table_name, batch_size=MAX_BATCH_SIZE, max_retries=8, base_delay=0.05, stats=None):
+    """
+    Writes the rows of one partition with BatchWriteItem. Meant to run on the
+    executors through DataFrame.foreachPartition.
+
+    Args:
+    - rows: Iterator of Rows (or dicts).
+    - table_name: Name of the DynamoDB table.
+    - batch_size: Put requests per BatchWriteItem call (at most 25).
+    - max_retries: Retries of unprocessed items per call before failing.
+    - base_delay: First backoff delay in seconds, doubled on every retry.
+    - stats: Optional accumulator receiving the partition statistics.
+    """
+    batch_size = max(1, min(int(batch_size), MAX_BATCH_SIZE))
+    # Shared by the partitions a reused Python worker writes
+    dynamodb_client = get_client('dynamodb')
+    started = time.time()
+    items = 0
+    retries = 0
+    requests = []
+    keys = set()
+
+    for row in rows:
+        item = serialize_row(row if isinstance(row, dict) else row.asDict())
+        key = item.get('id', {}).get('N')
+        # A batch must not contain the same key twice
+        if len(requests) >= batch_size or key in keys:
+            retries += _write_batch(dynamodb_client, table_name, requests, max_retries, base_delay)
+            items += len(requests)
+            requests = []
+            keys = set()
+        requests.append({'PutRequest': {'Item': item}})
+        keys.add(key)
+
+    if requests:
+        retries += _write_batch(dynamodb_client, table_name, requests, max_retries, base_delay)
+        items += len(requests)
+
+    elapsed = time.time() - started
+    partition_stats = {
+        'items': items,
+        'retries': retries,
+        'seconds': round(elapsed, 3),
+        'items_per_second': round(items / elapsed, 1) if elapsed > 0 else float(items)
+    }
+    logger.info(f"[GLUE_ETL_JOB] Partition written to DynamoDB: {partition_stats}")
+    if stats is not None:
+        stats.add([partition_stats])
+    return partition_stats
+
+def write_with_batch_api(spark, df, table_name, batch_size=MAX_BATCH_SIZE, max_retries=8):
+    """
+    Writes df to DynamoDB with one BatchWriteItem writer per partition and
+    logs the items/sec of every partition.
+
+    Returns:
+    - The list of per-partition statistics.
+    """
+    stats = spark.sparkContext.accumulator([], ListAccumulatorParam())
+    df.foreachPartition(
+        lambda rows: write_partition(rows, table_name, batch_size=batch_size, max_retries=max_retries, stats=stats)
+    )
+    partition_stats = stats.value
+    total_items = sum(partition['items'] for partition in partition_stats)
+    rates = sorted(partition['items_per_second'] for partition in partition_stats if partition['items'])
+    if rates:
+        logger.info(
+            f"[GLUE_ETL_JOB] BatchWriteItem wrote {total_items} items in {len(partition_stats)} partitions, "
+            f"items/sec per partition min={rates[0]} median={rates[len(rates) // 2]} max={rates[-1]}"
+        )
+    return partition_stats
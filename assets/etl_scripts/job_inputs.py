@@ -0,0 +1,52 @@
+import json
+import logging
+from awsglue.utils import getResolvedOptions
+
+logger = logging.getLogger()
+
+def get_optional_args(argv, defaults):
+    """
+    Resolves job parameters that may be omitted from the job run.
+
+    Args:
+    - argv: The job arguments (sys.argv).
+    - defaults: Mapping of parameter name to the value used when it is not passed.
+
+    Returns:
+    - A dict with a value for every parameter in defaults.
+    """
+    present = [name for name in defaults if f"--{name}" in argv]
+    resolved = getResolvedOptions(argv, present) if present else {}
+    return {name: resolved.get(name, default) for name, default in defaults.items()}
+
+def resolve_input_files(s3_client, manifest_path, data_file_name):
+    """
+    Returns the files a run processes, as dicts with file_name, size (None
+    when unknown), ledger_id (None without a ledger entry) and parts (the
+    pre-split parts of the file under temp/, None when it is read whole):
+    every file listed in the batch manifest, or the single data_file_name.
+
+    Args:
+    - s3_client: boto3 S3 client.
+    - manifest_path: The --manifest_path argument (bucket/key) or None.
+    - data_file_name: The --data_file_name argument or None.
+    """
+    if manifest_path:
+        manifest_bucket, manifest_key = manifest_path.split('/', 1)
+        logger.info(f"[GLUE_ETL_JOB] Loading manifest: s3://{manifest_bucket}/{manifest_key}")
+        response = s3_client.get_object(Bucket=manifest_bucket, Key=manifest_key)
+        manifest = json.loads(response['Body'].read())
+        input_files = [
+            {
+                'file_name': entry['file_name'],
+                'size': entry.get('size'),
+                'ledger_id': entry.get('ledger_id'),
+                'parts': entry.get('parts'),
+            }
+            for entry in manifest['files']
+        ]
+        logger.info(f"[GLUE_ETL_JOB] Manifest lists {len(input_files)} files")
+        return input_files
+    if data_file_name:
+        return [{'file_name': data_file_name, 'size': None, 'ledger_id': None, 'parts': None}]
+    raise ValueError("Either --data_file_name or --manifest_path must be provided")
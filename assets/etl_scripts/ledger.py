@@ -0,0 +1,226 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+# Life cycle of a file in the ledger: the trigger Lambda claims it, a job run
+# takes it to processing and records the outcome
+LEDGER_STATUSES = ('claimed', 'processing', 'done', 'failed')
+
+DEFAULT_MAX_WORKERS = 16
+
+# A discovery run takes over a claim the Lambda took but never handed to a
+# job run after this many seconds. It is well above the claim ttl of the
+# Lambda, since a claimed file may still wait for a deferred SQS retry, a
+# pre-split run or a queued job run.
+DEFAULT_DISCOVERY_CLAIM_TTL_SECONDS = 6 * 3600
+
+# Glue names the run of a retry attempt <first run id>_attempt_<n>
+ATTEMPT_SEPARATOR = '_attempt_'
+
+def first_run_id(job_run_id):
+    """
+    Returns the run id of the first attempt of a job run, the same for all
+    of its Glue retry attempts.
+    """
+    return job_run_id.split(ATTEMPT_SEPARATOR, 1)[0]
+
+def attempt_number(job_run_id):
+    """
+    Returns the retry attempt of a job run, 0 for the first attempt.
+    """
+    _, _, attempt = job_run_id.partition(ATTEMPT_SEPARATOR)
+    return int(attempt) if attempt.isdigit() else 0
+
+def ledger_id(obj):
+    """
+    Returns the ledger key of an uploaded object. Version id and ETag make a
+    re-upload of the same key a new entry, while duplicate deliveries of one
+    upload share it.
+    """
+    return f"{obj['bucket']}/{obj['key']}#{obj.get('version_id', '')}#{obj.get('etag', '')}"
+
+def _update_status(dynamodb_client, table_name, file_id, status, job_name, job_run_id, from_statuses, expires_at=None,
+                   resume=False):
+    names = {'#status': 'status'}
+    values = {
+        ':status': {'S': status},
+        ':job_name': {'S': job_name},
+        ':job_run_id': {'S': job_run_id},
+        ':updated_at': {'N': str(int(time.time()))},
+    }
+    update = 'SET #status = :status, job_name = :job_name, job_run_id = :job_run_id, updated_at = :updated_at'
+    if expires_at is not None:
+        update += ', expires_at = :expires_at'
+        values[':expires_at'] = {'N': str(expires_at)}
+
+    conditions = []
+    for i, from_status in enumerate(from_statuses):
+        values[f':from_{i}'] = {'S': from_status}
+        conditions.append(f'#status = :from_{i}')
+    if resume:
+        # An earlier attempt of the same job run left the file in processing
+        values[':processing'] = {'S': 'processing'}
+        values[':first_run_id'] = {'S': first_run_id(job_run_id)}
+        conditions.append('(#status = :processing AND job_name = :job_name AND begins_with(job_run_id, :first_run_id))')
+    condition = f"({' OR '.join(conditions)})"
+    if status != 'processing':
+        # Only the run that took the file to processing records the outcome
+        condition += ' AND job_run_id = :job_run_id'
+
+    try:
+        dynamodb_client.update_item(
+            TableName=table_name,
+            Key={'file_id': {'S': file_id}},
+            UpdateExpression=update,
+            ConditionExpression=condition,
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+    return True
+
+def start_processing(dynamodb_client, table_name, input_files, job_name, job_run_id, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Moves the claimed ledger entries of a run's input files to processing.
+    Entries an earlier attempt of the same job run left in processing are
+    taken back, so a Glue retry resumes the files. Files another run already
+    took are dropped from the run; files without a ledger entry (direct
+    runs) are kept.
+
+    Args:
+    - dynamodb_client: boto3 DynamoDB client.
+    - table_name: Name of the ledger table.
+    - input_files: The result of job_inputs.resolve_input_files.
+    - job_name, job_run_id: The run recorded on the entries.
+
+    Returns:
+    - The input files this run owns.
+    """
+    def take(input_file):
+        if not input_file.get('ledger_id'):
+            return True
+        return _update_status(
+            dynamodb_client, table_name, input_file['ledger_id'], 'processing', job_name, job_run_id, ['claimed'],
+            resume=True
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        owned = list(executor.map(take, input_files))
+    skipped = [input_file['file_name'] for input_file, is_owned in zip(input_files, owned) if not is_owned]
+    if skipped:
+        logger.warning(f"[GLUE_ETL_JOB] Skipping {len(skipped)} files processed by another run: {skipped}")
+    return [input_file for input_file, is_owned in zip(input_files, owned) if is_owned]
+
+def claim_discovered(dynamodb_client, s3_client, table_name, bucket, input_files, job_name, job_run_id,
+                     claim_ttl_seconds=DEFAULT_DISCOVERY_CLAIM_TTL_SECONDS, max_workers=DEFAULT_MAX_WORKERS, now=None):
+    """
+    Takes the files a discovery run listed straight to processing with a
+    conditional put on the same ledger key the trigger Lambda claims (the
+    version id and ETag come from head_object). Files with an entry of
+    another run (claimed, processing or done) or already moved are dropped
+    from the run, a claim older than claim_ttl_seconds and the entries an
+    earlier attempt of the same job run left in processing are taken over.
+    The files another run holds (claimed or processing) are returned apart,
+    the watermark must not pass them while they may still fail.
+
+    Args:
+    - dynamodb_client: boto3 DynamoDB client.
+    - s3_client: boto3 S3 client.
+    - table_name: Name of the ledger table.
+    - bucket: The source bucket.
+    - input_files: The result of discovery.list_pending_objects.
+    - job_name, job_run_id: The run recorded on the entries.
+    - now: Current time in epoch seconds, for tests.
+
+    Returns:
+    - A tuple of (the input files this run owns with their ledger_id set,
+      the input files another run holds in claimed or processing).
+    """
+    now = int(now if now is not None else time.time())
+
+    def take(input_file):
+        try:
+            response = s3_client.head_object(Bucket=bucket, Key=input_file['key'])
+        except ClientError as e:
+            # Moved out of the source prefix by another run since the listing
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                return None, False
+            raise
+        file_id = ledger_id({
+            'bucket': bucket,
+            'key': input_file['key'],
+            'version_id': response.get('VersionId', ''),
+            'etag': response['ETag'].strip('"'),
+        })
+        try:
+            dynamodb_client.put_item(
+                TableName=table_name,
+                Item={
+                    'file_id': {'S': file_id},
+                    'bucket': {'S': bucket},
+                    'key': {'S': input_file['key']},
+                    'status': {'S': 'processing'},
+                    'job_name': {'S': job_name},
+                    'job_run_id': {'S': job_run_id},
+                    'updated_at': {'N': str(now)},
+                },
+                ConditionExpression=(
+                    'attribute_not_exists(file_id) OR (#status = :claimed AND updated_at < :stale_before) OR '
+                    '(#status = :processing AND job_name = :job_name AND begins_with(job_run_id, :first_run_id))'
+                ),
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues={
+                    ':claimed': {'S': 'claimed'},
+                    ':stale_before': {'N': str(now - claim_ttl_seconds)},
+                    ':processing': {'S': 'processing'},
+                    ':job_name': {'S': job_name},
+                    ':first_run_id': {'S': first_run_id(job_run_id)},
+                }
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+        else:
+            return dict(input_file, ledger_id=file_id), False
+        # Another run holds the file while its entry is claimed or processing, it may still fail
+        item = dynamodb_client.get_item(
+            TableName=table_name, Key={'file_id': {'S': file_id}}, ConsistentRead=True
+        ).get('Item')
+        return None, item is None or item['status']['S'] in ('claimed', 'processing')
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        taken = list(executor.map(take, input_files))
+    owned = [owned_file for owned_file, _ in taken if owned_file is not None]
+    held = [input_file for input_file, (_, is_held) in zip(input_files, taken) if is_held]
+    skipped = [input_file['file_name'] for input_file, (owned_file, _) in zip(input_files, taken) if owned_file is None]
+    if skipped:
+        logger.warning(f"[GLUE_ETL_JOB] Skipping {len(skipped)} discovered files owned by another run: {skipped}")
+    return owned, held
+
+def finish_processing(dynamodb_client, table_name, input_files, status, job_name, job_run_id,
+                      retention_days=30, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Records the outcome (done or failed) of the files a run took to
+    processing. Entries expire retention_days later through the table TTL.
+    """
+    if status not in ('done', 'failed'):
+        raise ValueError(f"Unknown final ledger status '{status}', expected 'done' or 'failed'")
+    expires_at = int(time.time()) + retention_days * 24 * 3600
+
+    def record(input_file):
+        if not input_file.get('ledger_id'):
+            return True
+        return _update_status(
+            dynamodb_client, table_name, input_file['ledger_id'], status, job_name, job_run_id,
+            ['processing'], expires_at=expires_at
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        recorded = list(executor.map(record, input_files))
+    logger.info(f"[GLUE_ETL_JOB] Marked {sum(recorded)} ledger entries as {status}")
@@ -0,0 +1,137 @@
+import functools
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+# Metrics are written as CloudWatch Embedded Metric Format (EMF) documents,
+# one JSON line per flush, so recording them costs no API call.
+
+MB = 1024 * 1024
+GB = 1024 * MB
+
+# Upper bounds of the FileSizeBucket dimension
+SIZE_BUCKETS = [
+    (MB, "lt_1MB"),
+    (100 * MB, "1MB_100MB"),
+    (GB, "100MB_1GB"),
+    (10 * GB, "1GB_10GB"),
+]
+
+def size_bucket(size_bytes):
+    """
+    Returns the FileSizeBucket dimension value of an input size.
+    """
+    for upper_bound, name in SIZE_BUCKETS:
+        if size_bytes < upper_bound:
+            return name
+    return "ge_10GB"
+
+class StdoutSink:
+    """
+    Writes EMF documents to stdout, where the job log picks them up.
+    """
+    def emit(self, document):
+        sys.stdout.write(json.dumps(document, default=str) + "\n")
+        sys.stdout.flush()
+
+class MemorySink:
+    """
+    Keeps EMF documents in memory, for tests.
+    """
+    def __init__(self):
+        self.documents = []
+
+    def emit(self, document):
+        self.documents.append(document)
+
+    def values(self, metric_name):
+        """
+        Returns every recorded value of a metric, across documents.
+        """
+        values = []
+        for document in self.documents:
+            if metric_name in document:
+                value = document[metric_name]
+                values.extend(value if isinstance(value, list) else [value])
+        return values
+
+class MetricsLogger:
+    """
+    Collects metrics of a run and emits them as one EMF document per flush.
+
+    Args:
+    - namespace: CloudWatch namespace of the metrics.
+    - dimensions: Mapping of dimension name to value, more can be set later.
+    - sink: Object with an emit(document) method, StdoutSink by default.
+    """
+    def __init__(self, namespace, dimensions=None, sink=None):
+        self.namespace = namespace
+        self.dimensions = dict(dimensions or {})
+        self.sink = sink if sink is not None else StdoutSink()
+        self.properties = {}
+        self._metrics = {}
+
+    def set_dimension(self, name, value):
+        self.dimensions[name] = str(value)
+
+    def set_property(self, name, value):
+        """
+        Adds a searchable field to the document that is not a metric.
+        """
+        self.properties[name] = value
+
+    def put_metric(self, name, value, unit="Count"):
+        unit_values = self._metrics.setdefault(name, (unit, []))
+        unit_values[1].append(value)
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Records the duration of the with block in milliseconds, also when
+        the block raises.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.put_metric(name, round((time.perf_counter() - started) * 1000, 3), "Milliseconds")
+
+    def timed(self, name):
+        """
+        Decorator form of timer.
+        """
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def flush(self):
+        """
+        Emits the metrics recorded since the last flush as one EMF document.
+        Dimensions and properties are kept for the next flush.
+        """
+        if not self._metrics:
+            return None
+        dimension_names = sorted(self.dimensions)
+        document = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": self.namespace,
+                    # The full dimension set, plus a roll-up per job
+                    "Dimensions": [dimension_names] + ([["JobName"]] if "JobName" in self.dimensions and len(dimension_names) > 1 else []),
+                    "Metrics": [{"Name": name, "Unit": unit} for name, (unit, _) in self._metrics.items()],
+                }],
+            },
+        }
+        document.update(self.properties)
+        document.update(self.dimensions)
+        for name, (_, values) in self._metrics.items():
+            document[name] = values[0] if len(values) == 1 else values
+        self._metrics = {}
+        self.sink.emit(document)
+        return document
@@ -0,0 +1,159 @@
+import logging
+import zlib
+
+logger = logging.getLogger()
+
+MB = 1024 * 1024
+
+# Compressed bytes requested from S3 per read
+READ_CHUNK_BYTES = 1 * MB
+
+# Decompressed bytes handled at a time, which also bounds how far a part
+# overshoots its size
+DECOMPRESSED_CHUNK_BYTES = 8 * MB
+
+# Compressed bytes buffered before a multipart part is uploaded (S3 minimum is 5 MB)
+UPLOAD_PART_BYTES = 16 * MB
+
+class _PartWriter:
+    """
+    Gzip-compresses one output part on the fly and uploads it as a multipart
+    upload, holding at most one upload part in memory.
+    """
+    def __init__(self, s3_client, bucket, key, compress_level):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.bytes = 0
+        self._compressor = zlib.compressobj(compress_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self._buffer = bytearray()
+        self._parts = []
+        self._upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=key)['UploadId']
+
+    def write(self, data):
+        self.bytes += len(data)
+        self._buffer += self._compressor.compress(data)
+        if len(self._buffer) >= UPLOAD_PART_BYTES:
+            self._upload()
+
+    def _upload(self):
+        part_number = len(self._parts) + 1
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+            PartNumber=part_number, Body=bytes(self._buffer)
+        )
+        self._parts.append({'PartNumber': part_number, 'ETag': response['ETag']})
+        self._buffer = bytearray()
+
+    def close(self):
+        self._buffer += self._compressor.flush()
+        self._upload()
+        self.s3_client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+            MultipartUpload={'Parts': self._parts}
+        )
+
+    def abort(self):
+        self.s3_client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+
+def decompressed_chunks(body):
+    """
+    Yields the decompressed content of a gzip stream in chunks of at most
+    DECOMPRESSED_CHUNK_BYTES, including every member of a multi-member file.
+    """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    while True:
+        compressed = body.read(READ_CHUNK_BYTES)
+        if not compressed:
+            break
+        while compressed:
+            data = decompressor.decompress(compressed, DECOMPRESSED_CHUNK_BYTES)
+            if data:
+                yield data
+            if decompressor.eof:
+                # The next gzip member starts in the remaining input
+                compressed = decompressor.unused_data
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            else:
+                compressed = decompressor.unconsumed_tail
+    data = decompressor.flush()
+    if data:
+        yield data
+
+def split_gzip_csv(s3_client, bucket, key, destination_bucket, destination_prefix, part_bytes, compress_level=1):
+    """
+    Splits a gzip CSV object into gzip parts of about part_bytes of
+    uncompressed data, each starting with the header line, so the parts can
+    be read by parallel tasks. The object is streamed: memory stays within a
+    read chunk, the pending line and one upload part.
+
+    Parts only end where a record ends: after a newline with an even number
+    of quote characters before it, so quoted fields with line breaks stay
+    whole.
+
+    Args:
+    - s3_client: boto3 S3 client.
+    - bucket, key: The gzip CSV object.
+    - destination_bucket, destination_prefix: Where the parts are written.
+    - part_bytes: Uncompressed bytes per part.
+    - compress_level: zlib level of the parts, low as they are read once.
+
+    Returns:
+    - A list of dicts with the key and uncompressed bytes of every part.
+    """
+    body = s3_client.get_object(Bucket=bucket, Key=key)['Body']
+    parts = []
+    header = None
+    pending = b""
+    quotes = 0
+    writer = None
+
+    def start_part():
+        part_key = f"{destination_prefix}/part-{len(parts):05d}.csv.gz"
+        part_writer = _PartWriter(s3_client, destination_bucket, part_key, compress_level)
+        part_writer.write(header)
+        return part_writer
+
+    def finish_part(part_writer):
+        part_writer.close()
+        parts.append({'key': part_writer.key, 'bytes': part_writer.bytes})
+
+    try:
+        for data in decompressed_chunks(body):
+            pending += data
+            if header is None:
+                end = pending.find(b"\n")
+                if end < 0:
+                    continue
+                header, pending = pending[:end + 1], pending[end + 1:]
+            # Write complete lines only, the tail waits for the next chunk
+            end = pending.rfind(b"\n")
+            if end < 0:
+                continue
+            block, pending = pending[:end + 1], pending[end + 1:]
+            if writer is None:
+                writer = start_part()
+            writer.write(block)
+            quotes += block.count(b'"')
+            if writer.bytes >= part_bytes and quotes % 2 == 0:
+                finish_part(writer)
+                writer = None
+                quotes = 0
+        if header is None:
+            # A file without a newline is only a header
+            header, pending = pending.rstrip(b"\n") + b"\n", b""
+        if pending:
+            if writer is None:
+                writer = start_part()
+            writer.write(pending if pending.endswith(b"\n") else pending + b"\n")
+        if writer is None and not parts:
+            writer = start_part()
+        if writer is not None:
+            finish_part(writer)
+            writer = None
+    except Exception:
+        if writer is not None:
+            writer.abort()
+        raise
+    logger.info(f"[GLUE_ETL_JOB] Split s3://{bucket}/{key} into {len(parts)} parts of {sum(part['bytes'] for part in parts)} bytes")
+    return parts
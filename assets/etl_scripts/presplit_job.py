@@ -0,0 +1,136 @@
+import sys
+import json
+import logging
+import math
+import time
+import uuid
+from awsglue.utils import getResolvedOptions
+from botocore.exceptions import ClientError
+from aws_clients import get_client
+from job_inputs import get_optional_args, resolve_input_files
+from presplit import split_gzip_csv
+from s3_transfer import DEFAULT_MAX_WORKERS as TRANSFER_MAX_WORKERS, delete_objects, move_objects
+
+# Python shell job that splits large gzip CSV files, which Spark reads in a
+# single task, into parts under temp/ and starts the Spark job on the parts.
+# The Spark job moves the original files as usual.
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+formatter = logging.Formatter('[GLUE_ETL_JOB] %(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+MB = 1024 * 1024
+
+def write_manifest(s3_client, temp_bucket, temp_prefix, input_files):
+    """
+    Writes the manifest of the Spark job run, in the format of the trigger
+    Lambda's manifests plus the parts of every file.
+    """
+    manifest_key = f"{temp_prefix}/manifests/{time.strftime('%Y/%m/%d')}/{uuid.uuid4()}.json"
+    manifest = {'created_at': int(time.time()), 'files': input_files}
+    s3_client.put_object(
+        Bucket=temp_bucket,
+        Key=manifest_key,
+        Body=json.dumps(manifest).encode('utf-8'),
+        ContentType='application/json'
+    )
+    return f"{temp_bucket}/{manifest_key}"
+
+def start_spark_run(glue_client, args, manifest_path, input_bytes):
+    """
+    Starts the Spark job on the parts, sized like the trigger Lambda sizes
+    its runs, retrying while the job is at its concurrency limit.
+    """
+    workers = max(int(args['min_workers']), min(
+        int(args['max_workers']), math.ceil(input_bytes / (int(args['bytes_per_worker_mb']) * MB))
+    ))
+    attempts = int(args['start_max_attempts'])
+    for attempt in range(attempts):
+        try:
+            return glue_client.start_job_run(
+                JobName=args['next_job_name'],
+                Arguments={'--manifest_path': manifest_path},
+                WorkerType=args['worker_type'],
+                NumberOfWorkers=workers,
+                # The parts of a split file hold far more data than the runs of the upload batches
+                Timeout=int(args['run_timeout_minutes'])
+            )['JobRunId']
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConcurrentRunsExceededException' or attempt == attempts - 1:
+                raise
+            delay = min(300, 15 * 2 ** attempt)
+            logger.info(f"[GLUE_ETL_JOB] {args['next_job_name']} at its concurrency limit, retrying in {delay}s")
+            time.sleep(delay)
+
+def process_files(args, s3_client, glue_client):
+    source_bucket, source_prefix = args['source_prefix'].split('/', 1)
+    failed_bucket, failed_prefix = args['failed_prefix'].split('/', 1)
+    temp_bucket, temp_prefix = args['temp_prefix'].split('/', 1)
+    job_run_id = args['JOB_RUN_ID'] or f"local-{int(time.time())}"
+    part_bytes = int(args['part_mb']) * MB
+
+    input_files = resolve_input_files(s3_client, args['manifest_path'], args['data_file_name'])
+    data_file_names = [input_file['file_name'] for input_file in input_files]
+    split_files = []
+    try:
+        for i, input_file in enumerate(input_files):
+            parts = split_gzip_csv(
+                s3_client, source_bucket, f"{source_prefix}/{input_file['file_name']}",
+                temp_bucket, f"{temp_prefix}/presplit/{args['job_name']}/{job_run_id}/{i:05d}",
+                part_bytes
+            )
+            split_files.append({**input_file, 'parts': parts})
+        manifest_path = write_manifest(s3_client, temp_bucket, temp_prefix, split_files)
+        input_bytes = sum(part['bytes'] for split_file in split_files for part in split_file['parts'])
+        spark_run_id = start_spark_run(glue_client, args, manifest_path, input_bytes)
+        logger.info(f"[GLUE_ETL_JOB] Started {args['next_job_name']} run {spark_run_id} on {input_bytes} bytes: s3://{manifest_path}")
+    except Exception as e:
+        logger.error(f"[GLUE_ETL_JOB] Error splitting files {data_file_names}: {str(e)}")
+        part_keys = [part['key'] for split_file in split_files for part in split_file['parts']]
+        if part_keys:
+            delete_objects(s3_client, temp_bucket, part_keys)
+        logger.info(f"[GLUE_ETL_JOB] Moving files to failed folder: s3://{failed_bucket}/{failed_prefix}/")
+        move_objects(s3_client, [
+            (source_bucket, f"{source_prefix}/{file_name}", failed_bucket, f"{failed_prefix}/{file_name}")
+            for file_name in data_file_names
+        ])
+        raise
+
+def handler():
+    logger.info("[GLUE_ETL_JOB] Starting pre-split job")
+    args = getResolvedOptions(sys.argv, [
+        'job_name',
+        'next_job_name',
+        'source_prefix',
+        'failed_prefix',
+        'temp_prefix'
+    ])
+    args.update(get_optional_args(sys.argv, {
+        'data_file_name': None,
+        'manifest_path': None,
+        'part_mb': '512',
+        'worker_type': 'G.1X',
+        'bytes_per_worker_mb': '2048',
+        'min_workers': '2',
+        'max_workers': '10',
+        'start_max_attempts': '6',
+        'run_timeout_minutes': '120',
+        'JOB_RUN_ID': None
+    }))
+    logger.info(f"[GLUE_ETL_JOB] Retrieved job parameters: {args}")
+    try:
+        process_files(args, get_client('s3', TRANSFER_MAX_WORKERS), get_client('glue'))
+        logger.info("[GLUE_ETL_JOB] Pre-split job completed successfully")
+    except ClientError as e:
+        logger.error(f"[GLUE_ETL_JOB] Pre-split job failed: {e.response['Error']['Code']} - {e.response['Error']['Message']}")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"[GLUE_ETL_JOB] Pre-split job failed: {e}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    handler()
@@ -0,0 +1,132 @@
+import logging
+import math
+from pyspark.sql import Window
+from pyspark.sql.functions import (
+    coalesce, col, count, countDistinct, create_map, hash as murmur3_hash, input_file_name, lit,
+    monotonically_increasing_id, pmod, row_number
+)
+
+logger = logging.getLogger()
+
+# Position of a row in the batch, added after the read and dropped before the write
+SOURCE_FILE_COLUMN = "_source_file"
+SOURCE_ROW_COLUMN = "_source_row"
+POSITION_COLUMNS = (SOURCE_FILE_COLUMN, SOURCE_ROW_COLUMN)
+
+DEDUP_MODES = ('off', 'last_wins')
+
+# 'source' keeps the partitions of the read, 'id_hash' repartitions by id for the write
+WRITE_PARTITIONINGS = ('source', 'id_hash')
+
+# Number of id hash buckets of the key distribution. Write partition counts
+# are powers of two up to this, so every partition is a union of buckets.
+HASH_BUCKETS = 4096
+
+# Items per second a single write task sustains (one BatchWriteItem writer,
+# or one connector task)
+PARTITION_WRITE_RATE = 1000
+
+def input_file_uri(spark, path):
+    """
+    Returns the path as input_file_name() reports it: the URI of the
+    qualified Hadoop path, with spaces, '%' and other characters a key may
+    hold encoded.
+    """
+    hadoop_path = spark._jvm.org.apache.hadoop.fs.Path(path)
+    file_system = hadoop_path.getFileSystem(spark._jsc.hadoopConfiguration())
+    return file_system.makeQualified(hadoop_path).toUri().toString()
+
+def add_source_position(df, paths):
+    """
+    Records the position of every row in the batch: the index of its file in
+    paths and its read order within the file. Must be applied to the frame
+    read from S3, before anything shuffles or caches it.
+    """
+    spark = df.sql_ctx.sparkSession
+    file_index = create_map(*[
+        item for i, path in enumerate(paths) for item in (lit(input_file_uri(spark, path)), lit(i))
+    ])
+    return (
+        df.withColumn(SOURCE_FILE_COLUMN, coalesce(file_index[input_file_name()], lit(-1)))
+          .withColumn(SOURCE_ROW_COLUMN, monotonically_increasing_id())
+    )
+
+def id_bucket(key='id'):
+    # Same Murmur3 hash as the repartition by key, so buckets map onto write partitions
+    return pmod(murmur3_hash(col(key)), lit(HASH_BUCKETS))
+
+def key_distribution(df, key='id'):
+    """
+    Counts rows and distinct keys per id hash bucket in one aggregation.
+
+    Returns:
+    - A dict of bucket to (rows, distinct keys).
+    """
+    counts = df.groupBy(id_bucket(key).alias("bucket")).agg(
+        count("*").alias("rows"),
+        countDistinct(col(key)).alias("keys")
+    ).collect()
+    return {row["bucket"]: (row["rows"], row["keys"]) for row in counts}
+
+def write_partition_count(rows, target_items_per_second, rows_per_partition):
+    """
+    Returns the number of write partitions: enough tasks to reach the target
+    write throughput and partitions of at most rows_per_partition rows,
+    capped at the row count. Rounded up to a power of two.
+    """
+    wanted = max(
+        math.ceil(target_items_per_second / PARTITION_WRITE_RATE),
+        math.ceil(rows / rows_per_partition)
+    )
+    wanted = max(1, min(wanted, rows, HASH_BUCKETS))
+    return min(HASH_BUCKETS, 1 << (wanted - 1).bit_length())
+
+def partition_skew(distribution, partition_count):
+    """
+    Summarizes the rows per write partition after deduplication.
+
+    Args:
+    - distribution: The result of key_distribution.
+    - partition_count: A power of two up to HASH_BUCKETS.
+
+    Returns:
+    - A dict with the partition count, rows, duplicate rows, min, median and
+      max rows per partition and the max to mean ratio.
+    """
+    partition_rows = [0] * partition_count
+    rows = 0
+    for bucket, (bucket_rows, bucket_keys) in distribution.items():
+        partition_rows[bucket % partition_count] += bucket_keys
+        rows += bucket_rows
+    written = sum(partition_rows)
+    partition_rows.sort()
+    mean = written / partition_count
+    return {
+        'partitions': partition_count,
+        'rows': written,
+        'duplicate_rows': rows - written,
+        'min_rows': partition_rows[0],
+        'median_rows': partition_rows[partition_count // 2],
+        'max_rows': partition_rows[-1],
+        'skew': round(partition_rows[-1] / mean, 3) if mean else 0.0,
+    }
+
+def prepare_for_write(df, partition_count=None, dedup=True, version_column=None, key='id'):
+    """
+    Repartitions df by a hash of the key into partition_count partitions
+    (when given) and, with dedup, keeps the last row
+    of every key: the highest version_column value when one is configured,
+    then the latest position in the batch. The deduplication window is
+    partitioned by the key as well, so it runs without a second shuffle.
+    The position columns are dropped.
+    """
+    if partition_count:
+        df = df.repartition(partition_count, col(key))
+    if dedup:
+        order = [col(version_column).desc_nulls_last()] if version_column else []
+        order += [col(c).desc() for c in POSITION_COLUMNS if c in df.columns]
+        # Without a version or position any row of a key may win
+        order = order or [lit(0)]
+        latest_first = Window.partitionBy(col(key)).orderBy(*order)
+        df = df.withColumn("_rank", row_number().over(latest_first)).filter(col("_rank") == 1).drop("_rank")
+    return df.drop(*[c for c in POSITION_COLUMNS if c in df.columns])
@@ -0,0 +1,137 @@
+import json
+import logging
+import time
+from pyspark.sql import DataFrame
+from pyspark.sql.column import _to_seq
+from pyspark.sql.functions import col, count, lit, max as max_, min as min_, rand, when
+from pyspark.sql.types import ArrayType, BinaryType, MapType, StructType
+
+logger = logging.getLogger()
+
+PROFILE_LEVELS = ('off', 'sample')
+
+# Share of the rows profiled at 'sample'
+DEFAULT_SAMPLE_FRACTION = 0.01
+
+# Name of the observed metrics and the column flagging the sampled rows
+PROFILE_METRICS_NAME = "profile"
+SAMPLED_COLUMN = "_profile_sampled"
+
+def _orderable(data_type):
+    # min/max are not defined on binary and nested columns
+    return not isinstance(data_type, (BinaryType, ArrayType, MapType, StructType))
+
+def observe_profile(df, profile_level, fraction=DEFAULT_SAMPLE_FRACTION, seed=42):
+    """
+    Folds the profile of a sample of df (row count, null counts and min/max
+    per column) into the pass that writes df, with Dataset.observe. The
+    aggregation runs in the JVM on the rows as they stream to the writer,
+    so it adds no action and no scan.
+
+    Spark 3.1 (Glue 3.0) has no Python observe API and only reports observed
+    metrics on the query execution that ran them, while the DynamicFrame and
+    foreachPartition writers convert the frame to an RDD through a query
+    execution of their own. The returned frame therefore wraps the RDD of the
+    observed query execution, whose metrics collect_profile reads after the
+    write.
+
+    Args:
+    - df: The DataFrame about to be written.
+    - profile_level: One of PROFILE_LEVELS.
+    - fraction: Share of the rows sampled.
+    - seed: Seed of the sample.
+
+    Returns:
+    - A tuple of the DataFrame to write instead of df and the observation to
+      pass to collect_profile (None at 'off').
+    """
+    if profile_level not in PROFILE_LEVELS:
+        raise ValueError(f"Unknown profile level '{profile_level}', expected one of {PROFILE_LEVELS}")
+    if profile_level == 'off':
+        return df, None
+
+    sampled = col(SAMPLED_COLUMN)
+    aggregates = [count(when(sampled, lit(1))).alias("rows")]
+    for i, field in enumerate(df.schema.fields):
+        value = col(f"`{field.name}`")
+        aggregates.append(count(when(sampled & value.isNull(), lit(1))).alias(f"nulls_{i}"))
+        if _orderable(field.dataType):
+            aggregates.append(min_(when(sampled, value)).alias(f"min_{i}"))
+            aggregates.append(max_(when(sampled, value)).alias(f"max_{i}"))
+
+    sc = df.sql_ctx._sc
+    flagged = df.withColumn(SAMPLED_COLUMN, rand(seed) < fraction)
+    observed = DataFrame(
+        flagged._jdf.observe(PROFILE_METRICS_NAME, aggregates[0]._jc, _to_seq(sc, [a._jc for a in aggregates[1:]])),
+        df.sql_ctx
+    ).drop(SAMPLED_COLUMN)
+    query_execution = observed._jdf.queryExecution()
+    written = DataFrame(
+        df.sql_ctx.sparkSession._jsparkSession.internalCreateDataFrame(
+            query_execution.toRdd(), observed._jdf.schema(), False
+        ),
+        df.sql_ctx
+    )
+    return written, (query_execution, df.schema.fields, fraction)
+
+def collect_profile(observation):
+    """
+    Reads the profile observed while the frame returned by observe_profile
+    was written.
+
+    Returns:
+    - A dict with the sampled rows, the fraction and the per column nulls,
+      min and max, None at 'off' or when the frame was not written (every
+      chunk of a resumable load written before). Task retries may inflate
+      the counts.
+    """
+    if observation is None:
+        return None
+    query_execution, fields, fraction = observation
+    metrics = query_execution.observedMetrics().get(PROFILE_METRICS_NAME)
+    if metrics.isEmpty():
+        return None
+    result = json.loads(metrics.get().json())
+    return {
+        "rows": result["rows"],
+        "fraction": fraction,
+        "nulls": {field.name: result[f"nulls_{i}"] for i, field in enumerate(fields)},
+        "min": {field.name: result.get(f"min_{i}") for i, field in enumerate(fields) if _orderable(field.dataType)},
+        "max": {field.name: result.get(f"max_{i}") for i, field in enumerate(fields) if _orderable(field.dataType)},
+    }
+
+def build_metrics_record(profile, **context):
+    """
+    Builds the JSON metrics record of a run from the sample profile.
+
+    Args:
+    - profile: The dict returned by collect_profile.
+    - context: Run attributes (job name, run id, table, files, ...) stored
+      alongside the profile.
+    """
+    record = dict(context)
+    record["recorded_at"] = int(time.time())
+    record["sampled_rows"] = profile["rows"]
+    record["sample_fraction"] = profile["fraction"]
+    record["estimated_rows"] = round(profile["rows"] / profile["fraction"]) if profile["fraction"] else None
+    record["columns"] = {
+        col_name: {
+            "nulls": nulls,
+            "min": profile["min"].get(col_name),
+            "max": profile["max"].get(col_name),
+        }
+        for col_name, nulls in profile["nulls"].items()
+    }
+    return record
+
+def write_metrics_record(s3_client, bucket, key, record):
+    """
+    Writes the metrics record to S3 as a single JSON document.
+    """
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=json.dumps(record, default=str).encode('utf-8'),
+        ContentType='application/json'
+    )
+    logger.info(f"[GLUE_ETL_JOB] Wrote metrics record to s3://{bucket}/{key}")
@@ -0,0 +1,115 @@
+import logging
+from pyspark.sql.functions import col, concat_ws, when, lit
+from casting import DEFAULT_VALUES
+from validation_rules import REJECT_REASON_COLUMN
+
+# Column the CSV reader fills with the raw line of a malformed record
+CORRUPT_RECORD_COLUMN = "_corrupt_record"
+
+logger = logging.getLogger()
+
+# Compiled projections, keyed on catalog schema, defaults and source columns
+_projection_cache = {}
+
+def _column_expression(col_name, col_type, default_values, present):
+    default_value = default_values.get(col_type.lower(), None)
+    if present:
+        expression = (
+            when(col(col_name).isNull() | (col(col_name) == ""), default_value)
+            .otherwise(col(col_name).cast(col_type))
+        )
+    else:
+        expression = lit(default_value).cast(col_type)
+    # 'id' is the DynamoDB partition key and is always written as a bigint
+    if col_name == 'id':
+        expression = expression.cast('bigint')
+    return expression.alias(col_name)
+
+def _reject_reason(catalog_schema, source_columns, source_types):
+    # One check per rule, concat_ws drops the rules that passed
+    checks = []
+    if CORRUPT_RECORD_COLUMN in source_columns:
+        checks.append(when(col(CORRUPT_RECORD_COLUMN).isNotNull(), lit("malformed_record")))
+    if 'id' not in source_columns:
+        checks.append(lit("missing_id"))
+    elif source_types.get('id', 'string') == 'string':
+        checks.append(when(col('id').isNull() | (col('id') == ""), lit("missing_id")))
+    else:
+        checks.append(when(col('id').isNull(), lit("missing_id")))
+    for col_name in source_columns:
+        if col_name in catalog_schema or col_name == 'id':
+            target_type = 'bigint' if col_name == 'id' else catalog_schema[col_name]
+            # A value that is present but does not cast (bad number, out of range, ...). Columns the
+            # reader already typed hold null for values that did not parse, reported as malformed_record,
+            # and a narrowing cast wraps instead of returning null, so those must survive the round trip.
+            source_type = source_types.get(col_name, 'string')
+            cast_column = col(col_name).cast(target_type)
+            if source_type == 'string':
+                invalid = (col(col_name) != "") & cast_column.isNull()
+            else:
+                invalid = cast_column.isNull() | (cast_column.cast(source_type) != col(col_name))
+            checks.append(when(col(col_name).isNotNull() & invalid, lit(f"invalid_{col_name}")))
+    reason = concat_ws(",", *checks)
+    return when(reason == "", lit(None)).otherwise(reason).alias(REJECT_REASON_COLUMN)
+
+def build_projection(catalog_schema, default_values, source_columns, validate=False, source_types=None):
+    """
+    Compiles the catalog schema and default values into the column list of a
+    single select. Columns found in the data are cast (empty values replaced by
+    the type default) in place, data columns unknown to the catalog pass
+    through and catalog columns missing from the data are appended with their
+    default. The result is cached, so runs over the same schema reuse it.
+    With validate, a REJECT_REASON_COLUMN evaluated on the raw values in the
+    same select records why a row cannot be written.
+
+    Args:
+    - catalog_schema: Mapping of column name to catalog type.
+    - default_values: Mapping of catalog type to default value.
+    - source_columns: Column names of the DataFrame read from S3.
+    - validate: Add the reject reason column.
+    - source_types: Mapping of source column to Spark type, all strings by
+      default; other types were set by the reader (catalog read mode).
+
+    Returns:
+    - A list of Column expressions for DataFrame.select.
+    """
+    cache_key = (
+        tuple(catalog_schema.items()),
+        repr(sorted(default_values.items())),
+        tuple(source_columns),
+        validate,
+        tuple(sorted(source_types.items())) if source_types is not None else None
+    )
+    projection = _projection_cache.get(cache_key)
+    if projection is not None:
+        return projection
+
+    projection = []
+    for col_name in source_columns:
+        if col_name in catalog_schema:
+            projection.append(_column_expression(col_name, catalog_schema[col_name], default_values, True))
+        elif col_name == 'id':
+            projection.append(col(col_name).cast('bigint').alias(col_name))
+        else:
+            projection.append(col(col_name))
+    for col_name, col_type in catalog_schema.items():
+        if col_name not in source_columns:
+            projection.append(_column_expression(col_name, col_type, default_values, False))
+    if validate:
+        projection.append(_reject_reason(catalog_schema, source_columns, source_types or {}))
+
+    _projection_cache[cache_key] = projection
+    logger.info(f"[GLUE_ETL_JOB] Compiled projection with {len(projection)} columns")
+    return projection
+
+def apply_projection(df, catalog_schema, default_values=DEFAULT_VALUES, validate=False):
+    """
+    Applies the catalog schema and defaults to df in one select step.
+
+    Args:
+    - df: The DataFrame read from S3.
+    - catalog_schema: Mapping of column name to catalog type.
+    - default_values: Mapping of catalog type to default value.
+    - validate: Add the reject reason column, see build_projection.
+    """
+    return df.select(*build_projection(catalog_schema, default_values, df.columns, validate, dict(df.dtypes)))
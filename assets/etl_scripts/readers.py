@@ -0,0 +1,313 @@
+import csv
+import io
+import logging
+import re
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pyspark.sql.types import (
+    StructType, StructField, StringType, IntegerType, LongType, DoubleType, FloatType,
+    BooleanType, TimestampType, DateType, ShortType, ByteType, DecimalType
+)
+
+logger = logging.getLogger()
+
+# Spark types for the Glue catalog column types the CSV reader can parse directly.
+# binary and nested types are read as strings and cast by the projection.
+CATALOG_TYPE_MAP = {
+    "string": StringType(),
+    "int": IntegerType(),
+    "integer": IntegerType(),
+    "bigint": LongType(),
+    "smallint": ShortType(),
+    "tinyint": ByteType(),
+    "double": DoubleType(),
+    "float": FloatType(),
+    "boolean": BooleanType(),
+    "timestamp": TimestampType(),
+    "date": DateType(),
+}
+
+DECIMAL_PATTERN = re.compile(r"^decimal\((\d+),\s*(\d+)\)$")
+
+# Bytes fetched to find the header line of a CSV file
+HEADER_RANGE_BYTES = 64 * 1024
+
+# Header lines fetched at the same time when a batch is grouped by header
+HEADER_READ_WORKERS = 16
+
+INPUT_FORMATS = ('auto', 'csv', 'json', 'parquet')
+
+# Extensions of the compression codecs Spark decompresses on read
+COMPRESSION_EXTENSIONS = {'.gz': 'gzip', '.zst': 'zstd', '.bz2': 'bzip2'}
+
+FORMAT_EXTENSIONS = {
+    '.csv': 'csv',
+    '.txt': 'csv',
+    '.json': 'json',
+    '.jsonl': 'json',
+    '.ndjson': 'json',
+    '.parquet': 'parquet',
+}
+
+# Leading bytes of compressed and columnar files
+MAGIC_BYTES = [
+    (b"\x1f\x8b", ('csv', 'gzip')),
+    (b"\x28\xb5\x2f\xfd", ('csv', 'zstd')),
+    (b"BZh", ('csv', 'bzip2')),
+    (b"PAR1", ('parquet', None)),
+]
+
+# Bytes fetched to sniff the format of a file without a known extension
+SNIFF_RANGE_BYTES = 1024
+
+def catalog_spark_type(col_type):
+    """
+    Returns the Spark type used to read a column of the given catalog type.
+    """
+    col_type = col_type.lower().strip()
+    if col_type in CATALOG_TYPE_MAP:
+        return CATALOG_TYPE_MAP[col_type]
+    match = DECIMAL_PATTERN.match(col_type)
+    if match:
+        return DecimalType(int(match.group(1)), int(match.group(2)))
+    return StringType()
+
+def catalog_struct_type(catalog_schema, columns, corrupt_record_column=None):
+    """
+    Builds the read schema for a CSV file from the catalog column types.
+
+    Args:
+    - catalog_schema: Mapping of column name to catalog type.
+    - columns: Column names in the order of the file header. Columns unknown
+      to the catalog are read as strings.
+    - corrupt_record_column: Optional extra string field that receives the
+      raw line of records that do not parse with the schema.
+
+    Returns:
+    - A StructType with one nullable field per column.
+    """
+    fields = [
+        StructField(col_name, catalog_spark_type(catalog_schema[col_name]) if col_name in catalog_schema else StringType(), True)
+        for col_name in columns
+    ]
+    if corrupt_record_column:
+        fields.append(StructField(corrupt_record_column, StringType(), True))
+    return StructType(fields)
+
+def detect_format(file_name, head=None):
+    """
+    Returns the (format, compression) of an input file from its extension
+    (data.csv.gz is gzip CSV), or from its first bytes when the extension is
+    unknown. Text that starts with '{' is JSON lines, anything else CSV.
+
+    Args:
+    - file_name: The object key or file name.
+    - head: Optional first bytes of the file, used without a known extension.
+    """
+    name = file_name.lower()
+    compression = None
+    for extension, codec in COMPRESSION_EXTENSIONS.items():
+        if name.endswith(extension):
+            compression = codec
+            name = name[:-len(extension)]
+    for extension, file_format in FORMAT_EXTENSIONS.items():
+        if name.endswith(extension):
+            return file_format, compression
+    if compression:
+        return 'csv', compression
+    if head:
+        for magic, detected in MAGIC_BYTES:
+            if head.startswith(magic):
+                return detected
+        if head.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"{"):
+            return 'json', None
+    return 'csv', None
+
+def detect_input_formats(s3_client, locations, input_format='auto'):
+    """
+    Returns the (format, compression) of every object of a batch, fetching
+    the first bytes only of objects without a known extension. A configured
+    input_format other than 'auto' applies to every object.
+
+    Args:
+    - s3_client: boto3 S3 client.
+    - locations: (bucket, key) tuples of the objects.
+    - input_format: One of INPUT_FORMATS.
+
+    Returns:
+    - A dict of (bucket, key) to (format, compression).
+    """
+    if input_format not in INPUT_FORMATS:
+        raise ValueError(f"Unknown input format '{input_format}', expected one of {INPUT_FORMATS}")
+    formats = {}
+    for bucket, key in locations:
+        detected = detect_format(key)
+        if input_format != 'auto':
+            detected = (input_format, detected[1])
+        elif detected == ('csv', None) and not key.lower().endswith(('.csv', '.txt')):
+            head = s3_client.get_object(
+                Bucket=bucket, Key=key, Range=f"bytes=0-{SNIFF_RANGE_BYTES - 1}"
+            )['Body'].read()
+            detected = detect_format(key, head)
+            if detected[1] is not None:
+                # Spark picks the codec from the extension, a compressed file without one reads as garbage
+                raise ValueError(f"{key} is {detected[1]} compressed but has no {detected[1]} extension")
+        formats[(bucket, key)] = detected
+    return formats
+
+def read_csv_header(s3_client, bucket, key, compression=None):
+    """
+    Returns the column names from the header line of a CSV object, fetching
+    only the first bytes of the object. Gzip objects are decompressed as far
+    as the fetched bytes go.
+
+    Returns:
+    - The column names, or None when the header of a compressed object
+      cannot be read this way (zstd, bzip2).
+    """
+    if compression not in (None, 'gzip'):
+        return None
+    response = s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes=0-{HEADER_RANGE_BYTES - 1}")
+    head = response['Body'].read()
+    if compression == 'gzip':
+        head = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(head)
+    head = head.decode('utf-8-sig', errors='replace')
+    header_line = head.splitlines()[0] if head else ""
+    return next(csv.reader(io.StringIO(header_line)), [])
+
+def csv_header_groups(spark, s3_client, files):
+    """
+    Groups CSV files by their header line, so every group is read with the
+    schema of its own columns. Files of one batch can have different
+    columns or column orders; one schema for all would fail the header
+    check of the files that differ.
+
+    Args:
+    - spark: The SparkSession, reads the headers read_csv_header cannot.
+    - s3_client: boto3 S3 client.
+    - files: ((bucket, key), compression) tuples of the CSV objects.
+
+    Returns:
+    - A list of (header columns, S3 paths), in the order of first appearance.
+    """
+    def header_of(entry):
+        (bucket, key), compression = entry
+        header = read_csv_header(s3_client, bucket, key, compression)
+        if header is None:
+            header = read_csv_columns(spark, f"s3://{bucket}/{key}")
+        return tuple(header)
+
+    with ThreadPoolExecutor(max_workers=HEADER_READ_WORKERS) as executor:
+        headers = list(executor.map(header_of, files))
+    groups = {}
+    for ((bucket, key), _), header in zip(files, headers):
+        groups.setdefault(header, []).append(f"s3://{bucket}/{key}")
+    return [(list(header), paths) for header, paths in groups.items()]
+
+def read_csv_with_schema(spark, paths, schema, corrupt_record_column=None):
+    """
+    Reads CSV files with an explicit schema, skipping schema inference. The
+    header of every file is validated against the schema field names.
+
+    Args:
+    - spark: The SparkSession.
+    - paths: S3 paths of the files.
+    - schema: The StructType returned by catalog_struct_type.
+    - corrupt_record_column: The corrupt record field of schema, if any.
+    """
+    logger.info(f"[GLUE_ETL_JOB] Reading {len(paths)} CSV files with explicit schema: {schema.simpleString()}")
+    reader = (
+        spark.read
+        .schema(schema)
+        .option("header", "true")
+        .option("enforceSchema", "false")
+        .option("mode", "PERMISSIVE")
+    )
+    if corrupt_record_column:
+        reader = reader.option("columnNameOfCorruptRecord", corrupt_record_column)
+    return reader.csv(paths)
+
+def read_csv_columns(spark, path):
+    """
+    Returns the header columns of a CSV file through Spark, which reads its
+    first line only. Used for codecs read_csv_header cannot decompress.
+    """
+    return spark.read.option("header", "true").option("inferSchema", "false").csv(path).columns
+
+def read_json_with_schema(spark, paths, schema, corrupt_record_column=None):
+    """
+    Reads JSON lines files with an explicit schema. Fields not in schema are
+    ignored, lines that do not parse go to corrupt_record_column.
+    """
+    logger.info(f"[GLUE_ETL_JOB] Reading {len(paths)} JSON lines files with explicit schema: {schema.simpleString()}")
+    reader = spark.read.schema(schema).option("mode", "PERMISSIVE")
+    if corrupt_record_column:
+        reader = reader.option("columnNameOfCorruptRecord", corrupt_record_column)
+    return reader.json(paths)
+
+def read_parquet(spark, paths):
+    """
+    Reads Parquet files with their own schema, the projection casts the
+    columns to the catalog types.
+    """
+    logger.info(f"[GLUE_ETL_JOB] Reading {len(paths)} Parquet files")
+    return spark.read.parquet(*paths)
+
+def read_input_files(spark, s3_client, locations, formats, catalog_schema, corrupt_record_column=None):
+    """
+    Reads the files of a batch with the reader of their format: CSV and JSON
+    lines with the catalog types, Parquet directly. Files of different
+    formats, and CSV files with different headers, are read separately and
+    unioned by column name.
+
+    Args:
+    - spark: The SparkSession.
+    - s3_client: boto3 S3 client, for the CSV headers.
+    - locations: (bucket, key) tuples of the objects.
+    - formats: The result of detect_input_formats.
+    - catalog_schema: Mapping of column name to catalog type.
+    - corrupt_record_column: Optional column receiving unparseable records.
+    """
+    by_format = {}
+    for location in locations:
+        file_format, compression = formats[location]
+        by_format.setdefault(file_format, []).append((location, compression))
+
+    frames = []
+    for file_format, files in by_format.items():
+        paths = [f"s3://{bucket}/{key}" for (bucket, key), _ in files]
+        if file_format == 'parquet':
+            frames.append(read_parquet(spark, paths))
+        elif file_format == 'json':
+            schema = catalog_struct_type(catalog_schema, list(catalog_schema), corrupt_record_column)
+            frames.append(read_json_with_schema(spark, paths, schema, corrupt_record_column))
+        else:
+            for header, group_paths in csv_header_groups(spark, s3_client, files):
+                schema = catalog_struct_type(catalog_schema, header, corrupt_record_column)
+                frames.append(read_csv_with_schema(spark, group_paths, schema, corrupt_record_column))
+    df = frames[0]
+    for frame in frames[1:]:
+        df = df.unionByName(frame, allowMissingColumns=True)
+    return df
+
+def file_partition_conf(target_partition_bytes, open_cost_bytes):
+    """
+    Returns the Spark settings that pack many small files into read
+    partitions of about target_partition_bytes, so the task count follows
+    the input size rather than the file count. Every file counts as
+    open_cost_bytes more than its size.
+    """
+    return {
+        "spark.sql.files.maxPartitionBytes": str(target_partition_bytes),
+        "spark.sql.files.openCostInBytes": str(open_cost_bytes),
+    }
+
+def group_files_options(file_count, input_bytes, group_size_bytes):
+    """
+    Returns the Glue connection options that group small files into tasks of
+    group_size_bytes when a DynamicFrame reads them, none when the files are
+    few or already large.
+    """
+    if file_count < 2 or input_bytes / file_count >= group_size_bytes:
+        return {}
+    return {"groupFiles": "inPartition", "groupSize": str(group_size_bytes)}
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import logging
+import math
+import time
+from botocore.exceptions import ClientError
+from pyspark.sql.functions import col, pmod, xxhash64
+from s3_transfer import delete_objects
+
+logger = logging.getLogger()
+
+CHUNK_COLUMN = "_chunk"
+
+def load_key(input_files):
+    """
+    Identifies a load by its input files, so a retry attempt over the same
+    files finds the progress of the failed attempt. The ledger id (version
+    id and ETag) of each file is part of the key, so a re-upload under the
+    same name and size does not reuse that progress.
+    """
+    files = sorted(
+        f"{input_file['file_name']}:{input_file['size']}:{input_file.get('ledger_id') or ''}"
+        for input_file in input_files
+    )
+    return hashlib.sha1("\n".join(files).encode('utf-8')).hexdigest()
+
+def chunk_count_for(input_bytes, chunk_bytes):
+    """
+    Returns the number of chunks of a load, one per chunk_bytes of input.
+    """
+    return max(1, math.ceil(input_bytes / chunk_bytes))
+
+def add_chunk_column(df, chunk_count):
+    """
+    Assigns every row to a chunk by a hash range of its id. The assignment
+    only depends on the id, so it is the same in every attempt.
+    """
+    return df.withColumn(CHUNK_COLUMN, pmod(xxhash64(col('id')), chunk_count))
+
+def load_progress(s3_client, bucket, prefix, chunk_count):
+    """
+    Reads the progress of a load from its folder under temp/, or starts it.
+    The chunk count of the first attempt is kept, so later attempts split
+    the rows the same way.
+
+    Returns:
+    - A dict with chunk_count and the set of completed chunks.
+    """
+    plan_key = f"{prefix}/plan.json"
+    try:
+        plan = json.loads(s3_client.get_object(Bucket=bucket, Key=plan_key)['Body'].read())
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('NoSuchKey', '404'):
+            raise
+        plan = {'chunk_count': chunk_count, 'created_at': int(time.time())}
+        s3_client.put_object(Bucket=bucket, Key=plan_key, Body=json.dumps(plan).encode('utf-8'))
+
+    done = set()
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=f"{prefix}/done/"):
+        for entry in page.get('Contents', []):
+            done.add(int(entry['Key'].rsplit('/', 1)[-1]))
+    if done:
+        logger.info(f"[GLUE_ETL_JOB] Resuming load: {len(done)} of {plan['chunk_count']} chunks already written")
+    return {'chunk_count': plan['chunk_count'], 'done': done}
+
+def mark_chunk_done(s3_client, bucket, prefix, chunk):
+    s3_client.put_object(Bucket=bucket, Key=f"{prefix}/done/{chunk}", Body=b"")
+
+def clear_progress(s3_client, bucket, prefix):
+    """
+    Deletes the progress folder of a load once its files have been moved.
+    """
+    keys = []
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=f"{prefix}/"):
+        keys.extend(entry['Key'] for entry in page.get('Contents', []))
+    if keys:
+        delete_objects(s3_client, bucket, keys)
+
+def write_in_chunks(df, progress, write_chunk, on_chunk_done):
+    """
+    Writes the chunks of a load that are not done yet, one at a time.
+
+    Args:
+    - df: The rows to write; persisted by the caller, as every chunk filters it.
+    - progress: The result of load_progress.
+    - write_chunk: Function of (chunk DataFrame, chunk number) that writes it.
+    - on_chunk_done: Function of the chunk number, called once it is written.
+    """
+    chunk_count = progress['chunk_count']
+    chunked = add_chunk_column(df, chunk_count)
+    for chunk in range(chunk_count):
+        if chunk in progress['done']:
+            continue
+        started = time.time()
+        write_chunk(chunked.filter(col(CHUNK_COLUMN) == chunk).drop(CHUNK_COLUMN), chunk)
+        on_chunk_done(chunk)
+        logger.info(f"[GLUE_ETL_JOB] Chunk {chunk + 1}/{chunk_count} written in {time.time() - started:.1f}s")
@@ -0,0 +1,185 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+MB = 1024 * 1024
+
+# S3 limits for copies and bulk deletes
+MAX_SINGLE_COPY_BYTES = 5 * 1024 * MB
+MIN_PART_BYTES = 5 * MB
+MAX_PARTS = 10000
+MAX_DELETE_KEYS = 1000
+
+DEFAULT_PART_SIZE = 128 * MB
+DEFAULT_MULTIPART_THRESHOLD = 256 * MB
+DEFAULT_MAX_WORKERS = 16
+
+def _part_ranges(size, part_size):
+    part_size = max(part_size, MIN_PART_BYTES)
+    # Grow the part size when the object would need more parts than S3 allows
+    while size > part_size * MAX_PARTS:
+        part_size *= 2
+    return [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+
+def head_source(s3_client, bucket, key):
+    """
+    Returns the size, content type and user metadata of an object, which a
+    single copy carries over on its own but a multipart copy has to set.
+    """
+    response = s3_client.head_object(Bucket=bucket, Key=key)
+    return {
+        'size': response['ContentLength'],
+        'content_type': response.get('ContentType'),
+        'metadata': response.get('Metadata', {}),
+    }
+
+def _create_multipart_copy(s3_client, destination_bucket, destination_key, source):
+    options = {'Metadata': source['metadata']}
+    if source['content_type']:
+        options['ContentType'] = source['content_type']
+    return s3_client.create_multipart_upload(Bucket=destination_bucket, Key=destination_key, **options)['UploadId']
+
+def _copy_part(s3_client, source_bucket, source_key, destination_bucket, destination_key, upload_id,
+               part_number, first_byte, last_byte):
+    response = s3_client.upload_part_copy(
+        Bucket=destination_bucket,
+        Key=destination_key,
+        UploadId=upload_id,
+        PartNumber=part_number,
+        CopySource={'Bucket': source_bucket, 'Key': source_key},
+        CopySourceRange=f"bytes={first_byte}-{last_byte}"
+    )
+    return {'PartNumber': part_number, 'ETag': response['CopyPartResult']['ETag']}
+
+def _single_copy(s3_client, source_bucket, source_key, destination_bucket, destination_key):
+    s3_client.copy_object(
+        Bucket=destination_bucket,
+        CopySource={'Bucket': source_bucket, 'Key': source_key},
+        Key=destination_key
+    )
+
+def delete_objects(s3_client, bucket, keys):
+    """
+    Deletes keys from a bucket with delete_objects, up to 1,000 keys per call.
+    Raises if S3 reports an error for any key.
+    """
+    errors = []
+    for start in range(0, len(keys), MAX_DELETE_KEYS):
+        chunk = keys[start:start + MAX_DELETE_KEYS]
+        response = s3_client.delete_objects(
+            Bucket=bucket,
+            Delete={'Objects': [{'Key': key} for key in chunk], 'Quiet': True}
+        )
+        errors.extend(response.get('Errors', []))
+    if errors:
+        raise Exception(f"Failed to delete {len(errors)} objects from {bucket}: {errors[:5]}")
+
+def _error_message(e):
+    if isinstance(e, ClientError):
+        return f"{e.response['Error']['Code']} - {e.response['Error']['Message']}"
+    return str(e)
+
+def move_objects(s3_client, moves, part_size=DEFAULT_PART_SIZE, multipart_threshold=DEFAULT_MULTIPART_THRESHOLD,
+                 max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Moves a batch of objects: copies them concurrently, then bulk deletes the
+    sources that were copied. A source is only deleted once its copy exists.
+
+    Every request runs on one pool of max_workers threads: the heads, the
+    single copies and the parts of the multipart copies, so a batch never
+    has more than max_workers requests in flight.
+
+    Args:
+    - s3_client: boto3 S3 client.
+    - moves: List of (source_bucket, source_key, destination_bucket, destination_key) tuples.
+    - part_size: Part size for multipart copies in bytes.
+    - multipart_threshold: Objects larger than this are copied in parts.
+    - max_workers: Number of requests in flight at the same time.
+
+    Returns:
+    - Total number of bytes moved.
+    """
+    copied = []
+    failures = []
+    total_bytes = 0
+
+    def fail(move, e):
+        logger.error(f"[GLUE_ETL_JOB] Failed to copy s3://{move[0]}/{move[1]}: {_error_message(e)}")
+        failures.append(move[1])
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Sizes and metadata first, so large objects are split into parts on the same pool
+        head_futures = {
+            executor.submit(head_source, s3_client, move[0], move[1]): move for move in moves
+        }
+        copy_futures = {}
+        uploads = {}
+        for future in as_completed(head_futures):
+            move = head_futures[future]
+            source_bucket, source_key, destination_bucket, destination_key = move
+            try:
+                source = future.result()
+                if source['size'] > min(multipart_threshold, MAX_SINGLE_COPY_BYTES):
+                    ranges = _part_ranges(source['size'], part_size)
+                    upload_id = _create_multipart_copy(s3_client, destination_bucket, destination_key, source)
+                    uploads[move] = {'upload_id': upload_id, 'size': source['size'], 'remaining': len(ranges),
+                                     'parts': [], 'failed': False}
+                    for part_number, (first_byte, last_byte) in enumerate(ranges, start=1):
+                        copy_futures[executor.submit(
+                            _copy_part, s3_client, source_bucket, source_key, destination_bucket, destination_key,
+                            upload_id, part_number, first_byte, last_byte
+                        )] = move
+                else:
+                    copy_futures[executor.submit(
+                        _single_copy, s3_client, source_bucket, source_key, destination_bucket, destination_key
+                    )] = move
+                    uploads[move] = {'size': source['size']}
+            except Exception as e:
+                fail(move, e)
+
+        for future in as_completed(copy_futures):
+            move = copy_futures[future]
+            upload = uploads[move]
+            if 'upload_id' not in upload:
+                try:
+                    future.result()
+                    total_bytes += upload['size']
+                    copied.append((move[0], move[1]))
+                except Exception as e:
+                    fail(move, e)
+                continue
+            if upload['failed']:
+                continue
+            try:
+                upload['parts'].append(future.result())
+                upload['remaining'] -= 1
+                if upload['remaining'] == 0:
+                    s3_client.complete_multipart_upload(
+                        Bucket=move[2],
+                        Key=move[3],
+                        UploadId=upload['upload_id'],
+                        MultipartUpload={'Parts': sorted(upload['parts'], key=lambda part: part['PartNumber'])}
+                    )
+                    logger.info(f"[GLUE_ETL_JOB] Multipart copied {upload['size']} bytes to s3://{move[2]}/{move[3]}")
+                    total_bytes += upload['size']
+                    copied.append((move[0], move[1]))
+            except Exception as e:
+                upload['failed'] = True
+                fail(move, e)
+                try:
+                    s3_client.abort_multipart_upload(Bucket=move[2], Key=move[3], UploadId=upload['upload_id'])
+                except Exception as abort_error:
+                    logger.error(f"[GLUE_ETL_JOB] Failed to abort the copy to s3://{move[2]}/{move[3]}: {_error_message(abort_error)}")
+
+    keys_by_bucket = {}
+    for source_bucket, source_key in copied:
+        keys_by_bucket.setdefault(source_bucket, []).append(source_key)
+    for source_bucket, keys in keys_by_bucket.items():
+        delete_objects(s3_client, source_bucket, keys)
+
+    logger.info(f"[GLUE_ETL_JOB] Moved {len(copied)} objects ({total_bytes} bytes)")
+    if failures:
+        raise Exception(f"Failed to move {len(failures)} of {len(moves)} objects: {failures[:5]}")
+    return total_bytes
@@ -0,0 +1,130 @@
+import json
+import logging
+import re
+import time
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+def _table_version(table):
+    """
+    Returns a version marker for a catalog table. Glue bumps VersionId and
+    UpdateTime whenever the crawler or a user changes the table definition.
+    """
+    update_time = table.get('UpdateTime')
+    if hasattr(update_time, 'isoformat'):
+        update_time = update_time.isoformat()
+    return f"{table.get('VersionId', '')}:{update_time or ''}"
+
+def _to_cache_entry(table, validated_at):
+    return {
+        'table_name': table['Name'],
+        'version': _table_version(table),
+        'columns': [
+            {'Name': column['Name'], 'Type': column['Type']}
+            for column in table['StorageDescriptor']['Columns']
+        ],
+        'validated_at': validated_at
+    }
+
+def find_table(glue_client, database_name, table_prefix, exact_name=False):
+    """
+    Returns the first catalog table whose name starts with table_prefix, or
+    the table named table_prefix with exact_name.
+
+    The prefix is pushed down to the catalog as a name expression and every
+    page of results is followed, so large catalogs are neither scanned in full
+    nor truncated.
+
+    Args:
+    - glue_client: boto3 Glue client.
+    - database_name: Name of the Glue catalog database.
+    - table_prefix: Prefix of the table name.
+    - exact_name: Look up table_prefix as the full table name.
+    """
+    if exact_name:
+        try:
+            return glue_client.get_table(DatabaseName=database_name, Name=table_prefix)['Table']
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'EntityNotFoundException':
+                raise
+            raise Exception(f"No table '{table_prefix}' found in database '{database_name}'")
+    paginator = glue_client.get_paginator('get_tables')
+    pages = paginator.paginate(DatabaseName=database_name, Expression=f"{re.escape(table_prefix)}.*")
+    for page in pages:
+        for table in page['TableList']:
+            if table['Name'].startswith(table_prefix):
+                return table
+    raise Exception(f"No tables found in database '{database_name}' with prefix '{table_prefix}'")
+
+def _read_cache(s3_client, bucket, key):
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+        return json.loads(response['Body'].read())
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('NoSuchKey', '404'):
+            logger.warning(f"[GLUE_ETL_JOB] Could not read schema cache s3://{bucket}/{key}: {e.response['Error']['Code']}")
+        return None
+
+def _write_cache(s3_client, bucket, key, entry):
+    try:
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=json.dumps(entry).encode('utf-8'),
+            ContentType='application/json'
+        )
+    except ClientError as e:
+        # The cache is an optimisation only, a failed write must not fail the job
+        logger.warning(f"[GLUE_ETL_JOB] Could not write schema cache s3://{bucket}/{key}: {e.response['Error']['Code']}")
+
+def resolve_table_schema(glue_client, s3_client, database_name, table_prefix, cache_bucket, cache_prefix, ttl_seconds,
+                         exact_name=False):
+    """
+    Resolves the catalog table for table_prefix and its columns, using a
+    versioned schema cache stored in S3.
+
+    A cache entry younger than ttl_seconds is used without calling the catalog.
+    An older entry is revalidated with a single get_table call and only
+    re-fetched when the table version has changed.
+
+    Args:
+    - glue_client: boto3 Glue client.
+    - s3_client: boto3 S3 client.
+    - database_name: Name of the Glue catalog database.
+    - table_prefix: Prefix of the table name.
+    - cache_bucket: Bucket holding the schema cache.
+    - cache_prefix: Key prefix of the schema cache (the temp folder).
+    - ttl_seconds: How long a cache entry is trusted without revalidation.
+    - exact_name: Resolve table_prefix as the full table name (routed tables).
+
+    Returns:
+    - A dict with table_name, version and columns ({'Name', 'Type'} dicts).
+    """
+    cache_name = f"tables/{table_prefix}" if exact_name else table_prefix
+    cache_key = f"{cache_prefix}/schema_cache/{database_name}/{cache_name}.json"
+    now = time.time()
+    cached = _read_cache(s3_client, cache_bucket, cache_key)
+
+    if cached and now - cached['validated_at'] < ttl_seconds:
+        logger.info(f"[GLUE_ETL_JOB] Schema cache hit for table {cached['table_name']} (version {cached['version']})")
+        return cached
+
+    if cached:
+        try:
+            table = glue_client.get_table(DatabaseName=database_name, Name=cached['table_name'])['Table']
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'EntityNotFoundException':
+                raise
+            table = None
+        if table is not None and _table_version(table) == cached['version']:
+            logger.info(f"[GLUE_ETL_JOB] Schema cache revalidated for table {cached['table_name']} (version {cached['version']})")
+            cached['validated_at'] = now
+            _write_cache(s3_client, cache_bucket, cache_key, cached)
+            return cached
+        logger.info(f"[GLUE_ETL_JOB] Catalog version changed for table {cached['table_name']}, refreshing schema cache")
+
+    entry = _to_cache_entry(find_table(glue_client, database_name, table_prefix, exact_name), now)
+    _write_cache(s3_client, cache_bucket, cache_key, entry)
+    logger.info(f"[GLUE_ETL_JOB] Schema cache refreshed for table {entry['table_name']} (version {entry['version']})")
+    return entry
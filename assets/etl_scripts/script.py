@@ -1,14 +1,38 @@
 import sys
 import sys
-import boto3
+import os
+import queue
+import tempfile
+import time
 import logging
 from awsglue.utils import getResolvedOptions
 from awsglue.context import GlueContext
+from pyspark import InheritableThread, SparkConf
 from pyspark.context import SparkContext
-from pyspark.sql.functions import col, when, lit
+from py4j.clientserver import ClientServer
 from awsglue.dynamicframe import DynamicFrame
-from pyspark.sql.types import StructType, StructField, StringType, IntegerType, LongType, DoubleType, FloatType, BooleanType, BinaryType, TimestampType
 from botocore.exceptions import ClientError
+from aws_clients import LazyClient
+from job_inputs import get_optional_args, resolve_input_files
+from schema_resolver import resolve_table_schema
+from projection import CORRUPT_RECORD_COLUMN, DEFAULT_VALUES, apply_projection
+from readers import detect_input_formats, file_partition_conf, group_files_options, read_input_files
+from profiling import build_metrics_record, collect_profile, observe_profile, write_metrics_record
+from s3_transfer import MB, delete_objects, move_objects
+from dynamodb_writer import WRITERS, connector_options, write_with_batch_api
+from change_detection import LOAD_MODES, detect_changes, index_path_for, latest_index_path, write_index
+from archive_writer import ARCHIVE_FORMATS, archive_file_count, register_archive_partitions, write_parquet_archive
+from discovery import DISCOVERY_MODES, advance_watermark, list_pending_objects, read_watermark, settled_position
+from ledger import (
+    DEFAULT_DISCOVERY_CLAIM_TTL_SECONDS, DEFAULT_MAX_WORKERS as LEDGER_MAX_WORKERS, attempt_number,
+    claim_discovered, finish_processing, start_processing
+)
+from validation import VALIDATION_MODES, ErrorRateExceeded, check_error_rate, split_rejects, validation_counts, write_rejects
+from metrics import MetricsLogger, size_bucket
+from table_routing import RouteIndex, default_table_route, load_routes, scheduler_allocation_xml
+from spark_profiles import estimate_input_bytes, parse_conf_overrides, select_spark_profile
+from prewrite import DEDUP_MODES, WRITE_PARTITIONINGS, add_source_position, key_distribution, partition_skew, prepare_for_write, write_partition_count
+from resumable_load import chunk_count_for, clear_progress, load_key, load_progress, mark_chunk_done, write_in_chunks
 
 # Set up logging
 logger = logging.getLogger()
@@ -20,19 +44,6 @@ logger.addHandler(handler)
 
 logger.info("[GLUE_ETL_JOB] Starting script execution")
 
-# Initialize Glue and Spark contexts
-logger.info("[GLUE_ETL_JOB] Initializing Glue and Spark contexts")
-sc = SparkContext()
-glueContext = GlueContext(sc)
-glue_client = boto3.client('glue')
-logger.info("[GLUE_ETL_JOB] Glue and Spark contexts initialized successfully")
-
-# Initialize boto3 clients
-logger.info("[GLUE_ETL_JOB] Initializing boto3 clients")
-s3_client = boto3.client('s3')
-dynamodb = boto3.resource('dynamodb')
-logger.info("[GLUE_ETL_JOB] boto3 clients initialized successfully")
-
 # Get job parameters from the Glue job
 logger.info("[GLUE_ETL_JOB] Retrieving job parameters")
 args = getResolvedOptions(sys.argv, [
@@ -42,9 +53,57 @@ args = getResolvedOptions(sys.argv, [
     'failed_prefix',
     'dynamodb_table_name',
     'table_prefix',
-    'data_file_name',
-    'database_catalog_name'
+    'database_catalog_name',
+    'temp_prefix'
 ])
+args.update(get_optional_args(sys.argv, {
+    'data_file_name': None,
+    'manifest_path': None,
+    'schema_cache_ttl_seconds': '300',
+    'read_mode': 'catalog',
+    'profile_level': 'off',
+    'profile_sample_fraction': '0.01',
+    'copy_part_size_mb': '128',
+    'multipart_threshold_mb': '256',
+    'transfer_max_workers': '16',
+    'dynamodb_writer': 'connector',
+    'dynamodb_write_percent': '0.5',
+    'dynamodb_parallel_tasks': '0',
+    'dynamodb_batch_size': '25',
+    'dynamodb_max_retries': '8',
+    'load_mode': 'full',
+    'emit_tombstones': 'false',
+    'archive_format': 'none',
+    'archive_partition_column': 'ingest_date',
+    'archive_target_file_mb': '128',
+    'discovery_mode': 'off',
+    'state_table_name': None,
+    'discovery_min_age_seconds': '900',
+    'discovery_max_files': '1000',
+    'discovery_max_bytes': str(10 * 1024 ** 3),
+    'ledger_table_name': None,
+    'ledger_retention_days': '30',
+    'discovery_claim_ttl_seconds': str(DEFAULT_DISCOVERY_CLAIM_TTL_SECONDS),
+    'validation_mode': 'off',
+    'max_error_rate': '0.01',
+    'resumable_load': 'false',
+    'load_chunk_mb': '1024',
+    'routes_path': None,
+    'max_concurrent_tables': '4',
+    'dedup_mode': 'off',
+    'dedup_version_column': None,
+    'write_partitioning': 'source',
+    'write_target_items_per_second': '4000',
+    'write_rows_per_partition': '500000',
+    'input_format': 'auto',
+    'read_partition_mb': '128',
+    'read_open_cost_kb': '4096',
+    'spark_profile': 'off',
+    'spark_conf_overrides': None,
+    'estimated_row_bytes': '200',
+    'job_max_retries': '0',
+    'JOB_RUN_ID': None
+}))
 logger.info(f"[GLUE_ETL_JOB] Retrieved job parameters: {args}")
 
 # Extract job parameters
@@ -52,155 +111,645 @@ job_name = args['job_name']
 source_bucket, source_prefix = args['source_prefix'].split('/', 1)  
 destination_bucket, destination_prefix = args['destination_prefix'].split('/', 1)
 failed_bucket, failed_prefix = args['failed_prefix'].split('/', 1)
+temp_bucket, temp_prefix = args['temp_prefix'].split('/', 1)
 dynamodb_table_name = args['dynamodb_table_name']
 table_prefix = args['table_prefix']
 data_file_name = args['data_file_name']
+manifest_path = args['manifest_path']
 database_catalog_name = args['database_catalog_name']
+schema_cache_ttl_seconds = int(args['schema_cache_ttl_seconds'])
+read_mode = args['read_mode']
+profile_level = args['profile_level']
+profile_sample_fraction = float(args['profile_sample_fraction'])
+job_run_id = args['JOB_RUN_ID'] or f"local-{int(time.time())}"
+# Glue retries a failed run up to --job_max_retries times (the MaxRetries of the job)
+final_attempt = attempt_number(job_run_id) >= int(args['job_max_retries'])
+copy_part_size = int(args['copy_part_size_mb']) * MB
+multipart_threshold = int(args['multipart_threshold_mb']) * MB
+transfer_max_workers = int(args['transfer_max_workers'])
+dynamodb_writer = args['dynamodb_writer']
+dynamodb_write_percent = float(args['dynamodb_write_percent'])
+dynamodb_parallel_tasks = int(args['dynamodb_parallel_tasks'])
+dynamodb_batch_size = int(args['dynamodb_batch_size'])
+dynamodb_max_retries = int(args['dynamodb_max_retries'])
+load_mode = args['load_mode']
+emit_tombstones = args['emit_tombstones'].lower() == 'true'
+archive_format = args['archive_format']
+archive_partition_column = args['archive_partition_column']
+archive_target_file_bytes = int(args['archive_target_file_mb']) * MB
+discovery_mode = args['discovery_mode']
+state_table_name = args['state_table_name']
+discovery_min_age_seconds = int(args['discovery_min_age_seconds'])
+discovery_max_files = int(args['discovery_max_files'])
+discovery_max_bytes = int(args['discovery_max_bytes'])
+ledger_table_name = args['ledger_table_name']
+ledger_retention_days = int(args['ledger_retention_days'])
+discovery_claim_ttl_seconds = int(args['discovery_claim_ttl_seconds'])
+validation_mode = args['validation_mode']
+max_error_rate = float(args['max_error_rate'])
+resumable_load = args['resumable_load'].lower() == 'true'
+load_chunk_bytes = int(args['load_chunk_mb']) * MB
+routes_path = args['routes_path']
+max_concurrent_tables = int(args['max_concurrent_tables'])
+dedup_mode = args['dedup_mode']
+dedup_version_column = args['dedup_version_column']
+write_partitioning = args['write_partitioning']
+write_target_items_per_second = int(args['write_target_items_per_second'])
+write_rows_per_partition = int(args['write_rows_per_partition'])
+input_format = args['input_format']
+read_partition_bytes = int(args['read_partition_mb']) * MB
+read_open_cost_bytes = int(args['read_open_cost_kb']) * 1024
+spark_profile = args['spark_profile']
+spark_conf_overrides = parse_conf_overrides(args['spark_conf_overrides'])
+estimated_row_bytes = int(args['estimated_row_bytes'])
+
+# Shared boto3 clients, built on first use with connection pools sized to the
+# threads using them (file moves run in every concurrently loaded table)
+glue_client = LazyClient('glue')
+s3_client = LazyClient('s3', transfer_max_workers * max_concurrent_tables)
+dynamodb_client = LazyClient('dynamodb', LEDGER_MAX_WORKERS)
 
 # Log job parameters for debugging
 logger.info(f"[GLUE_ETL_JOB] Job name: {job_name}")
-logger.info(f"[GLUE_ETL_JOB] S3 buckets and prefixes: source={source_bucket}/{source_prefix}, destination={destination_bucket}/{destination_prefix}, failed={failed_bucket}/{failed_prefix}")
+logger.info(f"[GLUE_ETL_JOB] S3 buckets and prefixes: source={source_bucket}/{source_prefix}, destination={destination_bucket}/{destination_prefix}, failed={failed_bucket}/{failed_prefix}, temp={temp_bucket}/{temp_prefix}")
 logger.info(f"[GLUE_ETL_JOB] DynamoDB table name: {dynamodb_table_name}")
+logger.info(f"[GLUE_ETL_JOB] DynamoDB writer: {dynamodb_writer} (write percent {dynamodb_write_percent}, parallel tasks {dynamodb_parallel_tasks}, batch size {dynamodb_batch_size})")
 logger.info(f"[GLUE_ETL_JOB] Data file name: {data_file_name}")
+logger.info(f"[GLUE_ETL_JOB] Manifest path: {manifest_path}")
 logger.info(f"[GLUE_ETL_JOB] Database catalog name: {database_catalog_name}")
 logger.info(f"[GLUE_ETL_JOB] Table prefix: {table_prefix}")
+logger.info(f"[GLUE_ETL_JOB] Read mode: {read_mode} (input format {input_format}, {args['read_partition_mb']} MB read partitions)")
+logger.info(f"[GLUE_ETL_JOB] Profile level: {profile_level} (sample fraction {profile_sample_fraction})")
+logger.info(f"[GLUE_ETL_JOB] Load mode: {load_mode} (tombstones {emit_tombstones})")
+logger.info(f"[GLUE_ETL_JOB] Archive format: {archive_format} (partitioned by {archive_partition_column})")
+logger.info(f"[GLUE_ETL_JOB] Discovery mode: {discovery_mode} (state table {state_table_name}, min age {discovery_min_age_seconds}s)")
+logger.info(f"[GLUE_ETL_JOB] Ledger table: {ledger_table_name}")
+logger.info(f"[GLUE_ETL_JOB] Validation mode: {validation_mode} (max error rate {max_error_rate})")
+logger.info(f"[GLUE_ETL_JOB] Deduplication: {dedup_mode} (version column {dedup_version_column}), write partitioning: {write_partitioning}")
+logger.info(f"[GLUE_ETL_JOB] Resumable load: {resumable_load} ({args['load_chunk_mb']} MB per chunk)")
+logger.info(f"[GLUE_ETL_JOB] Spark profile: {spark_profile} (overrides {spark_conf_overrides})")
 
-# Initialize DynamoDB table
-logger.info(f"[GLUE_ETL_JOB] Initializing DynamoDB table: {dynamodb_table_name}")
-logger.info("[GLUE_ETL_JOB] DynamoDB table initialized successfully")
+# Stage timings and counters of the run, emitted as EMF when the run ends
+metrics = MetricsLogger("GluePoc/ETL", {'JobName': job_name})
+metrics.set_property('JobRunId', job_run_id)
 
-def move_file(source_bucket, source_prefix, destination_bucket, destination_prefix, file_name):
-    logger.info(f"[GLUE_ETL_JOB] Starting move_file function for file: {file_name}")
-    try:
-        source_key = f"{source_prefix}/{file_name}"
-        destination_key = f"{destination_prefix}/{file_name}"
+# File name to table routes, indexed once per run
+route_index = RouteIndex(load_routes(s3_client, routes_path))
+default_route = default_table_route(table_prefix, dynamodb_table_name)
 
-        logger.info(f"[GLUE_ETL_JOB] Moving file from s3://{source_bucket}/{source_key} to s3://{destination_bucket}/{destination_key}")
+def input_locations(input_files):
+    """
+    Returns the (bucket, key) of every object to read: the pre-split parts
+    of a file when it has them, the file itself otherwise.
+    """
+    locations = []
+    for input_file in input_files:
+        if input_file.get('parts'):
+            locations.extend((temp_bucket, part['key']) for part in input_file['parts'])
+        else:
+            locations.append((source_bucket, f"{source_prefix}/{input_file['file_name']}"))
+    return locations
 
-        s3_client.copy_object(
-            Bucket=destination_bucket,
-            CopySource={'Bucket': source_bucket, 'Key': source_key},
-            Key=destination_key
-        )
-        logger.info(f"[GLUE_ETL_JOB] Successfully copied file to s3://{destination_bucket}/{destination_key}")
+def clear_parts(input_files):
+    """
+    Deletes the pre-split parts of the input files, once the files have been
+    moved.
+    """
+    part_keys = [part['key'] for input_file in input_files for part in (input_file.get('parts') or [])]
+    if part_keys:
+        delete_objects(s3_client, temp_bucket, part_keys)
+
+def get_input_bytes(input_files):
+    """
+    Returns the total size of the input files, looking up sizes the manifest
+    did not provide. Pre-split files count their uncompressed part sizes.
+    """
+    total = 0
+    for input_file in input_files:
+        if input_file.get('parts'):
+            total += sum(part['bytes'] for part in input_file['parts'])
+            continue
+        if input_file['size'] is None:
+            input_file['size'] = s3_client.head_object(
+                Bucket=source_bucket, Key=f"{source_prefix}/{input_file['file_name']}"
+            )['ContentLength']
+        total += input_file['size']
+    return total
 
-        s3_client.delete_object(Bucket=source_bucket, Key=source_key)
-        logger.info(f"[GLUE_ETL_JOB] Successfully deleted original file from s3://{source_bucket}/{source_key}")
+# Files of the run, resolved before the SparkContext so its settings can
+# follow their size. Discovery runs are sized for their largest batch.
+if discovery_mode == 'watermark':
+    requested_files = None
+    estimated_bytes = discovery_max_bytes
+else:
+    requested_files = resolve_input_files(s3_client, manifest_path, data_file_name)
+    get_input_bytes(requested_files)
+    estimated_bytes = estimate_input_bytes(requested_files)
+estimated_rows = estimated_bytes // estimated_row_bytes
 
+# Pack small input files into read partitions by size, not one task per file,
+# with the shuffle, serializer and AQE settings of the input size
+spark_profile_name, spark_conf = select_spark_profile(
+    spark_profile, estimated_bytes, estimated_rows,
+    base_conf=file_partition_conf(read_partition_bytes, read_open_cost_bytes),
+    overrides=spark_conf_overrides
+)
+logger.info(f"[GLUE_ETL_JOB] Spark profile {spark_profile_name} for ~{estimated_bytes} bytes, ~{estimated_rows} rows: {spark_conf}")
+metrics.set_property('SparkProfile', spark_profile_name)
+metrics.set_property('SparkConf', spark_conf)
+metrics.put_metric('EstimatedInputBytes', estimated_bytes, 'Bytes')
+
+# FAIR scheduler pools of the routes, the tables of a batch run concurrently in them
+allocation_path = os.path.join(tempfile.mkdtemp(), "fairscheduler.xml")
+with open(allocation_path, "w") as allocation_file:
+    allocation_file.write(scheduler_allocation_xml(route_index.routes, default_route))
+spark_conf['spark.scheduler.mode'] = 'FAIR'
+spark_conf['spark.scheduler.allocation.file'] = allocation_path
+
+# Initialize Glue and Spark contexts
+logger.info("[GLUE_ETL_JOB] Initializing Glue and Spark contexts")
+sc = SparkContext(conf=SparkConf().setAll(spark_conf.items()))
+glueContext = GlueContext(sc)
+logger.info("[GLUE_ETL_JOB] Glue and Spark contexts initialized successfully")
+
+# Scheduler pools and job descriptions are set per thread, which needs the pinned thread mode (the
+# py4j ClientServer gateway, one JVM thread per Python thread). PySpark 3.1 (Glue 3.0) only starts it
+# when the driver runs with PYSPARK_PIN_THREAD=true, otherwise the tables of a batch run one at a time.
+pinned_thread_mode = isinstance(SparkContext._gateway, ClientServer)
+table_concurrency = max_concurrent_tables if pinned_thread_mode else 1
+logger.info(f"[GLUE_ETL_JOB] Concurrent tables: {table_concurrency} (pinned thread mode: {pinned_thread_mode})")
+
+def move_files(source_bucket, source_prefix, destination_bucket, destination_prefix, file_names):
+    """
+    Moves a batch of files between prefixes with concurrent server-side copies
+    (multipart for large files) followed by bulk deletes of the sources.
+    """
+    logger.info(f"[GLUE_ETL_JOB] Moving {len(file_names)} files from s3://{source_bucket}/{source_prefix}/ to s3://{destination_bucket}/{destination_prefix}/")
+    try:
+        moves = [
+            (source_bucket, f"{source_prefix}/{file_name}", destination_bucket, f"{destination_prefix}/{file_name}")
+            for file_name in file_names
+        ]
+        move_objects(
+            s3_client,
+            moves,
+            part_size=copy_part_size,
+            multipart_threshold=multipart_threshold,
+            max_workers=transfer_max_workers
+        )
     except ClientError as e:
-        logger.error(f"[GLUE_ETL_JOB] ClientError in move_file: {e.response['Error']['Code']} - {e.response['Error']['Message']}")
+        logger.error(f"[GLUE_ETL_JOB] ClientError in move_files: {e.response['Error']['Code']} - {e.response['Error']['Message']}")
         raise
     except Exception as e:
-        logger.error(f"[GLUE_ETL_JOB] An unexpected error occurred in move_file: {str(e)}")
+        logger.error(f"[GLUE_ETL_JOB] An unexpected error occurred in move_files: {str(e)}")
         raise
+    logger.info("[GLUE_ETL_JOB] move_files function completed successfully")
+
+def move_file(source_bucket, source_prefix, destination_bucket, destination_prefix, file_name):
+    logger.info(f"[GLUE_ETL_JOB] Starting move_file function for file: {file_name}")
+    move_files(source_bucket, source_prefix, destination_bucket, destination_prefix, [file_name])
     logger.info("[GLUE_ETL_JOB] move_file function completed successfully")
 
-def write_to_dynamodb(dynamic_frame):
+def write_to_dynamodb(dynamic_frame, target_table_name=None):
     """
-    Writes the provided DynamicFrame to a DynamoDB table.
+    Writes the provided DynamicFrame to a DynamoDB table, either through the
+    Glue DynamoDB connector or with BatchWriteItem per partition.
 
     Args:
     - dynamic_frame: The DynamicFrame to write.
+    - target_table_name: The DynamoDB table, --dynamodb_table_name by default.
     """
-    
-    dynamodb_options = {
-        "tableName": dynamodb_table_name,
-        "overwrite": "true"
-    }
-    # Specify connection options for DynamoDB
+    target_table_name = target_table_name or dynamodb_table_name
+    if dynamodb_writer not in WRITERS:
+        raise ValueError(f"Unknown DynamoDB writer '{dynamodb_writer}', expected one of {WRITERS}")
+
     try:
-        # Write the DynamicFrame to DynamoDB
-        glueContext.write_dynamic_frame.from_options(
-            frame=dynamic_frame,
-            connection_type="dynamodb",
-            connection_options=dynamodb_options
-        )
-        logger.info(f"[GLUE_ETL_JOB] Successfully written to DynamoDB table: {dynamodb_table_name}")
+        if dynamodb_writer == 'batch':
+            # Write every partition with BatchWriteItem
+            write_with_batch_api(
+                glueContext.spark_session,
+                dynamic_frame.toDF(),
+                target_table_name,
+                batch_size=dynamodb_batch_size,
+                max_retries=dynamodb_max_retries
+            )
+        else:
+            # Write the DynamicFrame to DynamoDB
+            glueContext.write_dynamic_frame.from_options(
+                frame=dynamic_frame,
+                connection_type="dynamodb",
+                connection_options=connector_options(target_table_name, dynamodb_write_percent, dynamodb_parallel_tasks)
+            )
+        logger.info(f"[GLUE_ETL_JOB] Successfully written to DynamoDB table: {target_table_name}")
     except Exception as e:
-        logger.error(f"[GLUE_ETL_JOB] Failed to write to DynamoDB table: {dynamodb_table_name}, Error: {str(e)}")
+        logger.error(f"[GLUE_ETL_JOB] Failed to write to DynamoDB table: {target_table_name}, Error: {str(e)}")
         raise  # Re-raise the exception to be caught in the calling function
 
+def discover_input_files():
+    """
+    Lists the objects under the source prefix that no run has processed yet,
+    starting after the watermark stored in the state table.
+
+    Returns:
+    - A tuple of (input files, watermark read at the start of the run).
+    """
+    if not state_table_name:
+        raise ValueError("--state_table_name is required when --discovery_mode is 'watermark'")
+    watermark = read_watermark(dynamodb_client, state_table_name, job_name)
+    logger.info(f"[GLUE_ETL_JOB] Discovery watermark: {watermark}")
+    input_files = list_pending_objects(
+        s3_client, source_bucket, source_prefix, watermark,
+        discovery_min_age_seconds, discovery_max_files, discovery_max_bytes
+    )
+    return input_files, watermark
+
+def advance_discovery(watermark, listed_files, unsettled_files):
+    """
+    Moves the discovery watermark to the last listed file before the first
+    unsettled one, see discovery.settled_position.
+    """
+    latest = settled_position(listed_files, {input_file['key'] for input_file in unsettled_files})
+    if latest is None:
+        logger.info("[GLUE_ETL_JOB] First discovered file is not settled, keeping the watermark")
+        return
+    advance_watermark(dynamodb_client, state_table_name, job_name, watermark, latest)
+
+@metrics.timed('ProcessTime')
 def process_file():
     logger.info("[GLUE_ETL_JOB] Starting process_file function")
+    if discovery_mode not in DISCOVERY_MODES:
+        raise ValueError(f"Unknown discovery mode '{discovery_mode}', expected one of {DISCOVERY_MODES}")
+    if discovery_mode == 'watermark':
+        input_files, watermark = discover_input_files()
+        if not input_files:
+            logger.info("[GLUE_ETL_JOB] No pending files under the source prefix")
+            return
+        listed_files = input_files
+        held_files = []
+        # Claim the discovered files in the ledger, files the trigger path or another run owns are dropped
+        if ledger_table_name:
+            input_files, held_files = claim_discovered(
+                dynamodb_client, s3_client, ledger_table_name, source_bucket, input_files, job_name, job_run_id,
+                discovery_claim_ttl_seconds
+            )
+    else:
+        input_files = requested_files
+        # Take the claimed files to processing, files another run owns are dropped
+        if ledger_table_name:
+            input_files = start_processing(dynamodb_client, ledger_table_name, input_files, job_name, job_run_id)
+    if not input_files:
+        logger.info("[GLUE_ETL_JOB] Every file of the batch is processed by another run")
+        if discovery_mode == 'watermark':
+            advance_discovery(watermark, listed_files, held_files)
+        return
+
+    # Split the batch by target table, files without a route go to the default table
+    groups = route_index.group(input_files, default_route)
+    logger.info(f"[GLUE_ETL_JOB] Batch routed to {len(groups)} tables: {[route['name'] for route, _ in groups]}")
+    if len(groups) == 1 or table_concurrency == 1:
+        errors = [_run_table_batch(*group) for group in groups]
+    else:
+        # Tables are processed concurrently on the shared SparkContext, each in its own FAIR pool
+        errors = _run_concurrently(groups)
+
+    # The next discovery run starts after the files that are settled. Files another run holds may still
+    # fail and the files of a failed table stay in place for a retry attempt, both have to be listed again.
+    if discovery_mode == 'watermark':
+        advance_discovery(watermark, listed_files, held_files + [
+            input_file for (_, group_files), error in zip(groups, errors) if error is not None
+            for input_file in group_files
+        ])
+
+    errors = [error for error in errors if error is not None]
+    if errors:
+        raise errors[0]
+    logger.info("[GLUE_ETL_JOB] process_file function completed")
+
+def _run_concurrently(groups):
+    """
+    Runs the route groups of a batch on up to table_concurrency
+    InheritableThreads. Only called in the pinned thread mode, where every
+    Python thread has its own JVM thread, so the pool and job description
+    each thread sets only apply to the Spark jobs it starts.
+
+    Returns:
+    - The result of _run_table_batch of every group, in order.
+    """
+    pending = queue.Queue()
+    for index, group in enumerate(groups):
+        pending.put((index, group))
+    errors = [None] * len(groups)
+
+    def worker():
+        while True:
+            try:
+                index, group = pending.get_nowait()
+            except queue.Empty:
+                return
+            errors[index] = _run_table_batch(*group)
+
+    threads = [InheritableThread(target=worker) for _ in range(min(len(groups), table_concurrency))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+def _run_table_batch(route, input_files):
+    """
+    Runs process_table_batch in the FAIR scheduler pool of the route and
+    returns its exception instead of raising, so one failed table does not
+    stop the others.
+    """
+    sc.setLocalProperty("spark.scheduler.pool", route['pool'])
     try:
-        # Retrieve table from catalog
+        process_table_batch(route, input_files)
+        return None
+    except Exception as e:
+        return e
+    finally:
+        sc.setLocalProperty("spark.scheduler.pool", None)
+        sc.setLocalProperty("spark.job.description", None)
+
+def describe_step(step, table_name):
+    """
+    Labels the Spark jobs the current thread starts with the process_file
+    step, so the stages in the Spark event logs can be traced back to it
+    (tools/analyze_spark_events.py). The description is a local property of
+    the JVM thread, which is only the thread of the caller in the pinned
+    thread mode; without it concurrent tables run one after the other (see
+    table_concurrency).
+    """
+    sc.setJobDescription(f"process_file:{step}:{table_name}")
+
+def process_table_batch(route, input_files):
+    """
+    Loads the files of one route into its DynamoDB table and moves them to
+    the destination folder, or to the failed folder on error.
+
+    Args:
+    - route: Route from table_routing.RouteIndex (catalog table selector and DynamoDB table).
+    - input_files: The files of the batch routed to it.
+    """
+    target_table_name = route['dynamodb_table_name']
+    data_file_names = [input_file['file_name'] for input_file in input_files]
+    input_bytes = get_input_bytes(input_files)
+    table_metrics = MetricsLogger(
+        "GluePoc/ETL", {'JobName': job_name, 'FileSizeBucket': size_bucket(input_bytes)}, sink=metrics.sink
+    )
+    table_metrics.set_property('JobRunId', job_run_id)
+    table_metrics.set_property('SparkProfile', spark_profile_name)
+    table_metrics.put_metric('Files', len(input_files))
+    table_metrics.put_metric('InputBytes', input_bytes, 'Bytes')
+    # Progress of a resumable load, kept for a retry attempt over the same files
+    progress_prefix = f"{temp_prefix}/progress/{job_name}/{load_key(input_files)}" if resumable_load else None
+    try:
+        # Retrieve table from catalog (through the versioned schema cache)
         logger.info(f"[GLUE_ETL_JOB] Retrieving table from catalog: {database_catalog_name}")
-        response = glue_client.get_tables(DatabaseName=database_catalog_name)
-        tables = response['TableList']
-        filtered_tables = [table for table in tables if table['Name'].startswith(table_prefix)]
-        
-        if not filtered_tables:
-            raise Exception(f"No tables found in database '{database_catalog_name}' with prefix '{table_prefix}'")
-        
-        table = filtered_tables[0]
-        table_name = table['Name']
+        with table_metrics.timer('SchemaResolveTime'):
+            table = resolve_table_schema(
+                glue_client, s3_client, database_catalog_name, route['catalog_table'],
+                temp_bucket, temp_prefix, schema_cache_ttl_seconds, exact_name=route['exact_name']
+            )
+        table_name = table['table_name']
+        table_metrics.set_dimension('Table', table_name)
         logger.info(f"[GLUE_ETL_JOB] Found table: {table_name}")
 
         # Get catalog schema
-        catalog_schema = {col['Name']: col['Type'] for col in table['StorageDescriptor']['Columns']}
+        catalog_schema = {col['Name']: col['Type'] for col in table['columns']}
         logger.info(f"[GLUE_ETL_JOB] Catalog schema: {catalog_schema}")
 
-        # Define default values
-        default_values = {
-            "string": "", "int": 0, "bigint": 0, "double": 0.0,
-            "float": 0.0, "boolean": False, "binary": bytearray(),
-            "timestamp": "1970-01-01 00:00:00"
-        }
-
-        # Read data from S3
-        logger.info(f"[GLUE_ETL_JOB] Reading file from S3: s3://{source_bucket}/{source_prefix}/{data_file_name}")
-        source_dyf = glueContext.create_dynamic_frame.from_options(
-            connection_type="s3",
-            connection_options={"paths": [f"s3://{source_bucket}/{source_prefix}/{data_file_name}"]},
-            format="csv",
-            format_options={"withHeader": True}
-        )
+        if dedup_mode not in DEDUP_MODES:
+            raise ValueError(f"Unknown dedup mode '{dedup_mode}', expected one of {DEDUP_MODES}")
+        if write_partitioning not in WRITE_PARTITIONINGS:
+            raise ValueError(f"Unknown write partitioning '{write_partitioning}', expected one of {WRITE_PARTITIONINGS}")
+        dedup = dedup_mode == 'last_wins'
+
+        # Quarantine rejected rows instead of failing the whole batch
+        if validation_mode not in VALIDATION_MODES:
+            raise ValueError(f"Unknown validation mode '{validation_mode}', expected one of {VALIDATION_MODES}")
+        validate = validation_mode == 'quarantine'
+        corrupt_record_column = CORRUPT_RECORD_COLUMN if validate else None
+
+        # Read every file of the batch from S3 into a single DataFrame
+        # (the projection runs in the stages that read the files)
+        describe_step('read', table_name)
+        # Pre-split files are read from their parts under temp/
+        locations = input_locations(input_files)
+        paths = [f"s3://{bucket}/{key}" for bucket, key in locations]
+        logger.info(f"[GLUE_ETL_JOB] Reading {len(paths)} objects for {len(data_file_names)} files from S3: s3://{source_bucket}/{source_prefix}/")
+        # Compressed, JSON lines and Parquet inputs are told apart by extension or first bytes
+        formats = detect_input_formats(s3_client, locations, input_format)
+        if read_mode == 'catalog':
+            # Read with the catalog types directly, no inference scan
+            df = read_input_files(
+                glueContext.spark_session, s3_client, locations, formats, catalog_schema, corrupt_record_column
+            )
+        else:
+            file_formats = {file_format for file_format, _ in formats.values()}
+            if len(file_formats) > 1:
+                raise ValueError(f"read_mode 'infer' reads one format per batch, found {sorted(file_formats)}")
+            file_format = file_formats.pop()
+            source_dyf = glueContext.create_dynamic_frame.from_options(
+                connection_type="s3",
+                connection_options={
+                    "paths": paths,
+                    **group_files_options(len(paths), input_bytes, read_partition_bytes)
+                },
+                format=file_format,
+                format_options={"withHeader": True} if file_format == 'csv' else {}
+            )
+            df = source_dyf.toDF()
+        if dedup:
+            # Duplicate ids resolve to the last row of the batch, positions are taken before any shuffle
+            df = add_source_position(df, paths)
 
-        # Convert to DataFrame and apply schema
+        # Ensure 'id' column is present, the projection casts it to bigint
+        if 'id' not in df.columns and 'id' not in catalog_schema:
+            logger.error("[GLUE_ETL_JOB] 'id' column is missing from the data")
+            raise ValueError("'id' column is required as the primary key")
+
+        # Apply schema and defaults in a single projection
         logger.info("[GLUE_ETL_JOB] Applying schema and defaults")
-        df = source_dyf.toDF()
-        for col_name, col_type in catalog_schema.items():
-            if col_name in df.columns:
-                df = df.withColumn(
-                    col_name,
-                    when(col(col_name).isNull() | (col(col_name) == ""), default_values.get(col_type.lower(), None))
-                    .otherwise(col(col_name).cast(col_type))
+        df = apply_projection(df, catalog_schema, DEFAULT_VALUES, validate=validate)
+
+        # Count the rejects of the validating projection and keep them apart
+        rejected_rows = 0
+        if validate:
+            validated_df = df.persist()
+            # Counting reads, projects and caches the batch
+            with table_metrics.timer('ReadValidateTime'):
+                total_rows, rejected_rows = validation_counts(validated_df)
+            table_metrics.put_metric('Rows', total_rows)
+            table_metrics.put_metric('RejectedRows', rejected_rows)
+            check_error_rate(total_rows, rejected_rows, max_error_rate)
+            df, rejected_df = split_rejects(validated_df)
+            if rejected_rows:
+                describe_step('rejects', table_name)
+                write_rejects(rejected_df, f"s3://{failed_bucket}/{failed_prefix}/rejects/{job_name}/{job_run_id}/{table_name}/")
+
+        # Drop duplicate ids and spread the rows over id hash partitions sized for the write
+        written_rows = total_rows - rejected_rows if validate and not dedup else None
+        partition_count = None
+        if write_partitioning == 'id_hash':
+            describe_step('key_distribution', table_name)
+            with table_metrics.timer('KeyDistributionTime'):
+                distribution = key_distribution(df)
+            partition_count = write_partition_count(
+                sum(rows for rows, _ in distribution.values()), write_target_items_per_second, write_rows_per_partition
+            )
+            skew = partition_skew(distribution, partition_count)
+            logger.info(f"[GLUE_ETL_JOB] Write partitions: {skew}")
+            table_metrics.put_metric('WritePartitions', partition_count)
+            table_metrics.put_metric('WritePartitionSkew', skew['skew'], 'None')
+            table_metrics.put_metric('DuplicateRows', skew['duplicate_rows'])
+            # Without duplicates the window is not needed
+            dedup = dedup and skew['duplicate_rows'] > 0
+            written_rows = skew['rows'] + (0 if dedup else skew['duplicate_rows'])
+        prewritten = dedup or partition_count is not None
+        if prewritten:
+            df = prepare_for_write(df, partition_count, dedup, dedup_version_column)
+
+        # Log schema (resolved by the analyzer, no Spark job is started)
+        logger.info(f"[GLUE_ETL_JOB] Final schema: {df.schema.simpleString()}")
+
+        # The typed rows are written twice when archiving, keep them cached
+        # (validated rows are cached already, unless shuffled by the pre-write stage)
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format '{archive_format}', expected one of {ARCHIVE_FORMATS}")
+        typed_df = df
+        typed_cached = archive_format == 'parquet' and (prewritten or not validate)
+        if typed_cached:
+            typed_df = df = df.persist()
+
+        # Keep only new and changed rows when loading incrementally
+        if load_mode not in LOAD_MODES:
+            raise ValueError(f"Unknown load mode '{load_mode}', expected one of {LOAD_MODES}")
+        if load_mode == 'delta':
+            describe_step('change_detection', table_name)
+            previous_index_path = latest_index_path(s3_client, destination_bucket, destination_prefix, target_table_name)
+            df, hashed = detect_changes(
+                glueContext.spark_session, df, list(catalog_schema), previous_index_path, emit_tombstones
+            )
+
+        # Profile a sample of the rows while they stream to the DynamoDB write
+        df, profile_observation = observe_profile(df, profile_level, profile_sample_fraction)
+
+        describe_step('dynamodb_write', table_name)
+        write_started = time.perf_counter()
+        with table_metrics.timer('DynamoDBWriteTime'):
+            if resumable_load:
+                # Write in id hash chunks, a rerun over the same files skips the chunks already written
+                progress = load_progress(
+                    s3_client, temp_bucket, progress_prefix, chunk_count_for(input_bytes, load_chunk_bytes)
+                )
+                logger.info(f"[GLUE_ETL_JOB] Writing to DynamoDB in {progress['chunk_count']} chunks")
+                write_df = df.persist()
+                write_in_chunks(
+                    write_df,
+                    progress,
+                    lambda chunk_df, chunk: write_to_dynamodb(
+                        DynamicFrame.fromDF(chunk_df, glueContext, f"{table_name}_chunk_{chunk}"), target_table_name
+                    ),
+                    lambda chunk: mark_chunk_done(s3_client, temp_bucket, progress_prefix, chunk)
                 )
+                write_df.unpersist()
             else:
-                df = df.withColumn(col_name, lit(default_values.get(col_type.lower(), None)).cast(col_type))
+                # Convert back to DynamicFrame
+                logger.info("[GLUE_ETL_JOB] Converting back to DynamicFrame")
+                dynamic_frame = DynamicFrame.fromDF(df, glueContext, f"{table_name}_dynamic_frame")
 
-        # Ensure 'id' column is present and of type bigint
-        if 'id' not in df.columns:
-            logger.error("[GLUE_ETL_JOB] 'id' column is missing from the data")
-            raise ValueError("'id' column is required as the primary key")
-        df = df.withColumn('id', col('id').cast('bigint'))
-
-        # Convert back to DynamicFrame
-        logger.info("[GLUE_ETL_JOB] Converting back to DynamicFrame")
-        dynamic_frame = DynamicFrame.fromDF(df, glueContext, "dynamic_frame")
-
-        # Log schema and sample data
-        logger.info(f"[GLUE_ETL_JOB] Final schema: {dynamic_frame.schema()}")
-        logger.info("[GLUE_ETL_JOB] Sample data (first 5 rows):")
-        for row in dynamic_frame.toDF().limit(5).collect():
-            logger.info(str(row.asDict()))
-
-        # Write to DynamoDB
-        logger.info("[GLUE_ETL_JOB] Writing to DynamoDB")
-        write_to_dynamodb(dynamic_frame)
-
-        # Move processed file
-        logger.info("[GLUE_ETL_JOB] Moving processed file")
-        move_file(source_bucket, source_prefix, destination_bucket, destination_prefix, data_file_name)
-        
-        logger.info(f"[GLUE_ETL_JOB] Successfully processed file: {data_file_name}")
+                # Write to DynamoDB
+                logger.info(f"[GLUE_ETL_JOB] Writing to DynamoDB table: {target_table_name}")
+                write_to_dynamodb(dynamic_frame, target_table_name)
+        if written_rows is not None and load_mode == 'full' and not (progress_prefix and progress['done']):
+            # Every accepted row was written in this attempt
+            table_metrics.put_metric(
+                'DynamoDBWriteRate',
+                round(written_rows / max(time.perf_counter() - write_started, 1e-3), 3),
+                'Count/Second'
+            )
+
+        profile = collect_profile(profile_observation)
+
+        # Record the hashes of this load for the next delta comparison
+        if load_mode == 'delta':
+            describe_step('change_index', table_name)
+            write_index(
+                glueContext.spark_session, s3_client, hashed, previous_index_path,
+                index_path_for(destination_bucket, destination_prefix, target_table_name, job_run_id),
+                destination_bucket, destination_prefix, target_table_name, emit_tombstones
+            )
+
+        # Write the typed rows to the columnar archive and register the partitions
+        if archive_format == 'parquet':
+            archive_table_name = f"{table_name}_archive"
+            archive_prefix = f"{destination_prefix}/_parquet/{archive_table_name}"
+            describe_step('archive', table_name)
+            with table_metrics.timer('ArchiveTime'):
+                archived_df = write_parquet_archive(
+                    typed_df,
+                    f"s3://{destination_bucket}/{archive_prefix}",
+                    archive_partition_column,
+                    archive_file_count(input_bytes, archive_target_file_bytes)
+                )
+            register_archive_partitions(
+                glue_client, database_catalog_name, archive_table_name, archived_df,
+                archive_partition_column, destination_bucket, archive_prefix
+            )
+            if typed_cached:
+                typed_df.unpersist()
+        if validate:
+            validated_df.unpersist()
+
+        if profile is not None:
+            record = build_metrics_record(
+                profile,
+                job_name=job_name,
+                job_run_id=job_run_id,
+                table_name=table_name,
+                dynamodb_table_name=target_table_name,
+                files=data_file_names,
+                profile_level=profile_level,
+                rejected_rows=rejected_rows
+            )
+            logger.info(f"[GLUE_ETL_JOB] Profile: {record['sampled_rows']} rows sampled, ~{record['estimated_rows']} rows written")
+            write_metrics_record(s3_client, temp_bucket, f"{temp_prefix}/metrics/{job_name}/{job_run_id}/{table_name}.json", record)
+
+        # Move processed files
+        logger.info("[GLUE_ETL_JOB] Moving processed files")
+        with table_metrics.timer('MoveTime'):
+            move_files(source_bucket, source_prefix, destination_bucket, destination_prefix, data_file_names)
+        clear_parts(input_files)
+        if progress_prefix:
+            clear_progress(s3_client, temp_bucket, progress_prefix)
+
+        logger.info(f"[GLUE_ETL_JOB] Successfully processed files: {data_file_names}")
     except Exception as e:
-        logger.error(f"[GLUE_ETL_JOB] Error processing file {data_file_name}: {str(e)}")
-        logger.info(f"[GLUE_ETL_JOB] Moving file to failed folder: s3://{failed_bucket}/{failed_prefix}/{data_file_name}")
-        move_file(source_bucket, source_prefix, failed_bucket, failed_prefix, data_file_name)
+        logger.error(f"[GLUE_ETL_JOB] Error processing files {data_file_names}: {str(e)}")
+        if not final_attempt and not isinstance(e, ErrorRateExceeded):
+            # The files, parts, load progress and processing ledger entries stay for the retry attempt
+            logger.info(f"[GLUE_ETL_JOB] Leaving the files in place for attempt {attempt_number(job_run_id) + 1} of the run")
+            raise
+        logger.info(f"[GLUE_ETL_JOB] Moving files to failed folder: s3://{failed_bucket}/{failed_prefix}/")
+        with table_metrics.timer('MoveTime'):
+            move_files(source_bucket, source_prefix, failed_bucket, failed_prefix, data_file_names)
+        clear_parts(input_files)
+        # A later load of the same files starts over, whatever the failed attempts wrote
+        if progress_prefix:
+            clear_progress(s3_client, temp_bucket, progress_prefix)
+        if ledger_table_name:
+            finish_processing(
+                dynamodb_client, ledger_table_name, input_files, 'failed', job_name, job_run_id, ledger_retention_days
+            )
         raise
+    finally:
+        table_metrics.flush()
 
-    logger.info("[GLUE_ETL_JOB] process_file function completed")
+    if ledger_table_name:
+        finish_processing(
+            dynamodb_client, ledger_table_name, input_files, 'done', job_name, job_run_id, ledger_retention_days
+        )
 
 def apply_transformations(dynamic_frame):
     logger.info("[GLUE_ETL_JOB] Starting apply_transformations function")
@@ -212,10 +761,14 @@ def handler():
     logger.info("[GLUE_ETL_JOB] Starting ETL job")
     try:
         process_file()
+        metrics.put_metric('RunsSucceeded', 1)
         logger.info("[GLUE_ETL_JOB] ETL job completed successfully")
     except Exception as e:
+        metrics.put_metric('RunsFailed', 1)
         logger.error(f"[GLUE_ETL_JOB] ETL job failed: {e}")
         sys.exit(1)
+    finally:
+        metrics.flush()
 
 if __name__ == '__main__':
     logger.info("[GLUE_ETL_JOB] Script started")
@@ -0,0 +1,226 @@
+import sys
+import csv
+import gzip
+import io
+import json
+import logging
+from awsglue.utils import getResolvedOptions
+from botocore.exceptions import ClientError
+from aws_clients import get_client
+from job_inputs import get_optional_args, resolve_input_files
+from schema_resolver import resolve_table_schema
+from casting import project_row
+from validation_rules import REJECT_REASON_COLUMN, VALIDATION_MODES, check_error_rate, reject_reason
+from s3_transfer import DEFAULT_MAX_WORKERS as TRANSFER_MAX_WORKERS, move_objects
+from dynamodb_writer import write_partition
+from ledger import DEFAULT_MAX_WORKERS as LEDGER_MAX_WORKERS, finish_processing, start_processing
+from table_routing import RouteIndex, default_table_route, load_routes
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # Fall back to the csv module when the analytics libraries are not installed
+    pa = None
+    pa_csv = None
+
+# Python shell counterpart of script.py for small files: the same catalog
+# schema and default rules (casting.py), without Spark startup.
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+formatter = logging.Formatter('[GLUE_ETL_JOB] %(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+def read_rows(body):
+    """
+    Parses a CSV object into its header and rows of raw strings.
+
+    Args:
+    - body: The CSV content as bytes.
+
+    Returns:
+    - A tuple of the header column names and a list of row dicts.
+    """
+    text_head = body[:64 * 1024].decode('utf-8-sig', errors='replace')
+    header = next(csv.reader(io.StringIO(text_head.splitlines()[0] if text_head else "")), [])
+    if pa_csv is not None:
+        try:
+            table = pa_csv.read_csv(
+                io.BytesIO(body),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={col_name: pa.string() for col_name in header},
+                    strings_can_be_null=False
+                )
+            )
+            return header, table.to_pylist()
+        except pa.ArrowInvalid:
+            # Lines with more or fewer fields than the header, the csv module keeps them for validation
+            logger.warning("[GLUE_ETL_JOB] File has malformed lines, parsing it with the csv module")
+    return header, list(csv.DictReader(io.StringIO(body.decode('utf-8-sig'))))
+
+def write_rejects(s3_client, bucket, key, rejected_rows):
+    """
+    Writes the rejected rows, raw values with their reason, to one gzip JSON
+    lines object, like validation.write_rejects in the Spark job.
+    """
+    logger.info(f"[GLUE_ETL_JOB] Writing {len(rejected_rows)} rejected rows to s3://{bucket}/{key}")
+    lines = "".join(json.dumps(row) + "\n" for row in rejected_rows)
+    s3_client.put_object(Bucket=bucket, Key=key, Body=gzip.compress(lines.encode('utf-8')))
+
+def process_files(args, s3_client, glue_client, dynamodb_client):
+    source_bucket, source_prefix = args['source_prefix'].split('/', 1)
+    destination_bucket, destination_prefix = args['destination_prefix'].split('/', 1)
+    failed_bucket, failed_prefix = args['failed_prefix'].split('/', 1)
+    temp_bucket, temp_prefix = args['temp_prefix'].split('/', 1)
+
+    ledger_table_name = args['ledger_table_name']
+    if args['validation_mode'] not in VALIDATION_MODES:
+        raise ValueError(f"Unknown validation mode '{args['validation_mode']}', expected one of {VALIDATION_MODES}")
+    validate = args['validation_mode'] == 'quarantine'
+    job_run_id = args['JOB_RUN_ID'] or args['job_name']
+
+    input_files = resolve_input_files(s3_client, args['manifest_path'], args['data_file_name'])
+    # Take the claimed files to processing, files another run owns are dropped
+    if ledger_table_name:
+        input_files = start_processing(dynamodb_client, ledger_table_name, input_files, args['job_name'], job_run_id)
+        if not input_files:
+            logger.info("[GLUE_ETL_JOB] Every file of the batch is processed by another run")
+            return
+
+    # Split the batch by target table like the Spark job, files without a route go to the default table
+    route_index = RouteIndex(load_routes(s3_client, args['routes_path']))
+    default_route = default_table_route(args['table_prefix'], args['dynamodb_table_name'])
+    groups = route_index.group(input_files, default_route)
+    logger.info(f"[GLUE_ETL_JOB] Batch routed to {len(groups)} tables: {[route['name'] for route, _ in groups]}")
+
+    def process_route(route, route_files):
+        data_file_names = [input_file['file_name'] for input_file in route_files]
+        dynamodb_table_name = route['dynamodb_table_name']
+
+        def move_all(destination_bucket, destination_prefix):
+            move_objects(s3_client, [
+                (source_bucket, f"{source_prefix}/{file_name}", destination_bucket, f"{destination_prefix}/{file_name}")
+                for file_name in data_file_names
+            ])
+
+        def record_outcome(status):
+            if ledger_table_name:
+                finish_processing(
+                    dynamodb_client, ledger_table_name, route_files, status, args['job_name'], job_run_id,
+                    int(args['ledger_retention_days'])
+                )
+
+        try:
+            table = resolve_table_schema(
+                glue_client, s3_client, args['database_catalog_name'], route['catalog_table'],
+                temp_bucket, temp_prefix, int(args['schema_cache_ttl_seconds']), exact_name=route['exact_name']
+            )
+            catalog_schema = {col['Name']: col['Type'] for col in table['columns']}
+            logger.info(f"[GLUE_ETL_JOB] Found table: {table['table_name']}")
+
+            def read_file(file_name):
+                logger.info(f"[GLUE_ETL_JOB] Reading file from S3: s3://{source_bucket}/{source_prefix}/{file_name}")
+                body = s3_client.get_object(Bucket=source_bucket, Key=f"{source_prefix}/{file_name}")['Body'].read()
+                header, rows = read_rows(body)
+                if 'id' not in header and 'id' not in catalog_schema:
+                    raise ValueError("'id' column is required as the primary key")
+                return header, rows
+
+            # Count the rejects of the whole batch first, so nothing is written when it fails the error
+            # rate; the files are small and read again for the write
+            if validate:
+                total_rows = 0
+                rejected_rows = []
+                for file_name in data_file_names:
+                    header, rows = read_file(file_name)
+                    total_rows += len(rows)
+                    for row in rows:
+                        reason = reject_reason(row, catalog_schema, header)
+                        if reason:
+                            rejected_rows.append({
+                                **{col_name: value for col_name, value in row.items() if col_name is not None},
+                                REJECT_REASON_COLUMN: reason
+                            })
+                check_error_rate(total_rows, len(rejected_rows), float(args['max_error_rate']))
+                if rejected_rows:
+                    write_rejects(
+                        s3_client, failed_bucket,
+                        f"{failed_prefix}/rejects/{args['job_name']}/{job_run_id}/{table['table_name']}/rejects.json.gz",
+                        rejected_rows
+                    )
+
+            total_items = 0
+            for file_name in data_file_names:
+                header, rows = read_file(file_name)
+                if validate:
+                    rows = (row for row in rows if reject_reason(row, catalog_schema, header) is None)
+                stats = write_partition(
+                    (project_row(row, catalog_schema, header) for row in rows),
+                    dynamodb_table_name,
+                    batch_size=int(args['dynamodb_batch_size']),
+                    max_retries=int(args['dynamodb_max_retries'])
+                )
+                total_items += stats['items']
+
+            logger.info(f"[GLUE_ETL_JOB] Successfully written {total_items} items to DynamoDB table: {dynamodb_table_name}")
+            move_all(destination_bucket, destination_prefix)
+            record_outcome('done')
+            logger.info(f"[GLUE_ETL_JOB] Successfully processed files: {data_file_names}")
+        except Exception as e:
+            logger.error(f"[GLUE_ETL_JOB] Error processing files {data_file_names}: {str(e)}")
+            logger.info(f"[GLUE_ETL_JOB] Moving files to failed folder: s3://{failed_bucket}/{failed_prefix}/")
+            move_all(failed_bucket, failed_prefix)
+            record_outcome('failed')
+            raise
+
+    # One failed table does not stop the others, the run fails with the first error
+    errors = []
+    for route, route_files in groups:
+        try:
+            process_route(route, route_files)
+        except Exception as e:
+            errors.append(e)
+    if errors:
+        raise errors[0]
+
+def handler():
+    logger.info("[GLUE_ETL_JOB] Starting small file job")
+    args = getResolvedOptions(sys.argv, [
+        'job_name',
+        'source_prefix',
+        'destination_prefix',
+        'failed_prefix',
+        'dynamodb_table_name',
+        'table_prefix',
+        'database_catalog_name',
+        'temp_prefix'
+    ])
+    args.update(get_optional_args(sys.argv, {
+        'data_file_name': None,
+        'manifest_path': None,
+        'schema_cache_ttl_seconds': '300',
+        'dynamodb_batch_size': '25',
+        'dynamodb_max_retries': '8',
+        'ledger_table_name': None,
+        'ledger_retention_days': '30',
+        'validation_mode': 'off',
+        'max_error_rate': '0.01',
+        'routes_path': None,
+        'JOB_RUN_ID': None
+    }))
+    logger.info(f"[GLUE_ETL_JOB] Retrieved job parameters: {args}")
+    try:
+        process_files(args, get_client('s3', TRANSFER_MAX_WORKERS), get_client('glue'), get_client('dynamodb', LEDGER_MAX_WORKERS))
+        logger.info("[GLUE_ETL_JOB] Small file job completed successfully")
+    except ClientError as e:
+        logger.error(f"[GLUE_ETL_JOB] Small file job failed: {e.response['Error']['Code']} - {e.response['Error']['Message']}")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"[GLUE_ETL_JOB] Small file job failed: {e}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    handler()
@@ -0,0 +1,120 @@
+import json
+import logging
+import math
+
+logger = logging.getLogger()
+
+MB = 1024 * 1024
+GB = 1024 * MB
+
+# 'off' keeps the Glue defaults, 'auto' picks the profile from the input size
+SPARK_PROFILES = ('off', 'auto', 'small', 'medium', 'large')
+
+# Upper input size of the small and medium profiles
+PROFILE_THRESHOLDS = [('small', 1 * GB), ('medium', 32 * GB)]
+
+# Uncompressed bytes per stored byte of compressed and columnar inputs
+COMPRESSED_EXPANSION = 4
+COMPRESSED_EXTENSIONS = ('.gz', '.zst', '.bz2', '.parquet')
+
+# Shuffle partition size AQE coalesces towards, per profile
+ADVISORY_PARTITION_BYTES = {'small': 64 * MB, 'medium': 128 * MB, 'large': 256 * MB}
+
+# Bounds of spark.sql.shuffle.partitions, a partition gets at least
+# MIN_ROWS_PER_SHUFFLE_PARTITION rows
+MIN_SHUFFLE_PARTITIONS = 8
+MAX_SHUFFLE_PARTITIONS = 4000
+MIN_ROWS_PER_SHUFFLE_PARTITION = 50000
+
+def estimate_input_bytes(input_files):
+    """
+    Estimates the uncompressed size of the input files from their stored
+    sizes, for the profile choice. Pre-split files count their part sizes,
+    which are uncompressed already.
+
+    Args:
+    - input_files: Files from job_inputs.resolve_input_files, sizes looked up.
+    """
+    total = 0
+    for input_file in input_files:
+        if input_file.get('parts'):
+            total += sum(part['bytes'] for part in input_file['parts'])
+        elif input_file['file_name'].lower().endswith(COMPRESSED_EXTENSIONS):
+            total += (input_file['size'] or 0) * COMPRESSED_EXPANSION
+        else:
+            total += input_file['size'] or 0
+    return total
+
+def profile_name_for(input_bytes):
+    for name, threshold in PROFILE_THRESHOLDS:
+        if input_bytes <= threshold:
+            return name
+    return 'large'
+
+def shuffle_partitions(input_bytes, estimated_rows, advisory_bytes):
+    """
+    Returns spark.sql.shuffle.partitions: one partition per advisory_bytes of
+    input, no more than the rows fill, within the shuffle partition bounds.
+    AQE coalesces the partitions of small shuffles at run time.
+    """
+    by_bytes = math.ceil(input_bytes / advisory_bytes)
+    by_rows = math.ceil(estimated_rows / MIN_ROWS_PER_SHUFFLE_PARTITION)
+    return max(MIN_SHUFFLE_PARTITIONS, min(MAX_SHUFFLE_PARTITIONS, by_bytes, by_rows))
+
+def profile_conf(name, input_bytes, estimated_rows):
+    """
+    Returns the Spark settings of a profile: adaptive query execution with
+    partition coalescing and skew handling, shuffle partitions sized to the
+    input, Kryo serialization and Arrow transfers to Python.
+    """
+    advisory_bytes = ADVISORY_PARTITION_BYTES[name]
+    partitions = shuffle_partitions(input_bytes, estimated_rows, advisory_bytes)
+    return {
+        "spark.sql.adaptive.enabled": "true",
+        "spark.sql.adaptive.coalescePartitions.enabled": "true",
+        "spark.sql.adaptive.skewJoin.enabled": "true",
+        "spark.sql.adaptive.advisoryPartitionSizeInBytes": str(advisory_bytes),
+        "spark.sql.shuffle.partitions": str(partitions),
+        "spark.serializer": "org.apache.spark.serializer.KryoSerializer",
+        "spark.kryoserializer.buffer.max": "512m" if name == 'large' else "128m",
+        "spark.sql.execution.arrow.pyspark.enabled": "true",
+        "spark.sql.execution.arrow.pyspark.fallback.enabled": "true",
+    }
+
+def parse_conf_overrides(overrides):
+    """
+    Parses the --spark_conf_overrides argument, a JSON object of Spark
+    settings applied over the profile.
+    """
+    if not overrides:
+        return {}
+    parsed = json.loads(overrides)
+    if not isinstance(parsed, dict):
+        raise ValueError(f"--spark_conf_overrides must be a JSON object, got {overrides}")
+    return {str(key): str(value) for key, value in parsed.items()}
+
+def select_spark_profile(spark_profile, input_bytes, estimated_rows, base_conf=None, overrides=None):
+    """
+    Picks the Spark settings of a run from its input size. The settings must
+    be applied to the SparkConf the SparkContext is created with, as the
+    serializer cannot change afterwards.
+
+    Args:
+    - spark_profile: One of SPARK_PROFILES.
+    - input_bytes: Estimated uncompressed input bytes (estimate_input_bytes).
+    - estimated_rows: Estimated input rows.
+    - base_conf: Settings applied under the profile, such as the file
+      partitioning of the reader.
+    - overrides: Settings applied over the profile.
+
+    Returns:
+    - A tuple of (profile name, dict of Spark settings).
+    """
+    if spark_profile not in SPARK_PROFILES:
+        raise ValueError(f"Unknown Spark profile '{spark_profile}', expected one of {SPARK_PROFILES}")
+    name = profile_name_for(input_bytes) if spark_profile == 'auto' else spark_profile
+    conf = dict(base_conf or {})
+    if name != 'off':
+        conf.update(profile_conf(name, input_bytes, estimated_rows))
+    conf.update(overrides or {})
+    return name, conf
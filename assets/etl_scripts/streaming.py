@@ -0,0 +1,104 @@
+import logging
+from projection import apply_projection
+from validation import check_error_rate, split_rejects, validation_counts
+
+logger = logging.getLogger()
+
+# What the file source does with a file once its micro-batch is committed
+CLEAN_SOURCE_MODES = ('off', 'archive', 'delete')
+
+def read_csv_stream(spark, source_path, schema, max_files_per_trigger, clean_source='off', archive_path=None,
+                    corrupt_record_column=None):
+    """
+    Opens a Structured Streaming file source over CSV files arriving under
+    source_path. The file source remembers the files it has read in the
+    query checkpoint, so each file is processed once.
+
+    A stream has a single schema, read by position: every file must carry
+    the schema columns in the same order. The header of each file is checked
+    against it, a file with another header stops the query rather than being
+    loaded under the wrong columns.
+
+    Args:
+    - spark: The SparkSession.
+    - source_path: Folder watched for new files (s3:// or a local path).
+    - schema: The StructType returned by readers.catalog_struct_type.
+    - max_files_per_trigger: Maximum number of new files per micro-batch.
+    - clean_source: One of CLEAN_SOURCE_MODES.
+    - archive_path: Folder processed files are moved to with clean_source 'archive'.
+    - corrupt_record_column: Optional column of the schema receiving unparseable records.
+    """
+    if clean_source not in CLEAN_SOURCE_MODES:
+        raise ValueError(f"Unknown clean source mode '{clean_source}', expected one of {CLEAN_SOURCE_MODES}")
+    if clean_source == 'archive' and not archive_path:
+        raise ValueError("archive_path is required when clean_source is 'archive'")
+
+    reader = (
+        spark.readStream
+        .schema(schema)
+        .option("header", "true")
+        .option("enforceSchema", "false")
+        .option("mode", "PERMISSIVE")
+        .option("maxFilesPerTrigger", str(max_files_per_trigger))
+        .option("cleanSource", clean_source)
+    )
+    if clean_source == 'archive':
+        reader = reader.option("sourceArchiveDir", archive_path)
+    if corrupt_record_column:
+        reader = reader.option("columnNameOfCorruptRecord", corrupt_record_column)
+    logger.info(f"[GLUE_ETL_JOB] Streaming CSV files from {source_path} ({max_files_per_trigger} files per trigger, clean source {clean_source})")
+    return reader.csv(source_path)
+
+def projected_batch_writer(catalog_schema, write_batch, validate=False, max_error_rate=0.0, write_rejects=None):
+    """
+    Wraps write_batch(df, batch_id) into a foreachBatch function that applies
+    the catalog projection to every micro-batch and skips empty ones.
+
+    With validate, the rows are checked with the same rules as the batch
+    job: the rejected rows go to write_rejects(df, batch_id) and the rest to
+    write_batch. A micro-batch above max_error_rate raises ErrorRateExceeded,
+    which stops the query before anything of it is written.
+    """
+    def process_batch(batch_df, batch_id):
+        if not batch_df.head(1):
+            logger.info(f"[GLUE_ETL_JOB] Micro-batch {batch_id} is empty")
+            return
+        projected = apply_projection(batch_df, catalog_schema, validate=validate)
+        if not validate:
+            write_batch(projected, batch_id)
+            logger.info(f"[GLUE_ETL_JOB] Micro-batch {batch_id} written")
+            return
+        validated = projected.persist()
+        try:
+            total_rows, rejected_rows = validation_counts(validated)
+            check_error_rate(total_rows, rejected_rows, max_error_rate)
+            accepted, rejected = split_rejects(validated)
+            if rejected_rows:
+                write_rejects(rejected, batch_id)
+            write_batch(accepted, batch_id)
+        finally:
+            validated.unpersist()
+        logger.info(f"[GLUE_ETL_JOB] Micro-batch {batch_id} written ({rejected_rows} of {total_rows} rows rejected)")
+    return process_batch
+
+def start_stream(df, process_batch, checkpoint_location, trigger_interval_seconds, once=False):
+    """
+    Starts the streaming query that hands every micro-batch to process_batch.
+
+    Args:
+    - df: The streaming DataFrame.
+    - process_batch: Function of (batch DataFrame, batch id), see projected_batch_writer.
+    - checkpoint_location: Folder of the query offsets and file source log.
+    - trigger_interval_seconds: Interval between micro-batches.
+    - once: Process the files available now in one micro-batch and stop.
+
+    Returns:
+    - The StreamingQuery.
+    """
+    writer = df.writeStream.foreachBatch(process_batch).option("checkpointLocation", checkpoint_location)
+    if once:
+        writer = writer.trigger(once=True)
+    else:
+        writer = writer.trigger(processingTime=f"{trigger_interval_seconds} seconds")
+    logger.info(f"[GLUE_ETL_JOB] Starting streaming query, checkpoint {checkpoint_location}")
+    return writer.start()
@@ -0,0 +1,154 @@
+import sys
+import logging
+from awsglue.utils import getResolvedOptions
+from awsglue.context import GlueContext
+from awsglue.dynamicframe import DynamicFrame
+from pyspark.context import SparkContext
+from aws_clients import LazyClient
+from job_inputs import get_optional_args
+from schema_resolver import resolve_table_schema
+from readers import catalog_struct_type
+from dynamodb_writer import WRITERS, connector_options, write_with_batch_api
+from projection import CORRUPT_RECORD_COLUMN
+from streaming import projected_batch_writer, read_csv_stream, start_stream
+from table_routing import load_routes
+from validation import VALIDATION_MODES, write_rejects
+
+# Long-running counterpart of script.py for feeds that drop files every few
+# seconds: one streaming query instead of a job run per file or batch. It
+# loads a single table (the table_prefix catalog table into the job's
+# DynamoDB table), from files in catalog column order; table routes are
+# only supported by the batch jobs.
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+formatter = logging.Formatter('[GLUE_ETL_JOB] %(asctime)s - %(name)s - %(levelname)s - %(message)s')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+logger.info("[GLUE_ETL_JOB] Starting streaming script execution")
+
+# Initialize Glue and Spark contexts
+sc = SparkContext()
+glueContext = GlueContext(sc)
+glue_client = LazyClient('glue')
+s3_client = LazyClient('s3')
+
+# Get job parameters from the Glue job
+args = getResolvedOptions(sys.argv, [
+    'job_name',
+    'stream_source_prefix',
+    'destination_prefix',
+    'dynamodb_table_name',
+    'table_prefix',
+    'database_catalog_name',
+    'temp_prefix'
+])
+args.update(get_optional_args(sys.argv, {
+    'schema_cache_ttl_seconds': '300',
+    'trigger_interval_seconds': '60',
+    'max_files_per_trigger': '100',
+    'clean_source': 'archive',
+    'dynamodb_writer': 'connector',
+    'dynamodb_write_percent': '0.5',
+    'dynamodb_parallel_tasks': '0',
+    'dynamodb_batch_size': '25',
+    'dynamodb_max_retries': '8',
+    'validation_mode': 'off',
+    'max_error_rate': '0.0',
+    'failed_prefix': None,
+    'routes_path': None
+}))
+logger.info(f"[GLUE_ETL_JOB] Retrieved job parameters: {args}")
+
+job_name = args['job_name']
+temp_bucket, temp_prefix = args['temp_prefix'].split('/', 1)
+dynamodb_table_name = args['dynamodb_table_name']
+dynamodb_writer = args['dynamodb_writer']
+validation_mode = args['validation_mode']
+
+def write_batch(df, batch_id):
+    """
+    Writes one projected micro-batch to DynamoDB with the configured writer.
+    """
+    if dynamodb_writer == 'batch':
+        write_with_batch_api(
+            glueContext.spark_session, df, dynamodb_table_name,
+            batch_size=int(args['dynamodb_batch_size']),
+            max_retries=int(args['dynamodb_max_retries'])
+        )
+    else:
+        glueContext.write_dynamic_frame.from_options(
+            frame=DynamicFrame.fromDF(df, glueContext, f"batch_{batch_id}"),
+            connection_type="dynamodb",
+            connection_options=connector_options(
+                dynamodb_table_name, args['dynamodb_write_percent'], args['dynamodb_parallel_tasks']
+            )
+        )
+
+def write_batch_rejects(df, batch_id):
+    """
+    Writes the rejected rows of one micro-batch under failed/rejects/, the
+    same layout as the batch job with the micro-batch in place of the run.
+    """
+    write_rejects(df, f"s3://{args['failed_prefix']}/rejects/{job_name}/batch={batch_id}/{args['table_prefix']}/")
+
+def process_stream():
+    if dynamodb_writer not in WRITERS:
+        raise ValueError(f"Unknown DynamoDB writer '{dynamodb_writer}', expected one of {WRITERS}")
+    if validation_mode not in VALIDATION_MODES:
+        raise ValueError(f"Unknown validation mode '{validation_mode}', expected one of {VALIDATION_MODES}")
+    validate = validation_mode == 'quarantine'
+    if validate and not args['failed_prefix']:
+        raise ValueError("--failed_prefix is required when --validation_mode is 'quarantine'")
+    # Routed files would be loaded into the default table here, refuse to start instead
+    routes = load_routes(s3_client, args['routes_path'])
+    if routes:
+        raise ValueError(
+            f"The streaming job loads a single table, but {len(routes)} table routes are configured in "
+            f"s3://{args['routes_path']}; route the files with the batch jobs instead"
+        )
+
+    # The schema is resolved once; restart the job to pick up a new table version
+    table = resolve_table_schema(
+        glue_client, s3_client, args['database_catalog_name'], args['table_prefix'],
+        temp_bucket, temp_prefix, int(args['schema_cache_ttl_seconds'])
+    )
+    catalog_schema = {col['Name']: col['Type'] for col in table['columns']}
+    logger.info(f"[GLUE_ETL_JOB] Found table: {table['table_name']}, schema: {catalog_schema}")
+    if 'id' not in catalog_schema:
+        raise ValueError("'id' column is required as the primary key")
+
+    # Files are expected in catalog column order, headers are validated against it
+    corrupt_record_column = CORRUPT_RECORD_COLUMN if validate else None
+    df = read_csv_stream(
+        glueContext.spark_session,
+        f"s3://{args['stream_source_prefix']}/",
+        catalog_struct_type(catalog_schema, list(catalog_schema), corrupt_record_column),
+        int(args['max_files_per_trigger']),
+        clean_source=args['clean_source'],
+        archive_path=f"s3://{args['destination_prefix']}/",
+        corrupt_record_column=corrupt_record_column
+    )
+    query = start_stream(
+        df,
+        projected_batch_writer(
+            catalog_schema, write_batch, validate, float(args['max_error_rate']), write_batch_rejects
+        ),
+        f"s3://{temp_bucket}/{temp_prefix}/checkpoints/{job_name}/",
+        int(args['trigger_interval_seconds'])
+    )
+    query.awaitTermination()
+
+def handler():
+    logger.info("[GLUE_ETL_JOB] Starting streaming ETL job")
+    try:
+        process_stream()
+    except Exception as e:
+        logger.error(f"[GLUE_ETL_JOB] Streaming ETL job failed: {e}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    handler()
@@ -0,0 +1,129 @@
+import fnmatch
+import json
+import logging
+import re
+from xml.sax.saxutils import quoteattr
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+WILDCARD_CHARACTERS = set("*?[")
+
+def load_routes(s3_client, routes_path):
+    """
+    Reads the route config (bucket/key of a JSON document with a "routes"
+    list). A missing document means no routes, so every file goes to the
+    default table.
+
+    Each route has a file name pattern (fnmatch syntax), the catalog table
+    and the DynamoDB table, and optionally a name, FAIR scheduler pool and
+    the weight and minimum share (in cores) of the pool:
+    {"name": "orders", "pattern": "orders_*.csv", "catalog_table": "glue_poc_orders",
+     "dynamodb_table_name": "orders", "pool": "orders", "weight": 2, "min_share": 4}
+    """
+    if not routes_path:
+        return []
+    bucket, key = routes_path.split('/', 1)
+    try:
+        config = json.loads(s3_client.get_object(Bucket=bucket, Key=key)['Body'].read())
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('NoSuchKey', '404'):
+            raise
+        logger.info(f"[GLUE_ETL_JOB] No route config at s3://{routes_path}, using the default table")
+        return []
+    routes = []
+    for route in config.get('routes', []):
+        name = route.get('name', route['catalog_table'])
+        routes.append({
+            'name': name,
+            'pattern': route['pattern'],
+            'catalog_table': route['catalog_table'],
+            'exact_name': True,
+            'dynamodb_table_name': route['dynamodb_table_name'],
+            'pool': route.get('pool', name),
+            'weight': int(route.get('weight', 1)),
+            'min_share': int(route.get('min_share', 0)),
+        })
+    logger.info(f"[GLUE_ETL_JOB] Loaded {len(routes)} table routes from s3://{routes_path}")
+    return routes
+
+def default_table_route(table_prefix, dynamodb_table_name):
+    """
+    Route of files no pattern matches: the first catalog table with the
+    prefix and the job's DynamoDB table, as before routing existed.
+    """
+    return {
+        'name': 'default',
+        'pattern': None,
+        'catalog_table': table_prefix,
+        'exact_name': False,
+        'dynamodb_table_name': dynamodb_table_name,
+        'pool': 'default',
+        'weight': 1,
+        'min_share': 0,
+    }
+
+def scheduler_allocation_xml(routes, default_route):
+    """
+    Returns the FAIR scheduler allocation file (spark.scheduler.allocation.file)
+    with one pool per route pool, the first route of a shared pool sets its
+    weight and minimum share. Without it Spark creates the pools with weight
+    1 and no minimum share when they are first used.
+    """
+    pools = {}
+    for route in [default_route] + list(routes):
+        pools.setdefault(route['pool'], route)
+    lines = ['<?xml version="1.0"?>', '<allocations>']
+    for pool, route in pools.items():
+        lines.extend([
+            f'  <pool name={quoteattr(pool)}>',
+            '    <schedulingMode>FIFO</schedulingMode>',
+            f"    <weight>{route['weight']}</weight>",
+            f"    <minShare>{route['min_share']}</minShare>",
+            '  </pool>',
+        ])
+    lines.append('</allocations>')
+    return "\n".join(lines) + "\n"
+
+class RouteIndex:
+    """
+    Lookup index over the routes, built once per job: patterns without
+    wildcards are a dict lookup, the others are compiled once and tried in
+    config order, the first match wins (exact names win over patterns). Results are memoized per file name.
+    """
+    def __init__(self, routes):
+        self.routes = routes
+        self._literal = {}
+        self._patterns = []
+        for route in routes:
+            if WILDCARD_CHARACTERS & set(route['pattern']):
+                self._patterns.append((re.compile(fnmatch.translate(route['pattern'])), route))
+            else:
+                self._literal.setdefault(route['pattern'], route)
+        self._memo = {}
+
+    def lookup(self, file_name):
+        """
+        Returns the route of a file name, None when no pattern matches.
+        """
+        if file_name in self._memo:
+            return self._memo[file_name]
+        route = self._literal.get(file_name)
+        if route is None:
+            route = next((route for pattern, route in self._patterns if pattern.match(file_name)), None)
+        self._memo[file_name] = route
+        return route
+
+    def group(self, input_files, default_route):
+        """
+        Groups the input files of a batch by route, in order of first
+        appearance.
+
+        Returns:
+        - A list of (route, input files) tuples.
+        """
+        groups = {}
+        for input_file in input_files:
+            route = self.lookup(input_file['file_name']) or default_route
+            groups.setdefault(route['name'], (route, []))[1].append(input_file)
+        return list(groups.values())
@@ -0,0 +1,39 @@
+import logging
+from pyspark.sql.functions import col, count
+from projection import CORRUPT_RECORD_COLUMN, REJECT_REASON_COLUMN
+# The rules without Spark live in validation_rules.py, shared with the Python shell job
+from validation_rules import VALIDATION_MODES, ErrorRateExceeded, check_error_rate
+
+logger = logging.getLogger()
+
+def validation_counts(validated_df):
+    """
+    Counts all rows and rejected rows of a validated (and persisted)
+    DataFrame in one aggregation.
+
+    Returns:
+    - A tuple of (total rows, rejected rows).
+    """
+    totals = validated_df.agg(
+        count("*").alias("rows"),
+        count(col(REJECT_REASON_COLUMN)).alias("rejected")
+    ).collect()[0]
+    return totals["rows"], totals["rejected"]
+
+def split_rejects(validated_df):
+    """
+    Splits a validated DataFrame into the rows to write, without the
+    validation columns, and the rejected rows with their reason.
+    """
+    helper_columns = [c for c in (REJECT_REASON_COLUMN, CORRUPT_RECORD_COLUMN) if c in validated_df.columns]
+    accepted = validated_df.filter(col(REJECT_REASON_COLUMN).isNull()).drop(*helper_columns)
+    rejected = validated_df.filter(col(REJECT_REASON_COLUMN).isNotNull())
+    return accepted, rejected
+
+def write_rejects(rejected_df, path):
+    """
+    Writes the rejected rows with their reason (and the raw line of malformed
+    records) to a single gzip JSON lines file under path.
+    """
+    logger.info(f"[GLUE_ETL_JOB] Writing rejected rows to {path}")
+    rejected_df.coalesce(1).write.mode("overwrite").option("compression", "gzip").json(path)
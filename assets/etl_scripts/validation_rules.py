@@ -0,0 +1,57 @@
+import logging
+from casting import cast_value
+
+# Validation rules shared by the Spark job (projection.py, validation.py) and
+# the Python shell job (small_file_job.py), so both quarantine the same rows
+# with the same reasons.
+
+logger = logging.getLogger()
+
+VALIDATION_MODES = ('off', 'quarantine')
+
+# Column holding why a row is rejected, null for rows that passed
+REJECT_REASON_COLUMN = "_reject_reason"
+
+class ErrorRateExceeded(Exception):
+    """
+    Raised when the share of rejected rows is above the configured maximum.
+    """
+
+def check_error_rate(total, rejected, max_error_rate):
+    """
+    Logs the validation counts and raises ErrorRateExceeded when the share of
+    rejected rows is above max_error_rate.
+    """
+    error_rate = rejected / total if total else 0.0
+    logger.info(f"[GLUE_ETL_JOB] Validation: {total} rows, {rejected} rejected ({error_rate:.4%}, max {max_error_rate:.4%})")
+    if error_rate > max_error_rate:
+        raise ErrorRateExceeded(
+            f"{rejected} of {total} rows rejected ({error_rate:.4%}), above the maximum error rate {max_error_rate:.4%}"
+        )
+    return error_rate
+
+def reject_reason(row, catalog_schema, source_columns):
+    """
+    Returns why a raw CSV row cannot be written, None when it passes. The
+    same rules as projection._reject_reason: malformed_record for a line
+    with more or fewer fields than the header, missing_id, and
+    invalid_<col> for a present value that does not cast to its type.
+
+    Args:
+    - row: Mapping of column name to the raw CSV string (csv.DictReader puts
+      extra fields under None and fills missing fields with None).
+    - catalog_schema: Mapping of column name to catalog type.
+    - source_columns: Column names of the CSV header.
+    """
+    reasons = []
+    if None in row or any(row.get(col_name) is None for col_name in source_columns):
+        reasons.append("malformed_record")
+    if 'id' not in source_columns or not row.get('id'):
+        reasons.append("missing_id")
+    for col_name in source_columns:
+        if col_name in catalog_schema or col_name == 'id':
+            target_type = 'bigint' if col_name == 'id' else catalog_schema[col_name]
+            value = row.get(col_name)
+            if value and cast_value(value, target_type) is None:
+                reasons.append(f"invalid_{col_name}")
+    return ",".join(reasons) or None
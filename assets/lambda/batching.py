@@ -0,0 +1,108 @@
+import json
+import time
+import urllib.parse
+import uuid
+
+
+def extract_s3_objects(event):
+    """
+    Flattens an S3 notification event, or an SQS batch of S3 notifications,
+    into a list of uploaded objects.
+
+    Args:
+    - event: The Lambda event.
+
+    Returns:
+    - A list of dicts with bucket, key, file_name, size, version_id, etag
+      and message_id.
+    """
+    objects = []
+    for record in event.get('Records', []):
+        if record.get('eventSource') == 'aws:sqs':
+            body = json.loads(record['body'])
+            # S3 sends an s3:TestEvent message when the notification is created
+            for s3_record in body.get('Records', []):
+                objects.append(_to_object(s3_record, record['messageId']))
+        elif 's3' in record:
+            objects.append(_to_object(record, None))
+    return objects
+
+
+def _to_object(record, message_id):
+    bucket_name = urllib.parse.unquote_plus(record['s3']['bucket']['name'])
+    file_key = urllib.parse.unquote_plus(record['s3']['object']['key'])
+    return {
+        'bucket': bucket_name,
+        'key': file_key,
+        'file_name': file_key.split('/')[-1],
+        'size': int(record['s3']['object'].get('size', 0)),
+        'version_id': record['s3']['object'].get('versionId', ''),
+        'etag': record['s3']['object'].get('eTag', ''),
+        'message_id': message_id,
+    }
+
+
+def build_batches(objects, max_files, max_bytes):
+    """
+    Splits uploaded objects into batches that each stay within the file count
+    and byte size thresholds. A single object larger than max_bytes still
+    gets a batch of its own.
+
+    Args:
+    - objects: Objects returned by extract_s3_objects.
+    - max_files: Maximum number of objects per batch.
+    - max_bytes: Maximum total object size per batch.
+
+    Returns:
+    - A list of batches, each a list of objects.
+    """
+    batches = []
+    current = []
+    current_bytes = 0
+    for obj in objects:
+        if current and (len(current) >= max_files or current_bytes + obj['size'] > max_bytes):
+            batches.append(current)
+            current = []
+            current_bytes = 0
+        current.append(obj)
+        current_bytes += obj['size']
+    if current:
+        batches.append(current)
+    return batches
+
+
+def write_manifest(s3_client, bucket_name, temp_folder, batch):
+    """
+    Writes a manifest listing every object in the batch under the temp folder.
+
+    Args:
+    - s3_client: boto3 S3 client.
+    - bucket_name: Bucket the manifest is written to.
+    - temp_folder: Temp folder prefix inside the bucket.
+    - batch: A batch returned by build_batches.
+
+    Returns:
+    - The manifest path in the form bucket/key, as expected by the Glue job.
+    """
+    manifest_key = f"{temp_folder}/manifests/{time.strftime('%Y/%m/%d')}/{uuid.uuid4()}.json"
+    manifest = {
+        'created_at': int(time.time()),
+        'files': [
+            {
+                'key': obj['key'],
+                'file_name': obj['file_name'],
+                'size': obj['size'],
+                'version_id': obj.get('version_id', ''),
+                'etag': obj.get('etag', ''),
+                'ledger_id': obj.get('ledger_id'),
+            }
+            for obj in batch
+        ],
+    }
+    s3_client.put_object(
+        Bucket=bucket_name,
+        Key=manifest_key,
+        Body=json.dumps(manifest).encode('utf-8'),
+        ContentType='application/json'
+    )
+    return f"{bucket_name}/{manifest_key}"
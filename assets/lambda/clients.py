@@ -0,0 +1,52 @@
+import os
+import boto3
+from botocore.config import Config
+
+# boto3 clients shared by the invocations of a Lambda execution environment.
+# A client is built on the first invocation that needs it; warm invocations
+# reuse it together with its open (keep-alive) connections.
+
+# Attempts per call in adaptive retry mode. Kept low, as throttled job starts
+# are retried by scheduler.start_job_run and then through the queue.
+MAX_ATTEMPTS = 3
+
+_clients = {}
+
+def client_config():
+    options = {
+        'retries': {'mode': 'adaptive', 'max_attempts': MAX_ATTEMPTS},
+        'connect_timeout': 3,
+        'read_timeout': 10,
+    }
+    try:
+        return Config(tcp_keepalive=True, **options)
+    except TypeError:  # botocore releases before tcp_keepalive
+        return Config(**options)
+
+def endpoint_url(service_name):
+    """
+    Returns the endpoint of a service from AWS_ENDPOINT_URL_<SERVICE> or
+    AWS_ENDPOINT_URL, so tests and benchmarks can use local stand-ins.
+    """
+    service_variable = f"AWS_ENDPOINT_URL_{service_name.upper().replace('-', '_')}"
+    return os.environ.get(service_variable) or os.environ.get('AWS_ENDPOINT_URL')
+
+def get_client(service_name):
+    """
+    Returns the shared client of a service, building it on first use.
+    """
+    client = _clients.get(service_name)
+    if client is None:
+        client = _clients[service_name] = boto3.client(
+            service_name, endpoint_url=endpoint_url(service_name), config=client_config()
+        )
+    return client
+
+def set_client(service_name, client):
+    """
+    Injects the client returned for a service, for tests.
+    """
+    _clients[service_name] = client
+
+def reset_clients():
+    _clients.clear()
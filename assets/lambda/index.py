@@ -1,60 +1,169 @@
 import json
-import boto3
 import os
-import urllib.parse
+import time
+
+from clients import get_client
+from batching import build_batches, extract_s3_objects, write_manifest
+from routing import spark_workers, split_by_size, split_presplit
+from trigger_ledger import claim, ledger_id, release
+from scheduler import JobRunThrottled, defer_messages, queue_depth, queue_messages, start_job_run, wait_seconds
+from trigger_metrics import emf_document, emit, size_bucket
 
 def lambda_handler(event, context):
-    # Initialize Glue and SSM clients
-    glue = boto3.client('glue')
-    ssm = boto3.client('ssm')
+    # Glue, S3, DynamoDB and SQS clients, built once per execution environment
+    glue = get_client('glue')
+    s3 = get_client('s3')
+    dynamodb = get_client('dynamodb')
+    sqs = get_client('sqs')
     print(event)
-    
-    # Extract the bucket name and key (file name) from the S3 event
-    bucket_name = event['Records'][0]['s3']['bucket']['name']
-    file_key = event['Records'][0]['s3']['object']['key']
-
-    # Decode the bucket name and file key
-    bucket_name = urllib.parse.unquote_plus(bucket_name)
-    file_key = urllib.parse.unquote_plus(file_key)
-
-    print(bucket_name)
-    print(file_key)
-    
-    # Get the file name from the file_key
-    file_name = file_key.split('/')[-1]
-
-    print(file_name)
-    
-    # Get the Glue job name from SSM parameter store
+
+    # Extract every uploaded object from the (SQS-buffered) S3 events
+    objects = extract_s3_objects(event)
+    if not objects:
+        print("No S3 objects found in event")
+        return {
+            'statusCode': 200,
+            'body': json.dumps('No files to process'),
+            'batchItemFailures': []
+        }
+
+    print(f"Received {len(objects)} uploaded files")
+
+    # Get the Glue job name and batching settings from the environment
     try:
         job_name = os.environ['glue_job_name']
+        bucket_name = os.environ['bucket_name']
+        temp_folder = os.environ['temp_folder']
+        max_batch_files = int(os.environ.get('max_batch_files', '1000'))
+        max_batch_bytes = int(os.environ.get('max_batch_bytes', str(1024 ** 3)))
+        small_file_job_name = os.environ['small_file_job_name']
+        small_file_threshold = int(os.environ.get('small_file_threshold_bytes', str(50 * 1024 ** 2)))
+        bytes_per_worker = int(os.environ.get('bytes_per_worker', str(2 * 1024 ** 3)))
+        min_workers = int(os.environ.get('min_workers', '2'))
+        max_workers = int(os.environ.get('max_workers', '10'))
+        worker_type = os.environ.get('worker_type', 'G.1X')
+        presplit_job_name = os.environ.get('presplit_job_name')
+        presplit_threshold = int(os.environ.get('presplit_threshold_bytes', str(1024 ** 3)))
+        ledger_table_name = os.environ.get('ledger_table_name')
+        queue_url = os.environ.get('queue_url')
+        start_max_attempts = int(os.environ.get('start_max_attempts', '3'))
+        retry_base_delay_seconds = int(os.environ.get('retry_base_delay_seconds', '30'))
+        retry_max_delay_seconds = int(os.environ.get('retry_max_delay_seconds', '900'))
         print(job_name)
     except Exception as e:
-        print(f"Error retrieving Glue job name from SSM: {str(e)}")
+        print(f"Error retrieving Glue job settings: {str(e)}")
         return {
             'statusCode': 500,
             'body': json.dumps('Error retrieving Glue job name')
         }
-    
-    print(f"New file uploaded: {file_name} in bucket {bucket_name}")
-        
-    # Start the Glue job
-    try:
-        response = glue.start_job_run(
-            JobName=job_name,
-            Arguments={
-                '--data_file_name': file_name
-            }
-        )
-        print(f"Started Glue job: {response['JobRunId']}")
-    except Exception as e:
-        print(f"Error starting Glue job: {str(e)}")
+
+    # Report how long uploads waited for a job run and how much work is pending
+    messages = queue_messages(event)
+    invocation_metrics = {'UploadsReceived': (len(objects), 'Count')}
+    if messages:
+        invocation_metrics['QueueWait'] = (round(wait_seconds(messages, time.time()) * 1000, 3), 'Milliseconds')
+        if queue_url:
+            depth = queue_depth(sqs, queue_url)
+            invocation_metrics['QueueDepth'] = (depth['visible'], 'Count')
+            invocation_metrics['QueueInFlight'] = (depth['in_flight'], 'Count')
+
+    # Drop duplicate deliveries of an upload before they start a job run
+    if ledger_table_name:
+        claimed = []
+        for obj in objects:
+            obj['ledger_id'] = ledger_id(obj)
+            if claim(dynamodb, ledger_table_name, obj):
+                claimed.append(obj)
+        print(f"Claimed {len(claimed)} files, dropped {len(objects) - len(claimed)} duplicate deliveries")
+        invocation_metrics['DuplicatesDropped'] = (len(objects) - len(claimed), 'Count')
+        objects = claimed
+    emit(emf_document({'JobName': job_name}, invocation_metrics))
+
+    # Large gzip files are split first, each in a run of its own
+    presplit_objects = []
+    if presplit_job_name:
+        presplit_objects, objects = split_presplit(objects, presplit_threshold)
+        if presplit_objects:
+            print(f"Routing {len(presplit_objects)} large gzip files to {presplit_job_name}")
+
+    # Small files go to the Python shell job, large ones to the Spark job
+    small_objects, large_objects = split_by_size(objects, small_file_threshold)
+    print(f"Routing {len(small_objects)} files to {small_file_job_name} and {len(large_objects)} files to {job_name}")
+    batches = [(presplit_job_name, [obj]) for obj in presplit_objects]
+    batches += [(small_file_job_name, batch) for batch in build_batches(small_objects, max_batch_files, max_batch_bytes)]
+    batches += [(job_name, batch) for batch in build_batches(large_objects, max_batch_files, max_batch_bytes)]
+
+    # Flush one manifest and one Glue job run per batch
+    failed_message_ids = set()
+    job_run_ids = []
+    for batch_job_name, batch in batches:
+        batch_bytes = sum(obj['size'] for obj in batch)
+        batch_metrics = {'Files': (len(batch), 'Count'), 'Bytes': (batch_bytes, 'Bytes')}
+        batch_messages = [messages[obj['message_id']] for obj in batch if obj['message_id'] in messages]
+        try:
+            manifest_path = write_manifest(s3, bucket_name, temp_folder, batch)
+            print(f"Wrote manifest for {len(batch)} files: s3://{manifest_path}")
+
+            run_options = {}
+            if batch_job_name == job_name:
+                # Size the Spark job to the batch
+                run_options['WorkerType'] = worker_type
+                run_options['NumberOfWorkers'] = spark_workers(
+                    batch_bytes, bytes_per_worker, min_workers, max_workers
+                )
+
+            response = start_job_run(
+                glue,
+                max_attempts=start_max_attempts,
+                JobName=batch_job_name,
+                Arguments={
+                    '--manifest_path': manifest_path
+                },
+                **run_options
+            )
+            job_run_ids.append(response['JobRunId'])
+            print(f"Started Glue job: {response['JobRunId']}")
+            batch_metrics['JobRunsStarted'] = (1, 'Count')
+            if batch_messages:
+                # Time from the oldest upload notification of the batch to its job run
+                oldest = min(message['sent_timestamp'] for message in batch_messages)
+                batch_metrics['TriggerLatency'] = (round(time.time() * 1000 - oldest, 3), 'Milliseconds')
+        except Exception as e:
+            print(f"Error starting Glue job: {str(e)}")
+            batch_metrics['JobRunStartFailures'] = (1, 'Count')
+            batch_metrics['ThrottledStarts'] = (int(isinstance(e, JobRunThrottled)), 'Count')
+            if ledger_table_name:
+                for obj in batch:
+                    release(dynamodb, ledger_table_name, obj)
+            # Back off throttled messages in the queue instead of retrying them at once
+            batch_message_ids = {obj['message_id'] for obj in batch if obj['message_id']}
+            if isinstance(e, JobRunThrottled) and queue_url and batch_message_ids:
+                delays = defer_messages(
+                    sqs, queue_url,
+                    {message_id: messages[message_id] for message_id in batch_message_ids if message_id in messages},
+                    retry_base_delay_seconds, retry_max_delay_seconds
+                )
+                print(f"Deferred {len(delays)} throttled messages for up to {max(delays.values(), default=0)}s")
+            failed_message_ids.update(obj['message_id'] for obj in batch if obj['message_id'])
+            if not any(obj['message_id'] for obj in batch):
+                return {
+                    'statusCode': 500,
+                    'body': json.dumps('Error starting Glue job')
+                }
+        finally:
+            emit(emf_document({'JobName': batch_job_name, 'FileSizeBucket': size_bucket(batch_bytes)}, batch_metrics))
+
+    # Messages of failed batches are returned to the queue and retried
+    if failed_message_ids:
+        print(f"Returning {len(failed_message_ids)} messages to the queue for retry")
         return {
             'statusCode': 500,
-            'body': json.dumps('Error starting Glue job')
+            'body': json.dumps('Error starting Glue job for some batches'),
+            'batchItemFailures': [{'itemIdentifier': message_id} for message_id in sorted(failed_message_ids)]
         }
-        
+
     return {
         'statusCode': 200,
-        'body': json.dumps('Glue job triggered successfully')
+        'body': json.dumps(f"Glue job triggered successfully: {job_run_ids}"),
+        'batchItemFailures': []
     }
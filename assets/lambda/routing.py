@@ -0,0 +1,41 @@
+import math
+
+# Compressed and non-CSV inputs, which only the Spark job's reader handles
+SPARK_ONLY_EXTENSIONS = ('.gz', '.zst', '.bz2', '.json', '.jsonl', '.ndjson', '.parquet')
+
+def _shell_readable(obj):
+    return not obj.get('file_name', '').lower().endswith(SPARK_ONLY_EXTENSIONS)
+
+def split_by_size(objects, small_file_threshold):
+    """
+    Splits uploaded objects into files for the Python shell engine (plain
+    CSV smaller than small_file_threshold bytes) and files for the Spark job.
+
+    Returns:
+    - A tuple of (small objects, large objects).
+    """
+    small = [obj for obj in objects if obj['size'] < small_file_threshold and _shell_readable(obj)]
+    large = [obj for obj in objects if obj['size'] >= small_file_threshold or not _shell_readable(obj)]
+    return small, large
+
+def split_presplit(objects, presplit_threshold):
+    """
+    Splits uploaded objects into gzip files of at least presplit_threshold
+    bytes, which a single Spark task would read, and the other objects.
+
+    Returns:
+    - A tuple of (objects to pre-split, other objects).
+    """
+    presplit = [obj for obj in objects if _needs_presplit(obj, presplit_threshold)]
+    others = [obj for obj in objects if not _needs_presplit(obj, presplit_threshold)]
+    return presplit, others
+
+def _needs_presplit(obj, presplit_threshold):
+    return obj['size'] >= presplit_threshold and obj.get('file_name', '').lower().endswith('.gz')
+
+def spark_workers(total_bytes, bytes_per_worker, min_workers, max_workers):
+    """
+    Returns the number of Glue workers for a Spark job run over total_bytes
+    of input, one worker per bytes_per_worker within [min_workers, max_workers].
+    """
+    return max(min_workers, min(max_workers, math.ceil(total_bytes / bytes_per_worker)))
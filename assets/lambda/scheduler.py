@@ -0,0 +1,140 @@
+import random
+import time
+
+from botocore.exceptions import ClientError
+
+# Errors that mean Glue is at its concurrency limit rather than a broken request
+THROTTLE_ERRORS = ('ConcurrentRunsExceededException', 'ThrottlingException')
+
+# ChangeMessageVisibilityBatch accepts at most 10 entries per call
+MAX_VISIBILITY_BATCH = 10
+
+# SQS caps the visibility timeout at 12 hours
+MAX_VISIBILITY_SECONDS = 12 * 3600
+
+
+class JobRunThrottled(Exception):
+    """
+    Raised when a job run could not be started within the retry budget
+    because the job is at its concurrency limit.
+    """
+
+
+def backoff_delay(attempt, base_delay, max_delay, rng=random.random):
+    """
+    Returns the full-jitter delay before retry number attempt (0-based): a
+    random value up to base_delay * 2**attempt, capped at max_delay.
+    """
+    return rng() * min(max_delay, base_delay * 2 ** attempt)
+
+
+def start_job_run(glue_client, max_attempts=3, base_delay=0.5, max_delay=8.0, sleep=time.sleep, **start_kwargs):
+    """
+    Starts a Glue job run, retrying throttled starts with jittered backoff.
+
+    Args:
+    - glue_client: boto3 Glue client.
+    - max_attempts: Number of start_job_run calls before giving up.
+    - base_delay, max_delay: Backoff settings in seconds.
+    - sleep: Function used to wait, for tests.
+    - start_kwargs: Arguments of start_job_run.
+
+    Returns:
+    - The start_job_run response.
+
+    Raises:
+    - JobRunThrottled when every attempt was throttled.
+    """
+    for attempt in range(max_attempts):
+        try:
+            return glue_client.start_job_run(**start_kwargs)
+        except ClientError as e:
+            if e.response['Error']['Code'] not in THROTTLE_ERRORS:
+                raise
+            if attempt == max_attempts - 1:
+                raise JobRunThrottled(
+                    f"{start_kwargs.get('JobName')} still throttled after {max_attempts} attempts: "
+                    f"{e.response['Error']['Code']}"
+                ) from e
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            print(f"Job run start throttled ({e.response['Error']['Code']}), retrying in {delay:.2f}s")
+            sleep(delay)
+
+
+def queue_messages(event):
+    """
+    Returns the SQS messages of an event by message id, as dicts with
+    receipt_handle, receive_count and sent_timestamp (epoch milliseconds).
+    """
+    messages = {}
+    for record in event.get('Records', []):
+        if record.get('eventSource') != 'aws:sqs':
+            continue
+        attributes = record.get('attributes', {})
+        messages[record['messageId']] = {
+            'receipt_handle': record['receiptHandle'],
+            'receive_count': int(attributes.get('ApproximateReceiveCount', '1')),
+            'sent_timestamp': int(attributes.get('SentTimestamp', '0')),
+        }
+    return messages
+
+
+def wait_seconds(messages, now=None):
+    """
+    Returns the longest time a message of the batch has waited in the queue.
+    """
+    now_ms = (now if now is not None else time.time()) * 1000
+    sent = [message['sent_timestamp'] for message in messages.values() if message['sent_timestamp']]
+    return max(0.0, (now_ms - min(sent)) / 1000) if sent else 0.0
+
+
+def queue_depth(sqs_client, queue_url):
+    """
+    Returns the approximate number of visible and in-flight messages.
+    """
+    attributes = sqs_client.get_queue_attributes(
+        QueueUrl=queue_url,
+        AttributeNames=['ApproximateNumberOfMessages', 'ApproximateNumberOfMessagesNotVisible']
+    )['Attributes']
+    return {
+        'visible': int(attributes['ApproximateNumberOfMessages']),
+        'in_flight': int(attributes['ApproximateNumberOfMessagesNotVisible']),
+    }
+
+
+def defer_messages(sqs_client, queue_url, messages, base_delay_seconds, max_delay_seconds, rng=random.random):
+    """
+    Hides throttled messages for a jittered delay that grows with their
+    receive count, so retries of a spike spread out instead of hitting the
+    concurrency limit together. The messages are then reported as batch item
+    failures and come back once the delay has passed.
+
+    Args:
+    - sqs_client: boto3 SQS client.
+    - queue_url: URL of the upload buffer queue.
+    - messages: Subset of the queue_messages result to defer.
+    - base_delay_seconds, max_delay_seconds: Backoff settings.
+
+    Returns:
+    - Mapping of message id to the visibility timeout set.
+    """
+    delays = {
+        message_id: min(MAX_VISIBILITY_SECONDS, max(1, int(backoff_delay(
+            message['receive_count'], base_delay_seconds, max_delay_seconds, rng
+        ))))
+        for message_id, message in messages.items()
+    }
+    message_ids = sorted(delays)
+    for start in range(0, len(message_ids), MAX_VISIBILITY_BATCH):
+        sqs_client.change_message_visibility_batch(
+            QueueUrl=queue_url,
+            Entries=[
+                {
+                    'Id': str(i),
+                    'ReceiptHandle': messages[message_id]['receipt_handle'],
+                    'VisibilityTimeout': delays[message_id],
+                }
+                for i, message_id in enumerate(message_ids[start:start + MAX_VISIBILITY_BATCH])
+            ]
+        )
+    return delays
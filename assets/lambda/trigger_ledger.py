@@ -0,0 +1,62 @@
+import time
+
+from botocore.exceptions import ClientError
+
+# Same ledger key as the Glue job, shipped with the function from
+# assets/etl_scripts (LambdaStack SHARED_MODULES)
+from ledger import ledger_id
+
+# A claim the Lambda took but never handed to a job run (e.g. it timed out)
+# can be taken again after this many seconds
+DEFAULT_CLAIM_TTL_SECONDS = 15 * 60
+
+
+def claim(dynamodb_client, table_name, obj, claim_ttl_seconds=DEFAULT_CLAIM_TTL_SECONDS, now=None):
+    """
+    Claims an uploaded object for a job run with a conditional put. Only the
+    first delivery of an upload (or a retry after a stale claim) wins.
+
+    Returns:
+    - True when the object was claimed, False for a duplicate delivery.
+    """
+    now = int(now if now is not None else time.time())
+    try:
+        dynamodb_client.put_item(
+            TableName=table_name,
+            Item={
+                'file_id': {'S': ledger_id(obj)},
+                'bucket': {'S': obj['bucket']},
+                'key': {'S': obj['key']},
+                'status': {'S': 'claimed'},
+                'updated_at': {'N': str(now)},
+            },
+            ConditionExpression='attribute_not_exists(file_id) OR (#status = :claimed AND updated_at < :stale_before)',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={
+                ':claimed': {'S': 'claimed'},
+                ':stale_before': {'N': str(now - claim_ttl_seconds)},
+            }
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+    return True
+
+
+def release(dynamodb_client, table_name, obj):
+    """
+    Drops the claim of an object whose job run could not be started, so the
+    retried SQS message can claim it again.
+    """
+    try:
+        dynamodb_client.delete_item(
+            TableName=table_name,
+            Key={'file_id': {'S': ledger_id(obj)}},
+            ConditionExpression='#status = :claimed',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={':claimed': {'S': 'claimed'}}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
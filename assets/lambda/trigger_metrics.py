@@ -0,0 +1,46 @@
+import json
+import time
+
+# Same FileSizeBucket dimension values as the Glue job metrics, shipped with
+# the function from assets/etl_scripts (LambdaStack SHARED_MODULES)
+from metrics import size_bucket
+
+NAMESPACE = "GluePoc/Trigger"
+
+
+def emf_document(dimensions, metrics, properties=None, namespace=NAMESPACE):
+    """
+    Builds a CloudWatch Embedded Metric Format document. Lambda sends every
+    stdout line to CloudWatch Logs, which extracts the metrics without an
+    API call from the function.
+
+    Args:
+    - dimensions: Mapping of dimension name to value.
+    - metrics: Mapping of metric name to (value, unit).
+    - properties: Extra fields stored with the document.
+    """
+    document = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": namespace,
+                "Dimensions": [sorted(dimensions)],
+                "Metrics": [{"Name": name, "Unit": unit} for name, (_, unit) in metrics.items()],
+            }],
+        },
+    }
+    document.update(properties or {})
+    document.update({name: str(value) for name, value in dimensions.items()})
+    document.update({name: value for name, (value, _) in metrics.items()})
+    return document
+
+
+def emit(document, sink=None):
+    """
+    Writes a document to the sink (a list in tests), or prints it.
+    """
+    if sink is not None:
+        sink.append(document)
+    else:
+        print(json.dumps(document))
+    return document
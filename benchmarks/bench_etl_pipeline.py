@@ -0,0 +1,301 @@
+"""
+End-to-end benchmark of assets/etl_scripts/script.py on local PySpark.
+
+Every case generates a CSV file, uploads it to an in-process moto server
+standing in for S3, the Glue catalog and DynamoDB, and runs the ETL script
+the way Glue does (as __main__, in its own process) with the local awsglue
+stand-in from benchmarks/local_glue. Reported per case:
+
+- wall time of the job process and rows/sec over process_file
+- per-stage timings, taken from the arrival time of the job's log lines
+  (Spark is lazy: reading and projection cost shows up in the write stage)
+- peak resident memory of the job process tree (driver and JVM, Linux only)
+
+Results are saved as JSON together with the git commit, so two commits can be
+compared with --compare.
+
+Spark reads S3 through the S3A connector; the matching hadoop-aws package is
+fetched by spark-submit on the first run. The default matrix includes very
+large files (10M rows x 500 columns is tens of GB); pass --rows/--columns to
+run a subset.
+
+Usage:
+    python benchmarks/bench_etl_pipeline.py --rows 10000 1000000 --columns 10 100 --output bench.json
+    python benchmarks/bench_etl_pipeline.py --rows 10000 --columns 10 --compare bench.json
+    python benchmarks/bench_etl_pipeline.py --rows 10000 --columns 10 -- --read_mode infer
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import boto3
+from moto.server import ThreadedMotoServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "assets", "etl_scripts", "script.py")
+PYTHONPATH = [os.path.join(ROOT, "benchmarks", "local_glue"), os.path.join(ROOT, "assets", "etl_scripts")]
+
+BUCKET = "glue-poc-bench"
+DATABASE = "glue-poc-bench-catalog"
+TABLE_PREFIX = "bench_"
+DYNAMODB_TABLE = "glue-poc-bench-table"
+REGION = "us-east-1"
+
+COLUMN_TYPES = ["string", "double", "int", "boolean", "timestamp", "bigint"]
+
+# (stage, log message that starts it, log message that ends it)
+STAGES = [
+    ("process_file", "Starting process_file function", "process_file function completed"),
+    ("resolve_schema", "Retrieving table from catalog", "Found table"),
+    ("read", "Reading ", "Applying schema and defaults"),
+    ("write_dynamodb", "Writing to DynamoDB", "Successfully written to DynamoDB table"),
+    ("move", "Moving processed files", "move_files function completed successfully"),
+]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def hadoop_version():
+    import pyspark
+    for jar in glob.glob(os.path.join(os.path.dirname(pyspark.__file__), "jars", "hadoop-*.jar")):
+        match = re.search(r"hadoop-(?:client-api|common)-(\d+\.\d+\.\d+)\.jar$", jar)
+        if match:
+            return match.group(1)
+    raise RuntimeError("Could not find the Hadoop version bundled with PySpark")
+
+def catalog_columns(column_count):
+    columns = [{"Name": "id", "Type": "bigint"}]
+    for i in range(1, column_count):
+        columns.append({"Name": f"col_{i}", "Type": COLUMN_TYPES[i % len(COLUMN_TYPES)]})
+    return columns
+
+def sample_value(col_type, row, column):
+    # Leave roughly one value in ten empty so the defaults are exercised
+    if (row + column) % 10 == 0:
+        return ""
+    if col_type == "string":
+        return f"value_{row % 1000}_{column}"
+    if col_type == "double":
+        return f"{row * 0.5 + column:.2f}"
+    if col_type in ("int", "bigint"):
+        return str(row * column % 100000)
+    if col_type == "boolean":
+        return "true" if row % 2 else "false"
+    return f"2024-01-{row % 28 + 1:02d} 12:00:00"
+
+def generate_csv(path, row_count, columns):
+    with open(path, "w", newline="") as output:
+        writer = csv.writer(output)
+        writer.writerow([column["Name"] for column in columns])
+        types = [column["Type"] for column in columns]
+        for row in range(row_count):
+            writer.writerow([str(row)] + [sample_value(types[i], row, i) for i in range(1, len(types))])
+    return os.path.getsize(path)
+
+def setup_services(endpoint_url, columns):
+    s3_client = boto3.client("s3", endpoint_url=endpoint_url, region_name=REGION)
+    glue_client = boto3.client("glue", endpoint_url=endpoint_url, region_name=REGION)
+    dynamodb_client = boto3.client("dynamodb", endpoint_url=endpoint_url, region_name=REGION)
+
+    s3_client.create_bucket(Bucket=BUCKET)
+    glue_client.create_database(DatabaseInput={"Name": DATABASE})
+    glue_client.create_table(DatabaseName=DATABASE, TableInput={
+        "Name": f"{TABLE_PREFIX}data",
+        "StorageDescriptor": {"Columns": columns, "Location": f"s3://{BUCKET}/schema/"}
+    })
+    dynamodb_client.create_table(
+        TableName=DYNAMODB_TABLE,
+        KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "N"}],
+        BillingMode="PAY_PER_REQUEST"
+    )
+    return s3_client
+
+class MemorySampler(threading.Thread):
+    """
+    Samples the resident memory of a process and its descendants from /proc.
+    """
+    def __init__(self, pid, interval=0.2):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_bytes = None
+        self._stopped = threading.Event()
+
+    def _tree(self, pid):
+        pids = [pid]
+        for task in glob.glob(f"/proc/{pid}/task/*/children"):
+            try:
+                with open(task) as children:
+                    for child in children.read().split():
+                        pids.extend(self._tree(int(child)))
+            except OSError:
+                pass
+        return pids
+
+    def _rss(self, pid):
+        try:
+            with open(f"/proc/{pid}/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            return 0
+
+    def run(self):
+        if not os.path.exists(f"/proc/{self.pid}"):
+            return
+        while not self._stopped.is_set():
+            rss = sum(self._rss(pid) for pid in self._tree(self.pid))
+            self.peak_bytes = max(self.peak_bytes or 0, rss)
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+def run_job(endpoint_url, file_name, extra_args, log_path):
+    env = dict(os.environ)
+    env.update({
+        "AWS_ACCESS_KEY_ID": "testing",
+        "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_DEFAULT_REGION": REGION,
+        "AWS_ENDPOINT_URL": endpoint_url,
+        "PYTHONUNBUFFERED": "1",
+        "PYTHONPATH": os.pathsep.join(PYTHONPATH + [env.get("PYTHONPATH", "")]),
+        "PYSPARK_SUBMIT_ARGS": " ".join([
+            "--master local[*]",
+            f"--packages org.apache.hadoop:hadoop-aws:{hadoop_version()}",
+            "--conf spark.hadoop.fs.s3.impl=org.apache.hadoop.fs.s3a.S3AFileSystem",
+            f"--conf spark.hadoop.fs.s3a.endpoint={endpoint_url}",
+            "--conf spark.hadoop.fs.s3a.path.style.access=true",
+            "--conf spark.hadoop.fs.s3a.connection.ssl.enabled=false",
+            "--conf spark.hadoop.fs.s3a.access.key=testing",
+            "--conf spark.hadoop.fs.s3a.secret.key=testing",
+            "pyspark-shell",
+        ]),
+    })
+    command = [
+        sys.executable, SCRIPT,
+        "--job_name", "glue-poc-bench",
+        "--source_prefix", f"{BUCKET}/data",
+        "--destination_prefix", f"{BUCKET}/archive",
+        "--failed_prefix", f"{BUCKET}/failed",
+        "--temp_prefix", f"{BUCKET}/temp",
+        "--dynamodb_table_name", DYNAMODB_TABLE,
+        "--database_catalog_name", DATABASE,
+        "--table_prefix", TABLE_PREFIX,
+        "--data_file_name", file_name,
+    ] + list(extra_args)
+
+    marks = {}
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    sampler = MemorySampler(process.pid)
+    sampler.start()
+    with open(log_path, "w") as log:
+        for line in process.stdout:
+            now = time.perf_counter() - start
+            log.write(line)
+            for stage, begin, end in STAGES:
+                if begin in line and f"{stage}_start" not in marks:
+                    marks[f"{stage}_start"] = now
+                if end in line and f"{stage}_start" in marks:
+                    marks[f"{stage}_end"] = now
+    exit_code = process.wait()
+    wall = time.perf_counter() - start
+    sampler.stop()
+
+    stages = {
+        stage: round(marks[f"{stage}_end"] - marks[f"{stage}_start"], 3)
+        for stage, _, _ in STAGES
+        if f"{stage}_start" in marks and f"{stage}_end" in marks
+    }
+    return exit_code, round(wall, 3), stages, sampler.peak_bytes
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_path):
+    with open(baseline_path) as baseline_file:
+        baseline = {(case["rows"], case["columns"]): case for case in json.load(baseline_file)["results"]}
+    print(f"\nCompared with {baseline_path}:")
+    for case in results:
+        previous = baseline.get((case["rows"], case["columns"]))
+        if previous and previous.get("rows_per_second") and case.get("rows_per_second"):
+            change = case["rows_per_second"] / previous["rows_per_second"] - 1
+            print(f"{case['rows']:>10} rows x {case['columns']:>3} columns | rows/sec {previous['rows_per_second']:>12} -> {case['rows_per_second']:>12} ({change:+.1%})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 1000000, 10000000])
+    parser.add_argument("--columns", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--output", default="bench_output.json", help="File the JSON results are written to")
+    parser.add_argument("--compare", help="Earlier results file to compare rows/sec against")
+    parser.add_argument("--work-dir", help="Directory for generated files and job logs")
+    parser.add_argument("job_args", nargs="*", help="Extra job arguments passed to the script after --")
+    options = parser.parse_args()
+
+    work_dir = options.work_dir or tempfile.mkdtemp(prefix="bench_etl_")
+    results = []
+    for column_count in options.columns:
+        for row_count in options.rows:
+            port = free_port()
+            server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+            server.start()
+            endpoint_url = f"http://127.0.0.1:{port}"
+            try:
+                columns = catalog_columns(column_count)
+                s3_client = setup_services(endpoint_url, columns)
+                file_name = f"bench_{row_count}x{column_count}.csv"
+                local_path = os.path.join(work_dir, file_name)
+                input_bytes = generate_csv(local_path, row_count, columns)
+                s3_client.upload_file(local_path, BUCKET, f"data/{file_name}")
+
+                exit_code, wall, stages, peak_bytes = run_job(
+                    endpoint_url, file_name, options.job_args, os.path.join(work_dir, f"{file_name}.log")
+                )
+            finally:
+                server.stop()
+
+            process_seconds = stages.get("process_file")
+            case = {
+                "rows": row_count,
+                "columns": column_count,
+                "input_bytes": input_bytes,
+                "exit_code": exit_code,
+                "wall_seconds": wall,
+                "stages": stages,
+                "peak_rss_mb": round(peak_bytes / 1024 / 1024, 1) if peak_bytes else None,
+                "rows_per_second": round(row_count / process_seconds, 1) if process_seconds else None,
+            }
+            results.append(case)
+            print(f"{row_count:>10} rows x {column_count:>3} columns | exit {exit_code} | wall {wall:>8.2f}s | "
+                  f"rows/sec {case['rows_per_second']} | peak {case['peak_rss_mb']} MB | stages {stages}")
+
+    with open(options.output, "w") as output:
+        json.dump({
+            "git_commit": git_commit(),
+            "created_at": int(time.time()),
+            "job_args": options.job_args,
+            "results": results
+        }, output, indent=2)
+    print(f"Results written to {options.output}, logs in {work_dir}")
+
+    if options.compare:
+        compare(results, options.compare)
+
+if __name__ == "__main__":
+    main()
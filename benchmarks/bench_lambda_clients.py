@@ -0,0 +1,164 @@
+"""
+Cold and warm start benchmark of the trigger Lambda handler
+(assets/lambda/index.py), against an in-process moto server standing in for
+S3 and Glue.
+
+Every sample is a fresh Python process, like a new Lambda execution
+environment: it imports the handler (cold import), invokes it once (cold
+invocation) and then --invocations more times (warm invocations). Two modes
+are compared:
+
+- shared: the clients module builds each boto3 client once and warm
+  invocations reuse it, with its open connections
+- fresh: the shared clients are dropped before every invocation, which is
+  what building the clients inside the handler cost
+
+moto answers from localhost, so the numbers leave out the TLS handshakes a
+fresh client pays against real endpoints; the gap is larger in AWS.
+
+Usage:
+    python benchmarks/bench_lambda_clients.py --samples 5 --invocations 50 --output bench_lambda.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAMBDA_DIR = os.path.join(ROOT, "assets", "lambda")
+# Modules LambdaStack ships with the function (SHARED_MODULES)
+SHARED_DIR = os.path.join(ROOT, "assets", "etl_scripts")
+
+BUCKET = "glue-poc-bench"
+JOB_NAME = "glue-poc-bench-job"
+SMALL_FILE_JOB_NAME = "glue-poc-bench-small-file-job"
+REGION = "us-east-1"
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def setup_services(endpoint_url):
+    import boto3
+    s3_client = boto3.client("s3", endpoint_url=endpoint_url, region_name=REGION)
+    s3_client.create_bucket(Bucket=BUCKET)
+    glue_client = boto3.client("glue", endpoint_url=endpoint_url, region_name=REGION)
+    for job_name in (JOB_NAME, SMALL_FILE_JOB_NAME):
+        glue_client.create_job(
+            Name=job_name,
+            Role="arn:aws:iam::123456789012:role/glue-poc-bench",
+            Command={"Name": "glueetl", "ScriptLocation": f"s3://{BUCKET}/scripts/script.py"},
+            ExecutionProperty={"MaxConcurrentRuns": 1000}
+        )
+
+def upload_event(invocation):
+    # One buffered upload notification of a small file
+    body = {"Records": [{"s3": {
+        "bucket": {"name": BUCKET},
+        "object": {"key": f"data/file_{invocation}.csv", "size": 1024}
+    }}]}
+    return {"Records": [{
+        "eventSource": "aws:sqs",
+        "messageId": f"m{invocation}",
+        "receiptHandle": f"rh{invocation}",
+        "attributes": {"ApproximateReceiveCount": "1", "SentTimestamp": str(int(time.time() * 1000))},
+        "body": json.dumps(body),
+    }]}
+
+def run_sample(mode, invocations):
+    """
+    Runs in the child process: imports the handler and invokes it
+    1 + invocations times. Returns the timings in milliseconds.
+    """
+    sys.path[:0] = [LAMBDA_DIR, SHARED_DIR]
+    started = time.perf_counter()
+    import clients
+    import index
+    import_ms = (time.perf_counter() - started) * 1000
+
+    timings = []
+    for invocation in range(invocations + 1):
+        if mode == "fresh":
+            clients.reset_clients()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = index.lambda_handler(upload_event(invocation), None)
+        timings.append((time.perf_counter() - started) * 1000)
+        if response["statusCode"] != 200:
+            raise RuntimeError(f"Handler failed: {response}")
+    return {"import_ms": import_ms, "cold_ms": timings[0], "warm_ms": timings[1:]}
+
+def sample(endpoint_url, mode, invocations):
+    env = dict(os.environ)
+    env.update({
+        "AWS_ENDPOINT_URL": endpoint_url,
+        "AWS_ACCESS_KEY_ID": "testing",
+        "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_DEFAULT_REGION": REGION,
+        "glue_job_name": JOB_NAME,
+        "small_file_job_name": SMALL_FILE_JOB_NAME,
+        "bucket_name": BUCKET,
+        "temp_folder": "temp",
+    })
+    output = subprocess.check_output(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, "--invocations", str(invocations)],
+        env=env, text=True
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=5, help="Fresh processes per mode")
+    parser.add_argument("--invocations", type=int, default=50, help="Warm invocations per process")
+    parser.add_argument("--modes", nargs="+", default=["fresh", "shared"], choices=["fresh", "shared"])
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--child", choices=["fresh", "shared"], help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.child:
+        print(json.dumps(run_sample(options.child, options.invocations)))
+        return
+
+    from moto.server import ThreadedMotoServer
+    port = free_port()
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    endpoint_url = f"http://127.0.0.1:{port}"
+    results = []
+    try:
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+        setup_services(endpoint_url)
+        for mode in options.modes:
+            samples = [sample(endpoint_url, mode, options.invocations) for _ in range(options.samples)]
+            warm = [timing for s in samples for timing in s["warm_ms"]]
+            result = {
+                "mode": mode,
+                "import_ms": round(statistics.median(s["import_ms"] for s in samples), 2),
+                "cold_ms": round(statistics.median(s["cold_ms"] for s in samples), 2),
+                "warm_p50_ms": round(percentile(warm, 0.5), 2),
+                "warm_p90_ms": round(percentile(warm, 0.9), 2),
+            }
+            results.append(result)
+            print(f"{mode:>6} | import {result['import_ms']:>8.2f} ms | cold {result['cold_ms']:>8.2f} ms | "
+                  f"warm p50 {result['warm_p50_ms']:>7.2f} ms | p90 {result['warm_p90_ms']:>7.2f} ms")
+    finally:
+        server.stop()
+
+    if options.output:
+        with open(options.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+if __name__ == "__main__":
+    main()
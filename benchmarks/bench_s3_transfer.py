@@ -0,0 +1,70 @@
+"""
+Timing benchmark for moving processed files, against an in-process moto S3.
+
+Compares the per-object copy_object + delete_object loop the job used to run
+with s3_transfer.move_objects (concurrent copies, bulk deletes). moto has no
+network latency, so absolute numbers understate the gain against real S3;
+the request counts and the relative scaling are what matter.
+
+Usage:
+    python benchmarks/bench_s3_transfer.py --objects 1 100 10000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "etl_scripts"))
+
+import boto3
+from moto import mock_aws
+
+from s3_transfer import move_objects
+
+BUCKET = "glue-poc-bucket"
+
+def serial_move(s3_client, moves):
+    for source_bucket, source_key, destination_bucket, destination_key in moves:
+        s3_client.copy_object(
+            Bucket=destination_bucket,
+            CopySource={'Bucket': source_bucket, 'Key': source_key},
+            Key=destination_key
+        )
+        s3_client.delete_object(Bucket=source_bucket, Key=source_key)
+
+def seed(s3_client, object_count, object_bytes):
+    body = b"x" * object_bytes
+    for i in range(object_count):
+        s3_client.put_object(Bucket=BUCKET, Key=f"data/file_{i}.csv", Body=body)
+    return [(BUCKET, f"data/file_{i}.csv", BUCKET, f"archive/file_{i}.csv") for i in range(object_count)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--object-bytes", type=int, default=1024)
+    parser.add_argument("--max-workers", type=int, default=16)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    options = parser.parse_args()
+
+    results = []
+    for object_count in options.objects:
+        timings = {"objects": object_count}
+        for name, move in (("serial", serial_move),
+                           ("move_objects", lambda client, moves: move_objects(client, moves, max_workers=options.max_workers))):
+            with mock_aws():
+                s3_client = boto3.client("s3", region_name="us-east-1")
+                s3_client.create_bucket(Bucket=BUCKET)
+                moves = seed(s3_client, object_count, options.object_bytes)
+                start = time.perf_counter()
+                move(s3_client, moves)
+                timings[f"{name}_s"] = round(time.perf_counter() - start, 4)
+        results.append(timings)
+        print(f"{object_count:>6} objects | serial {timings['serial_s']:>9.3f}s | move_objects {timings['move_objects_s']:>9.3f}s")
+
+    if options.output:
+        with open(options.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""
+Local stand-in for the parts of the awsglue library used by the ETL script,
+so the script can run on plain PySpark for benchmarks. awsglue itself is only
+available inside the Glue runtime.
+"""
@@ -0,0 +1,36 @@
+from pyspark.sql import SparkSession
+
+from awsglue.dynamicframe import DynamicFrame
+
+class _DynamicFrameReader:
+    def __init__(self, glue_context):
+        self._glue_context = glue_context
+
+    def from_options(self, connection_type, connection_options, format=None, format_options=None, **kwargs):
+        if connection_type != "s3" or format != "csv":
+            raise NotImplementedError(f"Local GlueContext only reads CSV from S3, got {connection_type}/{format}")
+        with_header = str((format_options or {}).get("withHeader", False)).lower() == "true"
+        df = self._glue_context.spark_session.read.option("header", with_header).csv(connection_options["paths"])
+        return DynamicFrame.fromDF(df, self._glue_context, "source")
+
+class _DynamicFrameWriter:
+    def __init__(self, glue_context):
+        self._glue_context = glue_context
+
+    def from_options(self, frame, connection_type, connection_options, **kwargs):
+        if connection_type != "dynamodb":
+            raise NotImplementedError(f"Local GlueContext only writes to DynamoDB, got {connection_type}")
+        # The connector is replaced by the job's own BatchWriteItem writer
+        from dynamodb_writer import write_with_batch_api
+        table_name = connection_options.get("dynamodb.output.tableName", connection_options.get("tableName"))
+        write_with_batch_api(self._glue_context.spark_session, frame.toDF(), table_name)
+
+class GlueContext:
+    """
+    Local stand-in for awsglue.context.GlueContext on top of a SparkContext.
+    """
+    def __init__(self, spark_context):
+        self._sc = spark_context
+        self.spark_session = SparkSession(spark_context)
+        self.create_dynamic_frame = _DynamicFrameReader(self)
+        self.write_dynamic_frame = _DynamicFrameWriter(self)
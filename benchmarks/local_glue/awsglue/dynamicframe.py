@@ -0,0 +1,19 @@
+class DynamicFrame:
+    """
+    Thin wrapper around a DataFrame with the DynamicFrame methods the ETL
+    script uses.
+    """
+    def __init__(self, df, glue_ctx, name):
+        self._df = df
+        self.glue_ctx = glue_ctx
+        self.name = name
+
+    @classmethod
+    def fromDF(cls, dataframe, glue_ctx, name):
+        return cls(dataframe, glue_ctx, name)
+
+    def toDF(self):
+        return self._df
+
+    def schema(self):
+        return self._df.schema
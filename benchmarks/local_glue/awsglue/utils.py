@@ -0,0 +1,12 @@
+import argparse
+
+def getResolvedOptions(args, options):
+    """
+    Same contract as awsglue.utils.getResolvedOptions: every option must be
+    passed as --name value, unknown arguments are ignored.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    for option in options:
+        parser.add_argument(f"--{option}", required=True)
+    parsed, _ = parser.parse_known_args(args[1:])
+    return vars(parsed)
@@ -6,9 +6,16 @@ from aws_cdk import (
     aws_ssm as ssm
 )
 from constructs import Construct
+import typing
 
 class DynamoStack(Stack):
-    def __init__(self, scope: Construct, construct_id: str, iam_role_arn: str, **kwargs) -> None:
+    def __init__(self, scope: Construct, construct_id: str, iam_role_arn: str,
+                 on_demand: bool = False,
+                 read_capacity: int = 5,
+                 write_capacity: int = 5,
+                 max_write_capacity: typing.Optional[int] = None,
+                 target_utilization_percent: int = 70,
+                 **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
         # Create an IAM role object from the provided ARN
@@ -23,6 +30,16 @@ class DynamoStack(Stack):
             string_parameter_name="/glue-poc/dynamodb-table-name"
         ).string_value
 
+        # Capacity settings: on-demand, or provisioned with optional write autoscaling
+        if on_demand:
+            capacity = {"billing_mode": dynamodb.BillingMode.PAY_PER_REQUEST}
+        else:
+            capacity = {
+                "billing_mode": dynamodb.BillingMode.PROVISIONED,
+                "read_capacity": read_capacity,
+                "write_capacity": write_capacity,
+            }
+
         # Create DynamoDB table
         self.table = dynamodb.Table(
             self,
@@ -32,8 +49,68 @@ class DynamoStack(Stack):
                 name="id",
                 type=dynamodb.AttributeType.NUMBER
             ),
-            removal_policy=RemovalPolicy.DESTROY  # Use with caution in production
+            removal_policy=RemovalPolicy.DESTROY,  # Use with caution in production
+            **capacity
         )
 
+        # Scale write capacity with the load written by the Glue job
+        if not on_demand and max_write_capacity:
+            self.table.auto_scale_write_capacity(
+                min_capacity=write_capacity,
+                max_capacity=max_write_capacity
+            ).scale_on_utilization(target_utilization_percent=target_utilization_percent)
+
         # Grant access to the IAM role
-        self.table.grant_read_write_data(iam_role)
\ No newline at end of file
+        self.table.grant_read_write_data(iam_role)
+
+        state_table_name = ssm.StringParameter.from_string_parameter_name(
+            self, "StateTableName",
+            string_parameter_name="/glue-poc/state-table-name"
+        ).string_value
+
+        # Discovery watermarks of the Glue jobs, one small item per job
+        self.state_table = dynamodb.Table(
+            self,
+            "GluePocStateTable",
+            table_name=state_table_name,
+            partition_key=dynamodb.Attribute(
+                name="job_name",
+                type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY,  # Use with caution in production
+        )
+        self.state_table.grant_read_write_data(iam_role)
+
+        ledger_table_name = ssm.StringParameter.from_string_parameter_name(
+            self, "LedgerTableName",
+            string_parameter_name="/glue-poc/ledger-table-name"
+        ).string_value
+
+        # Per-file ledger keyed on bucket/key#version-id#etag: the trigger Lambda
+        # claims uploads with conditional writes, the jobs record their status
+        self.ledger_table = dynamodb.Table(
+            self,
+            "GluePocLedgerTable",
+            table_name=ledger_table_name,
+            partition_key=dynamodb.Attribute(
+                name="file_id",
+                type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            time_to_live_attribute="expires_at",
+            removal_policy=RemovalPolicy.DESTROY,  # Use with caution in production
+        )
+        # Query files by status, e.g. everything that failed since a point in time
+        self.ledger_table.add_global_secondary_index(
+            index_name="status-index",
+            partition_key=dynamodb.Attribute(
+                name="status",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="updated_at",
+                type=dynamodb.AttributeType.NUMBER
+            ),
+        )
+        self.ledger_table.grant_read_write_data(iam_role)
@@ -7,6 +7,68 @@ from aws_cdk import (
     aws_iam as iam
 )
 from constructs import Construct
+import json
+import typing
+
+# Helper modules imported by script.py, shipped with --extra-py-files
+ETL_MODULES = [
+    "aws_clients.py",
+    "job_inputs.py",
+    "casting.py",
+    "schema_resolver.py",
+    "projection.py",
+    "readers.py",
+    "profiling.py",
+    "s3_transfer.py",
+    "dynamodb_writer.py",
+    "change_detection.py",
+    "archive_writer.py",
+    "discovery.py",
+    "ledger.py",
+    "validation.py",
+    "validation_rules.py",
+    "resumable_load.py",
+    "metrics.py",
+    "table_routing.py",
+    "prewrite.py",
+    "spark_profiles.py",
+]
+
+# Helper modules imported by streaming_script.py
+STREAMING_MODULES = [
+    "aws_clients.py",
+    "job_inputs.py",
+    "casting.py",
+    "schema_resolver.py",
+    "projection.py",
+    "validation_rules.py",
+    "validation.py",
+    "table_routing.py",
+    "readers.py",
+    "dynamodb_writer.py",
+    "streaming.py",
+]
+
+# Helper modules imported by small_file_job.py
+SMALL_FILE_MODULES = [
+    "aws_clients.py",
+    "job_inputs.py",
+    "casting.py",
+    "validation_rules.py",
+    "schema_resolver.py",
+    "s3_transfer.py",
+    "dynamodb_writer.py",
+    "ledger.py",
+    "table_routing.py",
+]
+
+# Helper modules imported by presplit_job.py
+PRESPLIT_MODULES = [
+    "aws_clients.py",
+    "job_inputs.py",
+    "s3_transfer.py",
+    "presplit.py",
+]
 
 class JobStack(Stack):
     def __init__(self, scope: Construct, construct_id: str, 
@@ -14,6 +76,20 @@ class JobStack(Stack):
                  s3_bucket: s3.Bucket, 
                  dynamo_table: dynamodb.Table, 
                  glue_role: iam.Role, 
+                 number_of_workers: int = 2,
+                 max_concurrent_runs: int = 4,
+                 small_file_max_concurrent_runs: int = 10,
+                 presplit_max_concurrent_runs: int = 5,
+                 discovery_schedule: typing.Optional[str] = "cron(0/15 * * * ? *)",
+                 discovery_min_age_seconds: int = 900,
+                 job_bookmark_option: str = "job-bookmark-disable",
+                 streaming: bool = False,
+                 streaming_trigger_interval_seconds: int = 60,
+                 streaming_max_files_per_trigger: int = 100,
+                 spark_profile: str = "auto",
+                 spark_conf_overrides: typing.Optional[typing.Dict[str, str]] = None,
+                 spark_event_logs: bool = True,
+                 max_retries: int = 1,
                  **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
@@ -41,6 +117,18 @@ class JobStack(Stack):
         ).string_value
         failed_folder = f"{self.bucket_name}/{failed_folder_path}"
 
+        stream_folder_path = ssm.StringParameter.from_string_parameter_name(
+            self, 'StreamFolder',
+            string_parameter_name='/glue-poc/stream-folder'
+        ).string_value
+        stream_folder = f"{self.bucket_name}/{stream_folder_path}"
+
+        temp_folder_path = ssm.StringParameter.from_string_parameter_name(
+            self, 'TempFolder',
+            string_parameter_name='/glue-poc/temp-folder'
+        ).string_value
+        temp_folder = f"{self.bucket_name}/{temp_folder_path}"
+
         dynamodb_table_name = ssm.StringParameter.from_string_parameter_name(
             self, "DynamoDBTableName",
             string_parameter_name="/glue-poc/dynamodb-table-name"
@@ -56,6 +144,16 @@ class JobStack(Stack):
             string_parameter_name="/glue-poc/table-prefix"
         ).string_value
 
+        state_table_name = ssm.StringParameter.from_string_parameter_name(
+            self, "StateTableName",
+            string_parameter_name="/glue-poc/state-table-name"
+        ).string_value
+
+        ledger_table_name = ssm.StringParameter.from_string_parameter_name(
+            self, "LedgerTableName",
+            string_parameter_name="/glue-poc/ledger-table-name"
+        ).string_value
+
         etl_scripts_folder = ssm.StringParameter.from_string_parameter_name(
             self, "EtlScriptsFolder",
             string_parameter_name="/glue-poc/etl-scripts-folder"
@@ -66,6 +164,43 @@ class JobStack(Stack):
             string_parameter_name="/glue-poc/glue-job-name"
         ).string_value
 
+        small_file_job_name = ssm.StringParameter.from_string_parameter_name(
+            self, "SmallFileJobName",
+            string_parameter_name="/glue-poc/small-file-job-name"
+        ).string_value
+
+        presplit_job_name = ssm.StringParameter.from_string_parameter_name(
+            self, "PresplitJobName",
+            string_parameter_name="/glue-poc/presplit-job-name"
+        ).string_value
+
+        # Arguments shared by the Spark and the Python shell job
+        common_arguments = {
+            "--source_prefix": source_folder,
+            "--destination_prefix": destination_folder,
+            "--failed_prefix": failed_folder,
+            "--dynamodb_table_name": dynamodb_table_name,
+            "--database_catalog_name": data_catalog_name,
+            "--table_prefix": table_prefix,
+            "--temp_prefix": temp_folder,
+            "--schema_cache_ttl_seconds": "300",
+            "--dynamodb_batch_size": "25",
+            "--dynamodb_max_retries": "8",
+            "--ledger_table_name": ledger_table_name,
+            "--ledger_retention_days": "30",
+            # Rows that cannot be written go to failed/rejects/, the run fails above the error rate
+            "--validation_mode": "quarantine",
+            "--max_error_rate": "0.01",
+            # File name patterns to catalog and DynamoDB tables, shipped with the scripts
+            "--routes_path": f"{self.bucket_name}/{etl_scripts_folder}/table_routes.json",
+        }
+
+        # Spark UI event logs of the ETL job, for tools/analyze_spark_events.py
+        event_log_arguments = {
+            "--enable-spark-ui": "true",
+            "--spark-event-logs-path": f"s3://{temp_folder}/spark-event-logs/{job_name}/",
+        } if spark_event_logs else {}
+
         # Create Glue ETL Job
         glue_job = glue.CfnJob(
             self,
@@ -78,15 +213,166 @@ class JobStack(Stack):
                 script_location=s3_bucket.s3_url_for_object(f"{etl_scripts_folder}/script.py"),
             ),
             default_arguments={
+                **common_arguments,
                 "--job_name": job_name,
-                "--source_prefix": source_folder,
-                "--destination_prefix": destination_folder,
-                "--failed_prefix": failed_folder,
-                "--dynamodb_table_name": dynamodb_table_name,
-                "--database_catalog_name": data_catalog_name,
-                "--table_prefix": table_prefix,
+                "--read_mode": "catalog",
+                "--profile_level": "off",
+                "--profile_sample_fraction": "0.01",
+                "--copy_part_size_mb": "128",
+                "--multipart_threshold_mb": "256",
+                "--transfer_max_workers": "16",
+                "--dynamodb_writer": "connector",
+                "--dynamodb_write_percent": "0.5",
+                "--dynamodb_parallel_tasks": "0",
+                "--load_mode": "full",
+                "--emit_tombstones": "false",
+                "--archive_format": "parquet",
+                "--archive_partition_column": "ingest_date",
+                "--archive_target_file_mb": "128",
+                "--resumable_load": "true",
+                # A retry attempt resumes the files, load chunks and ledger entries of the failed attempt
+                "--job_max_retries": str(max_retries),
+                "--load_chunk_mb": "1024",
+                "--max_concurrent_tables": "4",
+                # Drop duplicate ids and size the write partitions to the DynamoDB throughput
+                "--dedup_mode": "last_wins",
+                "--write_partitioning": "id_hash",
+                "--write_target_items_per_second": "4000",
+                "--write_rows_per_partition": "500000",
+                # Detect gzip/zstd CSV, JSON lines and Parquet inputs, pack small files by size
+                "--input_format": "auto",
+                "--read_partition_mb": "128",
+                "--read_open_cost_kb": "512",
+                # Spark settings picked from the input size before the SparkContext starts
+                "--spark_profile": spark_profile,
+                "--spark_conf_overrides": json.dumps(spark_conf_overrides or {}),
+                "--estimated_row_bytes": "200",
+                **event_log_arguments,
+                "--discovery_mode": "off",
+                "--state_table_name": state_table_name,
+                "--discovery_min_age_seconds": str(discovery_min_age_seconds),
+                # Discovery claims files in the ledger; a claim of the trigger path is only taken over after this
+                "--discovery_claim_ttl_seconds": str(6 * 3600),
+                # Discovery keeps its own watermark, Glue bookmarks would also filter the explicit file lists
+                "--job-bookmark-option": job_bookmark_option,
+                "--extra-py-files": ",".join(
+                    s3_bucket.s3_url_for_object(f"{etl_scripts_folder}/{module}") for module in ETL_MODULES
+                ),
             },
             glue_version="3.0",
-            max_capacity=2,
+            # The trigger Lambda overrides the worker count per run from the input size
+            worker_type="G.1X",
+            number_of_workers=number_of_workers,
+            # Starts beyond the limit are throttled and retried by the trigger Lambda
+            execution_property=glue.CfnJob.ExecutionPropertyProperty(
+                max_concurrent_runs=max_concurrent_runs
+            ),
+            max_retries=max_retries,
             timeout=5,  # 5 minutes
         )
+
+        # Catch up on files the trigger Lambda has not processed (throttling, outages)
+        if discovery_schedule:
+            glue.CfnTrigger(
+                self,
+                "DiscoveryTrigger",
+                name=f"{job_name}-discovery",
+                type="SCHEDULED",
+                schedule=discovery_schedule,
+                start_on_creation=True,
+                actions=[glue.CfnTrigger.ActionProperty(
+                    job_name=job_name,
+                    arguments={"--discovery_mode": "watermark"}
+                )],
+            ).add_dependency(glue_job)
+
+        # Long-running streaming job for files arriving continuously under the stream folder
+        if streaming:
+            glue.CfnJob(
+                self,
+                "StreamingJob",
+                name=f"{job_name}-streaming",
+                role=glue_role.role_arn,
+                command=glue.CfnJob.JobCommandProperty(
+                    name="gluestreaming",
+                    python_version="3",
+                    script_location=s3_bucket.s3_url_for_object(f"{etl_scripts_folder}/streaming_script.py"),
+                ),
+                default_arguments={
+                    **common_arguments,
+                    "--job_name": f"{job_name}-streaming",
+                    "--stream_source_prefix": stream_folder,
+                    "--trigger_interval_seconds": str(streaming_trigger_interval_seconds),
+                    "--max_files_per_trigger": str(streaming_max_files_per_trigger),
+                    "--clean_source": "archive",
+                    "--dynamodb_writer": "connector",
+                    "--dynamodb_write_percent": "0.5",
+                    "--extra-py-files": ",".join(
+                        s3_bucket.s3_url_for_object(f"{etl_scripts_folder}/{module}") for module in STREAMING_MODULES
+                    ),
+                },
+                glue_version="3.0",
+                worker_type="G.1X",
+                number_of_workers=number_of_workers,
+            )
+
+        # Python shell job for small files, without Spark startup
+        small_file_job = glue.CfnJob(
+            self,
+            "SmallFileJob",
+            name=small_file_job_name,
+            role=glue_role.role_arn,
+            command=glue.CfnJob.JobCommandProperty(
+                name="pythonshell",
+                python_version="3.9",
+                script_location=s3_bucket.s3_url_for_object(f"{etl_scripts_folder}/small_file_job.py"),
+            ),
+            default_arguments={
+                **common_arguments,
+                "--job_name": small_file_job_name,
+                "library-set": "analytics",
+                "--extra-py-files": ",".join(
+                    s3_bucket.s3_url_for_object(f"{etl_scripts_folder}/{module}") for module in SMALL_FILE_MODULES
+                ),
+            },
+            max_capacity=1,
+            execution_property=glue.CfnJob.ExecutionPropertyProperty(
+                max_concurrent_runs=small_file_max_concurrent_runs
+            ),
+            timeout=5,  # 5 minutes
+        )
+
+        # Python shell job splitting large gzip files, which Spark reads in a
+        # single task, into parts and starting the Spark job on them
+        glue.CfnJob(
+            self,
+            "PresplitJob",
+            name=presplit_job_name,
+            role=glue_role.role_arn,
+            command=glue.CfnJob.JobCommandProperty(
+                name="pythonshell",
+                python_version="3.9",
+                script_location=s3_bucket.s3_url_for_object(f"{etl_scripts_folder}/presplit_job.py"),
+            ),
+            default_arguments={
+                **common_arguments,
+                "--job_name": presplit_job_name,
+                "--next_job_name": job_name,
+                "--part_mb": "512",
+                # Size of the Spark runs on the parts, with the timeout of a large file
+                "--worker_type": "G.1X",
+                "--bytes_per_worker_mb": "2048",
+                "--min_workers": "2",
+                "--max_workers": "10",
+                "--run_timeout_minutes": "120",
+                "library-set": "analytics",
+                "--extra-py-files": ",".join(
+                    s3_bucket.s3_url_for_object(f"{etl_scripts_folder}/{module}") for module in PRESPLIT_MODULES
+                ),
+            },
+            max_capacity=1,
+            execution_property=glue.CfnJob.ExecutionPropertyProperty(
+                max_concurrent_runs=presplit_max_concurrent_runs
+            ),
+            timeout=120,  # 2 hours
+        ).add_dependency(glue_job)
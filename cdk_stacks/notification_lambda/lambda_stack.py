@@ -1,9 +1,15 @@
+import os
+import shutil
+import tempfile
 import typing
 from aws_cdk import (
+    Duration,
     RemovalPolicy,
     Stack,
+    aws_kms as kms,
     aws_lambda as lambda_,
     aws_s3 as s3,
+    aws_sqs as sqs,
     aws_ssm as ssm,
     aws_lambda_event_sources as lambda_event_sources,
     aws_iam as iam,
@@ -11,8 +17,38 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+# Modules of assets/etl_scripts the function shares with the Glue jobs
+SHARED_MODULES = ["ledger.py", "metrics.py"]
+
+def lambda_asset_dir() -> str:
+    """
+    Stages assets/lambda and the shared ETL modules in one directory, the
+    code asset of the function, so both sides import the same definitions.
+    """
+    staging_dir = tempfile.mkdtemp(prefix="glue-poc-lambda-")
+    shutil.copytree("assets/lambda", staging_dir, dirs_exist_ok=True,
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    for module in SHARED_MODULES:
+        shutil.copy(os.path.join("assets/etl_scripts", module), staging_dir)
+    return staging_dir
+
 class LambdaStack(Stack):
-    def __init__(self, scope: Construct, construct_id: str, iam_role_arn: str, s3_bucket_arn: str, **kwargs) -> None:
+    def __init__(self, scope: Construct, construct_id: str, iam_role_arn: str, s3_bucket_arn: str,
+                 kms_key: typing.Optional[kms.IKey] = None,
+                 max_batch_files: int = 1000,
+                 max_batch_bytes: int = 1024 ** 3,
+                 max_batching_window: Duration = Duration.seconds(60),
+                 small_file_threshold_bytes: int = 50 * 1024 ** 2,
+                 bytes_per_worker: int = 2 * 1024 ** 3,
+                 min_workers: int = 2,
+                 max_workers: int = 10,
+                 presplit_threshold_bytes: int = 1024 ** 3,
+                 max_concurrency: int = 2,
+                 max_receive_count: int = 20,
+                 start_max_attempts: int = 3,
+                 retry_base_delay: Duration = Duration.seconds(30),
+                 retry_max_delay: Duration = Duration.minutes(15),
+                 **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
 
@@ -21,6 +57,31 @@ class LambdaStack(Stack):
             string_parameter_name="/glue-poc/glue-job-name"
         ).string_value
 
+        self.small_file_job_name = ssm.StringParameter.from_string_parameter_name(
+            self, "SmallFileJobName",
+            string_parameter_name="/glue-poc/small-file-job-name"
+        ).string_value
+
+        self.presplit_job_name = ssm.StringParameter.from_string_parameter_name(
+            self, "PresplitJobName",
+            string_parameter_name="/glue-poc/presplit-job-name"
+        ).string_value
+
+        self.ledger_table_name = ssm.StringParameter.from_string_parameter_name(
+            self, "LedgerTableName",
+            string_parameter_name="/glue-poc/ledger-table-name"
+        ).string_value
+
+        self.bucket_name = ssm.StringParameter.from_string_parameter_name(
+            self, "BucketName",
+            string_parameter_name="/glue-poc/bucket-name"
+        ).string_value
+
+        self.temp_folder = ssm.StringParameter.from_string_parameter_name(
+            self, "TempFolder",
+            string_parameter_name="/glue-poc/temp-folder"
+        ).string_value
+
         # Create Lambda function
         self.lambda_function = lambda_.Function(
             self,
@@ -28,9 +89,26 @@ class LambdaStack(Stack):
             function_name="s3-event-processor",
             runtime=lambda_.Runtime.PYTHON_3_9,
             handler="index.lambda_handler",
-            code=lambda_.Code.from_asset("assets/lambda"),
+            code=lambda_.Code.from_asset(lambda_asset_dir()),
+            timeout=Duration.seconds(60),
             environment={
-                "glue_job_name": self.glue_job_name
+                "glue_job_name": self.glue_job_name,
+                "bucket_name": self.bucket_name,
+                "temp_folder": self.temp_folder,
+                "max_batch_files": str(max_batch_files),
+                "max_batch_bytes": str(max_batch_bytes),
+                "small_file_job_name": self.small_file_job_name,
+                "small_file_threshold_bytes": str(small_file_threshold_bytes),
+                "bytes_per_worker": str(bytes_per_worker),
+                "min_workers": str(min_workers),
+                "max_workers": str(max_workers),
+                "worker_type": "G.1X",
+                "presplit_job_name": self.presplit_job_name,
+                "presplit_threshold_bytes": str(presplit_threshold_bytes),
+                "ledger_table_name": self.ledger_table_name,
+                "start_max_attempts": str(start_max_attempts),
+                "retry_base_delay_seconds": str(int(retry_base_delay.to_seconds())),
+                "retry_max_delay_seconds": str(int(retry_max_delay.to_seconds())),
             },
         )
 
@@ -54,12 +132,39 @@ class LambdaStack(Stack):
             bucket_arn=s3_bucket_arn
         )
 
-        self.lambda_function.add_permission("S3InvokePermission",
-            principal=iam.ServicePrincipal("s3.amazonaws.com"),
-            action="lambda:InvokeFunction",
-            source_arn=bucket.bucket_arn,
+        # Buffer upload notifications so one Lambda invocation sees many files
+        self.dead_letter_queue = sqs.Queue(
+            self,
+            "UploadBufferDeadLetterQueue",
+            retention_period=Duration.days(14),
+        )
+
+        self.upload_queue = sqs.Queue(
+            self,
+            "UploadBufferQueue",
+            visibility_timeout=Duration.minutes(6),  # 6x the Lambda timeout
+            retention_period=Duration.days(4),
+            # Throttled starts are retried through the queue, leave room for several backoffs
+            dead_letter_queue=sqs.DeadLetterQueue(
+                max_receive_count=max_receive_count,
+                queue=self.dead_letter_queue
+            ),
         )
 
+        # Flush a batch when the file count or the batching window is reached,
+        # with at most max_concurrency invocations draining the queue
+        self.lambda_function.add_event_source(lambda_event_sources.SqsEventSource(
+            self.upload_queue,
+            batch_size=max_batch_files,
+            max_batching_window=max_batching_window,
+            max_concurrency=max_concurrency,
+            report_batch_item_failures=True,
+        ))
+
+        # Throttled messages are deferred in the queue, and the queue depth is reported
+        self.lambda_function.add_environment("queue_url", self.upload_queue.queue_url)
+        self.upload_queue.grant(self.lambda_function, "sqs:ChangeMessageVisibility", "sqs:GetQueueAttributes")
+
         # Grant SSM read permissions to the Lambda function for all params starting with /glue-poc/
         self.lambda_function.add_to_role_policy(iam.PolicyStatement(
             actions=["ssm:GetParameter"],
@@ -72,8 +177,19 @@ class LambdaStack(Stack):
             resources=[f"arn:aws:glue:{self.region}:{self.account}:job/*"]
         ))
 
+        # Grant conditional writes to the trigger ledger
+        self.lambda_function.add_to_role_policy(iam.PolicyStatement(
+            actions=["dynamodb:PutItem", "dynamodb:DeleteItem"],
+            resources=[f"arn:aws:dynamodb:{self.region}:{self.account}:table/{self.ledger_table_name}"]
+        ))
+
+        # Grant write access to the batch manifests in the temp folder
+        bucket.grant_put(self.lambda_function, f"{self.temp_folder}/manifests/*")
+        if kms_key is not None:
+            kms_key.grant_encrypt_decrypt(self.lambda_function)
+
         bucket.add_event_notification(
             s3.EventType.OBJECT_CREATED,
-            s3n.LambdaDestination(self.lambda_function),
+            s3n.SqsDestination(self.upload_queue),
             s3.NotificationKeyFilter(prefix=self.source_folder)
         )
@@ -52,6 +52,11 @@ class S3Stack(Stack):
             string_parameter_name="/glue-poc/failed-folder"
         ).string_value
 
+        self.stream_folder = ssm.StringParameter.from_string_parameter_name(
+            self, "StreamFolder",
+            string_parameter_name="/glue-poc/stream-folder"
+        ).string_value
+
         # Create an S3 bucket with server-side encryption using the provided KMS key
         self.bucket = s3.Bucket(
             self, 
@@ -121,7 +126,7 @@ class S3Stack(Stack):
             prune=False,
             retain_on_delete=False,
         )
-        self.bucket.grant_write(iam_role, f"{self.destination_folder}/*")
+        self.bucket.grant_read_write(iam_role, f"{self.destination_folder}/*")
 
         self.failed_folder_deployment = s3deploy.BucketDeployment(
             self,
@@ -134,6 +139,19 @@ class S3Stack(Stack):
         )
         self.bucket.grant_read_write(iam_role, f"{self.failed_folder}/*")
 
+        # Files of the streaming job, which moves committed files out of the folder (--clean_source)
+        self.stream_folder_deployment = s3deploy.BucketDeployment(
+            self,
+            "StreamFolderDeployment",
+            sources=[s3deploy.Source.asset("assets/empty")],
+            destination_bucket=self.bucket,
+            destination_key_prefix=self.stream_folder,
+            prune=False,
+            retain_on_delete=False,
+        )
+        self.bucket.grant_read_write(iam_role, f"{self.stream_folder}/*")
+        self.bucket.grant_delete(iam_role, f"{self.stream_folder}/*")
+
         # Create a temp folder inside the bucket
         temp_folder = s3deploy.BucketDeployment(
             self,
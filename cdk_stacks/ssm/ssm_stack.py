@@ -39,6 +39,12 @@ class SSMStack(Stack):
             string_value="archive"
         )
 
+        self.stream_folder = ssm.StringParameter(
+            self, "StreamFolder",
+            parameter_name="/glue-poc/stream-folder",
+            string_value="stream"
+        )
+
         self.temp_folder = ssm.StringParameter(
             self, "TempFolder",
             parameter_name="/glue-poc/temp-folder",
@@ -51,6 +57,18 @@ class SSMStack(Stack):
             string_value="glue-poc-etl-job"
         )
 
+        self.small_file_job_name = ssm.StringParameter(
+            self, "SmallFileJobName",
+            parameter_name="/glue-poc/small-file-job-name",
+            string_value="glue-poc-small-file-job"
+        )
+
+        self.presplit_job_name = ssm.StringParameter(
+            self, "PresplitJobName",
+            parameter_name="/glue-poc/presplit-job-name",
+            string_value="glue-poc-presplit-job"
+        )
+
         self.failed_folder = ssm.StringParameter(
             self, "FailedFolder",
             parameter_name="/glue-poc/failed-folder",
@@ -74,3 +92,15 @@ class SSMStack(Stack):
             parameter_name="/glue-poc/dynamodb-table-name",
             string_value="glue-poc-table"
         )
+
+        self.state_table_name = ssm.StringParameter(
+            self, "StateTableName",
+            parameter_name="/glue-poc/state-table-name",
+            string_value="glue-poc-job-state"
+        )
+
+        self.ledger_table_name = ssm.StringParameter(
+            self, "LedgerTableName",
+            parameter_name="/glue-poc/ledger-table-name",
+            string_value="glue-poc-file-ledger"
+        )
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The Lambda and Glue job sources are deployed as plain script folders, so
+# expose them on the import path the same way their runtimes do. The local
+# tools are plain scripts as well.
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+for asset_folder in ("assets/lambda", "assets/etl_scripts", "tools"):
+    sys.path.insert(0, os.path.join(ROOT, asset_folder))
@@ -0,0 +1,71 @@
+import gzip
+import json
+
+from analyze_spark_events import analyze, main, parse_step
+
+def _task_end(stage_id, run_ms, **metrics):
+    return {
+        "Event": "SparkListenerTaskEnd",
+        "Stage ID": stage_id,
+        "Stage Attempt ID": 0,
+        "Task Info": {"Launch Time": 0, "Finish Time": run_ms, "Failed": False, "Killed": False},
+        "Task Metrics": {"Executor Run Time": run_ms, **metrics},
+    }
+
+def _stage(kind, stage_id, name, submitted, completed=None, description=None):
+    info = {"Stage ID": stage_id, "Stage Attempt ID": 0, "Stage Name": name, "Submission Time": submitted}
+    if completed is not None:
+        info["Completion Time"] = completed
+    event = {"Event": kind, "Stage Info": info}
+    if description:
+        event["Properties"] = {"spark.job.description": description}
+    return event
+
+def _event_log():
+    return [
+        {"Event": "SparkListenerApplicationStart", "App Name": "glue-poc-job"},
+        {"Event": "SparkListenerJobStart", "Job ID": 0, "Stage IDs": [0],
+         "Properties": {"spark.job.description": "process_file:read:glue_poc_orders"}},
+        _stage("SparkListenerStageSubmitted", 0, "count at validation.py:40", 1000),
+        _task_end(0, 1000, **{"Input Metrics": {"Bytes Read": 100}, "JVM GC Time": 500}),
+        _task_end(0, 1000, **{"Input Metrics": {"Bytes Read": 100}}),
+        _stage("SparkListenerStageCompleted", 0, "count at validation.py:40", 1000, 3000),
+        {"Event": "SparkListenerJobStart", "Job ID": 1, "Stage IDs": [1]},
+        _stage("SparkListenerStageSubmitted", 1, "foreachPartition at dynamodb_writer.py:90", 4000,
+               description="process_file:dynamodb_write:glue_poc_orders"),
+        _task_end(1, 1000, **{"Shuffle Read Metrics": {"Remote Bytes Read": 30, "Local Bytes Read": 20}}),
+        _task_end(1, 1000),
+        _task_end(1, 9000, **{"Disk Bytes Spilled": 4096, "Memory Bytes Spilled": 8192}),
+        _stage("SparkListenerStageCompleted", 1, "foreachPartition at dynamodb_writer.py:90", 4000, 14000),
+    ]
+
+# resource in glue_cdk/tools/analyze_spark_events.py
+def test_stages_are_traced_to_their_process_file_step(tmp_path):
+    log_path = tmp_path / "eventlog_v2_spark-application-1" / "events_1_spark-application-1.gz"
+    log_path.parent.mkdir()
+    with gzip.open(log_path, "wt") as log:
+        log.write("\n".join(json.dumps(event) for event in _event_log()) + "\n{\"Event\": \"truncat")
+
+    report = analyze([str(tmp_path)])
+
+    read, write = report["stages"]
+    assert (read["step"], read["table"], read["input_bytes"], read["duration_ms"]) == ("read", "glue_poc_orders", 200, 2000)
+    assert read["flags"] == ["gc"]
+    assert (write["step"], write["tasks"], write["task_ms_median"], write["task_ms_max"]) == ("dynamodb_write", 3, 1000, 9000)
+    assert write["skew"] == 9.0
+    assert write["flags"] == ["skew", "spill"]
+    assert write["shuffle_read_bytes"] == 50
+    assert [step["step"] for step in report["steps"]] == ["read", "dynamodb_write"]
+    assert report["steps"][1]["disk_spill_bytes"] == 4096
+
+def test_cli_writes_the_json_report(tmp_path, capsys):
+    log_path = tmp_path / "spark-application-1"
+    log_path.write_text("\n".join(json.dumps(event) for event in _event_log()))
+    output_path = tmp_path / "report.json"
+
+    assert main([str(log_path), "--top", "1", "--output", str(output_path)]) == 0
+
+    printed = capsys.readouterr().out
+    assert "Slowest 1 stages" in printed and "dynamodb_write" in printed
+    assert len(json.loads(output_path.read_text())["stages"]) == 2
+    assert parse_step("count at NativeMethodAccessorImpl.java:0") == ("unlabelled", None)
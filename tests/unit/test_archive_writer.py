@@ -0,0 +1,46 @@
+import datetime
+
+import pytest
+
+pytest.importorskip("pyspark")
+
+import boto3
+from moto import mock_aws
+from pyspark.sql import SparkSession
+
+from archive_writer import NULL_PARTITION_VALUE, _ensure_table, partition_directory_value, write_parquet_archive
+
+DATABASE = "glue_poc_db"
+LOCATION = "s3://glue-poc-bucket/data/_parquet/orders_archive/"
+PARTITION_KEY = {"Name": "ingest_date", "Type": "date"}
+
+# resource in glue_cdk/assets/etl_scripts/archive_writer.py
+def test_partition_directory_value_matches_spark_escaping():
+    assert partition_directory_value(datetime.date(2026, 10, 18)) == "2026-10-18"
+    assert partition_directory_value("a/b:c d") == "a%2Fb%3Ac d"
+    assert partition_directory_value(True) == "true"
+    assert partition_directory_value(None) == NULL_PARTITION_VALUE
+
+@mock_aws
+def test_ensure_table_only_updates_changed_columns():
+    glue_client = boto3.client("glue", region_name="us-east-1")
+    glue_client.create_database(DatabaseInput={"Name": DATABASE})
+    columns = [{"Name": "id", "Type": "bigint"}]
+
+    for _ in range(3):
+        _ensure_table(glue_client, DATABASE, "orders_archive", columns, PARTITION_KEY, LOCATION)
+    assert len(glue_client.get_table_versions(DatabaseName=DATABASE, TableName="orders_archive")["TableVersions"]) == 1
+
+    _ensure_table(glue_client, DATABASE, "orders_archive", columns + [{"Name": "name", "Type": "string"}], PARTITION_KEY, LOCATION)
+    table = glue_client.get_table(DatabaseName=DATABASE, Name="orders_archive")["Table"]
+    assert [column["Name"] for column in table["StorageDescriptor"]["Columns"]] == ["id", "name"]
+
+def test_write_parquet_archive_writes_few_files_per_partition(tmp_path):
+    spark = SparkSession.builder.master("local[4]").getOrCreate()
+    df = spark.createDataFrame([(i, f"2026-10-{1 + i % 3:02d}") for i in range(3000)], "id bigint, day string")
+
+    write_parquet_archive(df, str(tmp_path), "day", file_count=2)
+
+    for day in ("2026-10-01", "2026-10-02", "2026-10-03"):
+        files = [path for path in (tmp_path / f"day={day}").iterdir() if path.suffix == ".parquet"]
+        assert 1 <= len(files) <= 2
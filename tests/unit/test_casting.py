@@ -0,0 +1,55 @@
+import decimal
+
+import pytest
+
+from casting import cast_value, project_row
+
+# resource in glue_cdk/assets/etl_scripts/casting.py
+@pytest.mark.parametrize("value, col_type, expected", [
+    ("42", "int", 42),
+    (" 42 ", "bigint", 42),
+    ("4.9", "int", 4),
+    ("2147483648", "int", None),
+    ("abc", "int", None),
+    ("1.5", "double", 1.5),
+    ("yes", "boolean", True),
+    ("0", "boolean", False),
+    ("maybe", "boolean", None),
+    ("2024-01-02 03:04:05.120", "timestamp", "2024-01-02 03:04:05.12"),
+    ("2024-01-02", "timestamp", "2024-01-02 00:00:00"),
+    ("2024-02-30", "timestamp", None),
+    ("12.345", "decimal(5,2)", decimal.Decimal("12.35")),
+    ("12345", "decimal(5,2)", None),
+    (" padded ", "string", " padded "),
+])
+def test_cast_value_follows_spark_string_casts(value, col_type, expected):
+    assert cast_value(value, col_type) == expected
+
+def test_project_row_applies_defaults_and_keeps_unknown_columns():
+    catalog_schema = {"id": "bigint", "amount": "double", "name": "string", "active": "boolean"}
+
+    projected = project_row({"id": "7", "amount": "", "extra": "x"}, catalog_schema, ["id", "amount", "extra"])
+
+    assert projected == {"id": 7, "amount": 0.0, "extra": "x", "name": "", "active": False}
+
+def test_project_row_matches_the_spark_projection():
+    pytest.importorskip("pyspark")
+    from pyspark.sql import SparkSession
+    from projection import apply_projection
+
+    catalog_schema = {"id": "bigint", "qty": "int", "price": "double", "flag": "boolean", "ts": "timestamp"}
+    source_columns = ["id", "qty", "price", "flag", "ts"]
+    rows = [
+        {"id": "1", "qty": "3", "price": "2.5", "flag": "true", "ts": "2024-01-02 03:04:05"},
+        {"id": "2", "qty": "", "price": "x", "flag": "no", "ts": ""},
+        {"id": "3", "qty": "7.9", "price": "", "flag": "", "ts": "2024-01-02"},
+    ]
+
+    spark = SparkSession.builder.master("local[1]").getOrCreate()
+    df = spark.createDataFrame([tuple(row[c] for c in source_columns) for row in rows], source_columns)
+    spark_rows = [
+        {**row.asDict(), "ts": None if row.ts is None else str(row.ts)}
+        for row in apply_projection(df, catalog_schema).collect()
+    ]
+
+    assert spark_rows == [project_row(row, catalog_schema, source_columns) for row in rows]
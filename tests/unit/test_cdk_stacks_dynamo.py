@@ -0,0 +1,32 @@
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+
+from cdk_stacks.dynamo.dynamo_stack import DynamoStack
+
+IAM_ROLE_ARN = "arn:aws:iam::123456789012:role/glue-poc-role"
+
+# resource in glue_cdk/cdk_stacks/dynamo/dynamo_stack.py
+def test_dynamo_table_on_demand():
+    app = core.App()
+    stack = DynamoStack(app, "DynamoStack", iam_role_arn=IAM_ROLE_ARN, on_demand=True)
+    template = assertions.Template.from_stack(stack)
+
+    template.has_resource_properties("AWS::DynamoDB::Table", {
+        "BillingMode": "PAY_PER_REQUEST",
+        "KeySchema": [{"AttributeName": "id", "KeyType": "HASH"}]
+    })
+    template.resource_count_is("AWS::ApplicationAutoScaling::ScalableTarget", 0)
+
+def test_dynamo_table_autoscaled_write_capacity():
+    app = core.App()
+    stack = DynamoStack(app, "DynamoStack", iam_role_arn=IAM_ROLE_ARN, write_capacity=10, max_write_capacity=200)
+    template = assertions.Template.from_stack(stack)
+
+    template.has_resource_properties("AWS::DynamoDB::Table", {
+        "ProvisionedThroughput": {"ReadCapacityUnits": 5, "WriteCapacityUnits": 10}
+    })
+    template.has_resource_properties("AWS::ApplicationAutoScaling::ScalableTarget", {
+        "MinCapacity": 10,
+        "MaxCapacity": 200,
+        "ScalableDimension": "dynamodb:table:WriteCapacityUnits"
+    })
@@ -0,0 +1,81 @@
+import pytest
+
+pytest.importorskip("pyspark")
+
+import boto3
+from moto import mock_aws
+from pyspark.sql import SparkSession
+
+from change_detection import (
+    DELETED_COLUMN, HASH_COLUMN, add_row_hash, detect_changes, latest_index_path, write_index
+)
+
+BUCKET = "glue-poc-bucket"
+COLUMNS = ["id", "name", "qty"]
+
+def _spark():
+    return SparkSession.builder.master("local[2]").getOrCreate()
+
+def _load(spark, rows):
+    return spark.createDataFrame(rows, "id bigint, name string, qty int")
+
+def _load_and_index(spark, s3_client, df, index_path, snapshot=False):
+    previous_index_path = latest_index_path(s3_client, BUCKET, "data", "orders")
+    changes, hashed = detect_changes(spark, df, COLUMNS, previous_index_path, emit_tombstones=snapshot)
+    rows = {row.id: row for row in changes.collect()}
+    write_index(spark, s3_client, hashed, previous_index_path, index_path, BUCKET, "data", "orders", snapshot)
+    return rows
+
+# resource in glue_cdk/assets/etl_scripts/change_detection.py
+def test_row_hash_only_changes_with_a_value():
+    spark = _spark()
+    df = spark.createDataFrame(
+        [(1, "a", None), (2, "a", None), (3, "a", ""), (4, "b", None)], "id bigint, name string, note string"
+    )
+    reordered = df.select("note", "name", "id")
+
+    hashes = [row[HASH_COLUMN] for row in add_row_hash(df, ["name", "note"]).orderBy("id").collect()]
+    reordered_hashes = [row[HASH_COLUMN] for row in add_row_hash(reordered, ["note", "name"]).orderBy("id").collect()]
+
+    assert hashes == reordered_hashes
+    # Same values hash the same, a null differs from an empty string
+    assert hashes[0] == hashes[1]
+    assert len({hashes[0], hashes[2], hashes[3]}) == 3
+
+@mock_aws
+def test_rerun_writes_only_new_and_changed_rows(tmp_path):
+    spark = _spark()
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket=BUCKET)
+
+    first = _load_and_index(spark, s3_client, _load(spark, [(1, "a", 1), (2, "b", 2), (3, "c", 3)]),
+                            str(tmp_path / "run=1"))
+    pointer = latest_index_path(s3_client, BUCKET, "data", "orders")
+    unchanged = _load_and_index(spark, s3_client, _load(spark, [(1, "a", 1), (2, "b", 2), (3, "c", 3)]),
+                                str(tmp_path / "run=2"))
+    second = _load_and_index(spark, s3_client, _load(spark, [(1, "a", 1), (2, "b", 5), (4, "d", 4)]),
+                             str(tmp_path / "run=3"))
+    # Without a snapshot the index carries the ids missing from the load forward
+    index = {row.id: row[HASH_COLUMN] for row in spark.read.parquet(str(tmp_path / "run=3")).collect()}
+
+    assert sorted(first) == [1, 2, 3]
+    assert pointer == str(tmp_path / "run=1")
+    assert unchanged == {}
+    assert sorted(second) == [2, 4]
+    assert second[2].qty == 5
+    assert latest_index_path(s3_client, BUCKET, "data", "orders") == str(tmp_path / "run=3")
+    assert sorted(index) == [1, 2, 3, 4]
+
+@mock_aws
+def test_snapshot_loads_tombstone_missing_ids(tmp_path):
+    spark = _spark()
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket=BUCKET)
+
+    _load_and_index(spark, s3_client, _load(spark, [(1, "a", 1), (2, "b", 2)]), str(tmp_path / "run=1"), snapshot=True)
+    second = _load_and_index(spark, s3_client, _load(spark, [(1, "a", 1), (3, "c", 3)]), str(tmp_path / "run=2"),
+                             snapshot=True)
+    index = spark.read.parquet(str(tmp_path / "run=2"))
+
+    assert {row_id: row[DELETED_COLUMN] for row_id, row in second.items()} == {2: True, 3: False}
+    assert sorted(row.id for row in index.collect()) == [1, 3]
@@ -0,0 +1,97 @@
+import time
+
+import boto3
+from moto import mock_aws
+
+from discovery import advance_watermark, list_pending_objects, read_watermark, settled_position
+from ledger import claim_discovered
+from trigger_ledger import claim
+
+BUCKET = "glue-poc-bucket"
+STATE_TABLE = "glue-poc-job-state"
+LEDGER_TABLE = "glue-poc-file-ledger"
+
+def _s3_client():
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket=BUCKET)
+    return s3_client
+
+def _dynamodb_client():
+    dynamodb_client = boto3.client("dynamodb", region_name="us-east-1")
+    dynamodb_client.create_table(
+        TableName=STATE_TABLE,
+        KeySchema=[{"AttributeName": "job_name", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "job_name", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST"
+    )
+    return dynamodb_client
+
+# resource in glue_cdk/assets/etl_scripts/discovery.py
+@mock_aws
+def test_list_pending_objects_skips_processed_recent_and_nested_objects():
+    s3_client = _s3_client()
+    for key in ("data/a.csv", "data/b.csv", "data/c.csv", "data/nested/d.csv", "archive/e.csv"):
+        s3_client.put_object(Bucket=BUCKET, Key=key, Body=b"id\n1\n")
+    listed = list_pending_objects(s3_client, BUCKET, "data", None, 0, 100, 10 ** 9, now=time.time() + 60)
+    watermark = {"last_modified_ms": listed[0]["last_modified_ms"], "key": listed[0]["key"]}
+
+    pending = list_pending_objects(s3_client, BUCKET, "data", watermark, 0, 100, 10 ** 9, now=time.time() + 60)
+    too_recent = list_pending_objects(s3_client, BUCKET, "data", None, 3600, 100, 10 ** 9)
+
+    assert [obj["file_name"] for obj in listed] == ["a.csv", "b.csv", "c.csv"]
+    assert [obj["file_name"] for obj in pending] == ["b.csv", "c.csv"]
+    assert too_recent == []
+
+@mock_aws
+def test_list_pending_objects_limits_the_batch():
+    s3_client = _s3_client()
+    for i in range(5):
+        s3_client.put_object(Bucket=BUCKET, Key=f"data/file_{i}.csv", Body=b"x" * 10)
+
+    by_count = list_pending_objects(s3_client, BUCKET, "data", None, 0, 2, 10 ** 9, now=time.time() + 60)
+    by_bytes = list_pending_objects(s3_client, BUCKET, "data", None, 0, 100, 35, now=time.time() + 60)
+
+    assert len(by_count) == 2
+    assert len(by_bytes) == 3
+
+@mock_aws
+def test_advance_watermark_is_conditional_on_the_previous_value():
+    dynamodb_client = _dynamodb_client()
+    first = {"last_modified_ms": 1000, "key": "data/a.csv"}
+    second = {"last_modified_ms": 2000, "key": "data/b.csv"}
+
+    assert advance_watermark(dynamodb_client, STATE_TABLE, "job", None, first)
+    assert advance_watermark(dynamodb_client, STATE_TABLE, "job", first, second)
+    # A run that started from the first watermark must not move it back
+    assert not advance_watermark(dynamodb_client, STATE_TABLE, "job", first, first)
+    assert read_watermark(dynamodb_client, STATE_TABLE, "job") == second
+
+@mock_aws
+def test_watermark_stops_before_files_another_run_holds():
+    s3_client = _s3_client()
+    dynamodb_client = _dynamodb_client()
+    dynamodb_client.create_table(
+        TableName=LEDGER_TABLE,
+        KeySchema=[{"AttributeName": "file_id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "file_id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST"
+    )
+    for name in ("a.csv", "b.csv", "c.csv"):
+        s3_client.put_object(Bucket=BUCKET, Key=f"data/{name}", Body=b"id\n1\n")
+    # The trigger Lambda claimed b.csv and crashed before starting the job
+    etag = s3_client.head_object(Bucket=BUCKET, Key="data/b.csv")["ETag"].strip('"')
+    claim(dynamodb_client, LEDGER_TABLE, {"bucket": BUCKET, "key": "data/b.csv", "version_id": "", "etag": etag})
+    listed = list_pending_objects(s3_client, BUCKET, "data", None, 0, 100, 10 ** 9, now=time.time() + 60)
+
+    owned, held = claim_discovered(dynamodb_client, s3_client, LEDGER_TABLE, BUCKET, listed, "job", "run-1")
+    for input_file in owned:
+        s3_client.delete_object(Bucket=BUCKET, Key=input_file["key"])
+    advance_watermark(dynamodb_client, STATE_TABLE, "job", None,
+                      settled_position(listed, {input_file["key"] for input_file in held}))
+    watermark = read_watermark(dynamodb_client, STATE_TABLE, "job")
+    pending = list_pending_objects(s3_client, BUCKET, "data", watermark, 0, 100, 10 ** 9, now=time.time() + 60)
+
+    assert [f["file_name"] for f in owned] == ["a.csv", "c.csv"]
+    assert watermark["key"] == "data/a.csv"
+    assert [obj["file_name"] for obj in pending] == ["b.csv"]
+    assert settled_position(listed, {"data/a.csv"}) is None
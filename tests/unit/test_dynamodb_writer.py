@@ -0,0 +1,51 @@
+import pytest
+
+import dynamodb_writer
+from dynamodb_writer import _write_batch, write_partition
+
+TABLE = "glue-poc-table"
+
+class _StubDynamoDBClient:
+    # Returns the queued UnprocessedItems of every batch_write_item call, then succeeds
+    def __init__(self, unprocessed_responses):
+        self._unprocessed_responses = list(unprocessed_responses)
+        self.requests = []
+
+    def batch_write_item(self, RequestItems):
+        self.requests.append(RequestItems[TABLE])
+        if self._unprocessed_responses:
+            return {"UnprocessedItems": {TABLE: self._unprocessed_responses.pop(0)}}
+        return {"UnprocessedItems": {}}
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(dynamodb_writer.time, "sleep", delays.append)
+    return delays
+
+def _put(item_id):
+    return {"PutRequest": {"Item": {"id": {"N": str(item_id)}}}}
+
+# resource in glue_cdk/assets/etl_scripts/dynamodb_writer.py
+def test_write_partition_retries_unprocessed_items_with_full_jitter(monkeypatch, sleeps):
+    client = _StubDynamoDBClient([[_put(2), _put(3)], [_put(3)]])
+    monkeypatch.setattr(dynamodb_writer, "get_client", lambda service_name: client)
+
+    stats = write_partition(iter([{"id": 1}, {"id": 2}, {"id": 3}]), TABLE, base_delay=0.1)
+
+    assert (stats["items"], stats["retries"]) == (3, 2)
+    # Only the unprocessed items are sent again
+    assert client.requests == [[_put(1), _put(2), _put(3)], [_put(2), _put(3)], [_put(3)]]
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 0.1 and 0 <= sleeps[1] <= 0.2
+
+def test_write_batch_fails_once_the_retries_are_exhausted(sleeps):
+    client = _StubDynamoDBClient([[_put(1)]] * 4)
+
+    with pytest.raises(Exception, match="1 items still unprocessed after 3 retries"):
+        _write_batch(client, TABLE, [_put(1)], max_retries=3, base_delay=0.05)
+
+    assert len(client.requests) == 4
+    # No backoff after the last attempt
+    assert len(sleeps) == 3
+    assert all(0 <= delay <= 0.05 * 2 ** attempt for attempt, delay in enumerate(sleeps))
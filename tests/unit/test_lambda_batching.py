@@ -0,0 +1,59 @@
+import json
+
+from batching import build_batches, extract_s3_objects
+from routing import split_by_size, split_presplit, spark_workers
+
+def _s3_record(key, size):
+    return {"s3": {"bucket": {"name": "glue-poc-bucket"}, "object": {"key": key, "size": size}}}
+
+# resource in glue_cdk/assets/lambda/batching.py
+def test_extract_s3_objects_reads_every_sqs_record():
+    event = {"Records": [
+        {"eventSource": "aws:sqs", "messageId": "m1", "body": json.dumps({"Records": [_s3_record("data/a+b.csv", 10)]})},
+        {"eventSource": "aws:sqs", "messageId": "m2", "body": json.dumps({"Records": [_s3_record("data/c.csv", 20)]})},
+        {"eventSource": "aws:sqs", "messageId": "m3", "body": json.dumps({"Event": "s3:TestEvent"})},
+    ]}
+
+    objects = extract_s3_objects(event)
+
+    assert [obj["file_name"] for obj in objects] == ["a b.csv", "c.csv"]
+    assert [obj["message_id"] for obj in objects] == ["m1", "m2"]
+
+def test_build_batches_respects_count_and_size_thresholds():
+    objects = [{"size": size} for size in (40, 40, 40, 200, 10)]
+
+    batches = build_batches(objects, max_files=2, max_bytes=100)
+
+    assert [[obj["size"] for obj in batch] for batch in batches] == [[40, 40], [40], [200], [10]]
+
+# resource in glue_cdk/assets/lambda/routing.py
+def test_split_by_size_routes_small_files_to_the_python_shell_engine():
+    small, large = split_by_size([{"size": 10}, {"size": 100}, {"size": 99}], small_file_threshold=100)
+
+    assert [obj["size"] for obj in small] == [10, 99]
+    assert [obj["size"] for obj in large] == [100]
+
+def test_split_by_size_keeps_compressed_and_columnar_files_on_spark():
+    objects = [{"file_name": name, "size": 10} for name in ("a.csv", "b.csv.gz", "c.parquet", "d.jsonl")]
+
+    small, large = split_by_size(objects, small_file_threshold=100)
+
+    assert [obj["file_name"] for obj in small] == ["a.csv"]
+    assert [obj["file_name"] for obj in large] == ["b.csv.gz", "c.parquet", "d.jsonl"]
+
+def test_split_presplit_picks_large_gzip_files():
+    objects = [
+        {"file_name": "big.csv.gz", "size": 500},
+        {"file_name": "small.csv.gz", "size": 10},
+        {"file_name": "big.csv", "size": 500},
+    ]
+
+    presplit, others = split_presplit(objects, presplit_threshold=100)
+
+    assert [obj["file_name"] for obj in presplit] == ["big.csv.gz"]
+    assert [obj["file_name"] for obj in others] == ["small.csv.gz", "big.csv"]
+
+def test_spark_workers_scale_with_input_size_within_bounds():
+    assert spark_workers(1, bytes_per_worker=100, min_workers=2, max_workers=10) == 2
+    assert spark_workers(550, bytes_per_worker=100, min_workers=2, max_workers=10) == 6
+    assert spark_workers(5000, bytes_per_worker=100, min_workers=2, max_workers=10) == 10
@@ -0,0 +1,31 @@
+import pytest
+
+import clients
+
+@pytest.fixture(autouse=True)
+def _reset_clients(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    clients.reset_clients()
+    yield
+    clients.reset_clients()
+
+# resource in glue_cdk/assets/lambda/clients.py
+def test_get_client_reuses_the_client_across_calls():
+    glue = clients.get_client("glue")
+
+    assert clients.get_client("glue") is glue
+    assert clients.get_client("s3") is not glue
+    assert glue.meta.config.retries["mode"] == "adaptive"
+
+def test_get_client_uses_the_service_endpoint_override(monkeypatch):
+    monkeypatch.setenv("AWS_ENDPOINT_URL", "http://127.0.0.1:5000")
+    monkeypatch.setenv("AWS_ENDPOINT_URL_SQS", "http://127.0.0.1:9324")
+
+    assert clients.get_client("sqs").meta.endpoint_url == "http://127.0.0.1:9324"
+    assert clients.get_client("glue").meta.endpoint_url == "http://127.0.0.1:5000"
+
+def test_set_client_injects_a_stand_in():
+    stand_in = object()
+    clients.set_client("glue", stand_in)
+
+    assert clients.get_client("glue") is stand_in
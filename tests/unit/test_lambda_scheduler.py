@@ -0,0 +1,76 @@
+import pytest
+from botocore.exceptions import ClientError
+
+from scheduler import JobRunThrottled, defer_messages, queue_messages, start_job_run, wait_seconds
+
+class FakeGlue:
+    """
+    Stand-in for the Glue client that throttles the first starts.
+    """
+    def __init__(self, throttled_starts, error_code="ConcurrentRunsExceededException"):
+        self.throttled_starts = throttled_starts
+        self.error_code = error_code
+        self.calls = 0
+
+    def start_job_run(self, **kwargs):
+        self.calls += 1
+        if self.calls <= self.throttled_starts:
+            raise ClientError({"Error": {"Code": self.error_code, "Message": "limit"}}, "StartJobRun")
+        return {"JobRunId": f"jr_{self.calls}"}
+
+class FakeQueue:
+    """
+    Stand-in for the upload buffer queue that records visibility changes.
+    """
+    def __init__(self):
+        self.visibility = {}
+
+    def change_message_visibility_batch(self, QueueUrl, Entries):
+        assert len(Entries) <= 10
+        for entry in Entries:
+            self.visibility[entry["ReceiptHandle"]] = entry["VisibilityTimeout"]
+
+def _sqs_record(message_id, receive_count, sent_timestamp):
+    return {
+        "eventSource": "aws:sqs",
+        "messageId": message_id,
+        "receiptHandle": f"rh-{message_id}",
+        "attributes": {"ApproximateReceiveCount": str(receive_count), "SentTimestamp": str(sent_timestamp)},
+        "body": "{}",
+    }
+
+# resource in glue_cdk/assets/lambda/scheduler.py
+def test_start_job_run_retries_throttled_starts():
+    glue = FakeGlue(throttled_starts=2)
+    delays = []
+
+    response = start_job_run(glue, max_attempts=3, sleep=delays.append, JobName="job")
+
+    assert response == {"JobRunId": "jr_3"}
+    assert len(delays) == 2 and all(0 <= delay <= 8 for delay in delays)
+
+def test_start_job_run_gives_up_after_max_attempts():
+    glue = FakeGlue(throttled_starts=5)
+
+    with pytest.raises(JobRunThrottled):
+        start_job_run(glue, max_attempts=3, sleep=lambda delay: None, JobName="job")
+    assert glue.calls == 3
+
+def test_start_job_run_does_not_retry_other_errors():
+    glue = FakeGlue(throttled_starts=1, error_code="EntityNotFoundException")
+
+    with pytest.raises(ClientError):
+        start_job_run(glue, max_attempts=3, sleep=lambda delay: None, JobName="job")
+    assert glue.calls == 1
+
+def test_defer_messages_backs_off_with_the_receive_count():
+    event = {"Records": [_sqs_record(f"m{i}", receive_count, 1000) for i, receive_count in enumerate([1] * 11 + [6])]}
+    messages = queue_messages(event)
+    queue = FakeQueue()
+
+    delays = defer_messages(queue, "queue-url", messages, 30, 900, rng=lambda: 1.0)
+
+    assert queue.visibility["rh-m0"] == 60
+    assert queue.visibility["rh-m11"] == 900
+    assert len(delays) == 12
+    assert wait_seconds(messages, now=61) == 60
@@ -0,0 +1,112 @@
+import boto3
+from moto import mock_aws
+
+from ledger import attempt_number, claim_discovered, finish_processing, start_processing
+from trigger_ledger import claim, ledger_id, release
+
+LEDGER_TABLE = "glue-poc-file-ledger"
+
+def _dynamodb_client():
+    dynamodb_client = boto3.client("dynamodb", region_name="us-east-1")
+    dynamodb_client.create_table(
+        TableName=LEDGER_TABLE,
+        KeySchema=[{"AttributeName": "file_id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "file_id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST"
+    )
+    return dynamodb_client
+
+def _upload(key, etag="abc"):
+    return {"bucket": "glue-poc-bucket", "key": key, "version_id": "", "etag": etag}
+
+def _status(dynamodb_client, obj):
+    item = dynamodb_client.get_item(TableName=LEDGER_TABLE, Key={"file_id": {"S": ledger_id(obj)}})["Item"]
+    return item["status"]["S"]
+
+# resource in glue_cdk/assets/lambda/trigger_ledger.py
+@mock_aws
+def test_claim_drops_duplicate_deliveries_but_not_reuploads():
+    dynamodb_client = _dynamodb_client()
+
+    assert claim(dynamodb_client, LEDGER_TABLE, _upload("data/a.csv"))
+    assert not claim(dynamodb_client, LEDGER_TABLE, _upload("data/a.csv"))
+    assert claim(dynamodb_client, LEDGER_TABLE, _upload("data/a.csv", etag="def"))
+
+@mock_aws
+def test_released_and_stale_claims_can_be_taken_again():
+    dynamodb_client = _dynamodb_client()
+    released, stale = _upload("data/a.csv"), _upload("data/b.csv")
+    claim(dynamodb_client, LEDGER_TABLE, released)
+    claim(dynamodb_client, LEDGER_TABLE, stale, now=1000)
+
+    release(dynamodb_client, LEDGER_TABLE, released)
+
+    assert claim(dynamodb_client, LEDGER_TABLE, released)
+    assert claim(dynamodb_client, LEDGER_TABLE, stale, claim_ttl_seconds=60, now=2000)
+
+# resource in glue_cdk/assets/etl_scripts/ledger.py
+@mock_aws
+def test_only_one_run_processes_a_claimed_file():
+    dynamodb_client = _dynamodb_client()
+    obj = _upload("data/a.csv")
+    claim(dynamodb_client, LEDGER_TABLE, obj)
+    input_files = [
+        {"file_name": "a.csv", "size": 1, "ledger_id": ledger_id(obj)},
+        {"file_name": "direct.csv", "size": 1, "ledger_id": None},
+    ]
+
+    first = start_processing(dynamodb_client, LEDGER_TABLE, input_files, "job", "run-1")
+    second = start_processing(dynamodb_client, LEDGER_TABLE, input_files, "job", "run-2")
+    finish_processing(dynamodb_client, LEDGER_TABLE, first, "done", "job", "run-1")
+
+    assert [f["file_name"] for f in first] == ["a.csv", "direct.csv"]
+    assert [f["file_name"] for f in second] == ["direct.csv"]
+    assert _status(dynamodb_client, obj) == "done"
+
+@mock_aws
+def test_a_retry_attempt_takes_back_the_files_of_the_failed_attempt():
+    dynamodb_client = _dynamodb_client()
+    obj = _upload("data/a.csv")
+    claim(dynamodb_client, LEDGER_TABLE, obj)
+    input_files = [{"file_name": "a.csv", "size": 1, "ledger_id": ledger_id(obj)}]
+
+    assert start_processing(dynamodb_client, LEDGER_TABLE, input_files, "job", "jr_1")
+    assert not start_processing(dynamodb_client, LEDGER_TABLE, input_files, "job", "jr_2")
+    assert not start_processing(dynamodb_client, LEDGER_TABLE, input_files, "other-job", "jr_1_attempt_1")
+    assert start_processing(dynamodb_client, LEDGER_TABLE, input_files, "job", "jr_1_attempt_1")
+    finish_processing(dynamodb_client, LEDGER_TABLE, input_files, "done", "job", "jr_1_attempt_1")
+
+    assert _status(dynamodb_client, obj) == "done"
+    assert (attempt_number("jr_1"), attempt_number("jr_1_attempt_2")) == (0, 2)
+
+@mock_aws
+def test_discovery_skips_files_the_trigger_path_claimed():
+    dynamodb_client = _dynamodb_client()
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket="glue-poc-bucket")
+    s3_client.put_bucket_versioning(Bucket="glue-poc-bucket", VersioningConfiguration={"Status": "Enabled"})
+    uploads = {}
+    for name in ("claimed.csv", "stale.csv", "new.csv"):
+        response = s3_client.put_object(Bucket="glue-poc-bucket", Key=f"data/{name}", Body=b"id\n1\n")
+        uploads[name] = {"bucket": "glue-poc-bucket", "key": f"data/{name}",
+                         "version_id": response["VersionId"], "etag": response["ETag"].strip('"')}
+    claim(dynamodb_client, LEDGER_TABLE, uploads["claimed.csv"], now=10000)
+    claim(dynamodb_client, LEDGER_TABLE, uploads["stale.csv"], now=1000)
+    discovered = [{"key": f"data/{name}", "file_name": name, "size": 4} for name in uploads]
+    discovered.append({"key": "data/moved.csv", "file_name": "moved.csv", "size": 4})
+
+    owned, held = claim_discovered(dynamodb_client, s3_client, LEDGER_TABLE, "glue-poc-bucket", discovered, "job",
+                                   "run-1", claim_ttl_seconds=3600, now=10000)
+    again, held_again = claim_discovered(dynamodb_client, s3_client, LEDGER_TABLE, "glue-poc-bucket", discovered,
+                                         "job", "run-2", now=10000)
+    finish_processing(dynamodb_client, LEDGER_TABLE, owned, "done", "job", "run-1")
+    _, held_after_done = claim_discovered(dynamodb_client, s3_client, LEDGER_TABLE, "glue-poc-bucket", discovered,
+                                          "job", "run-3", now=10000)
+
+    assert [f["file_name"] for f in owned] == ["stale.csv", "new.csv"]
+    assert [f["file_name"] for f in held] == ["claimed.csv"]
+    assert again == []
+    assert [f["file_name"] for f in held_again] == ["claimed.csv", "stale.csv", "new.csv"]
+    assert [f["file_name"] for f in held_after_done] == ["claimed.csv"]
+    assert _status(dynamodb_client, uploads["claimed.csv"]) == "claimed"
+    assert _status(dynamodb_client, uploads["new.csv"]) == "done"
@@ -0,0 +1,44 @@
+import pytest
+
+from metrics import MemorySink, MetricsLogger, size_bucket
+from trigger_metrics import emf_document, emit
+
+# resource in glue_cdk/assets/etl_scripts/metrics.py
+def test_timers_and_counters_are_flushed_as_one_emf_document():
+    sink = MemorySink()
+    metrics = MetricsLogger("GluePoc/ETL", {"JobName": "job"}, sink=sink)
+    metrics.set_dimension("Table", "glue_poc_orders")
+    metrics.set_dimension("FileSizeBucket", size_bucket(5 * 1024 * 1024))
+
+    @metrics.timed("MoveTime")
+    def move():
+        return "moved"
+
+    assert move() == "moved"
+    with pytest.raises(ValueError):
+        with metrics.timer("DynamoDBWriteTime"):
+            raise ValueError("write failed")
+    metrics.put_metric("Rows", 10)
+    metrics.put_metric("Rows", 5)
+    document = metrics.flush()
+
+    emf = document["_aws"]["CloudWatchMetrics"][0]
+    assert emf["Namespace"] == "GluePoc/ETL"
+    assert emf["Dimensions"] == [["FileSizeBucket", "JobName", "Table"], ["JobName"]]
+    assert {metric["Name"]: metric["Unit"] for metric in emf["Metrics"]} == {
+        "MoveTime": "Milliseconds", "DynamoDBWriteTime": "Milliseconds", "Rows": "Count"
+    }
+    assert document["FileSizeBucket"] == "1MB_100MB"
+    assert sink.values("Rows") == [10, 5]
+    assert len(sink.values("DynamoDBWriteTime")) == 1
+    # Nothing new was recorded, so nothing is emitted
+    assert metrics.flush() is None and len(sink.documents) == 1
+
+# resource in glue_cdk/assets/lambda/trigger_metrics.py
+def test_trigger_metrics_document():
+    sink = []
+
+    emit(emf_document({"JobName": "job", "FileSizeBucket": "lt_1MB"}, {"TriggerLatency": (120.5, "Milliseconds")}), sink)
+
+    assert sink[0]["TriggerLatency"] == 120.5
+    assert sink[0]["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [["FileSizeBucket", "JobName"]]
@@ -0,0 +1,63 @@
+import gzip
+
+import boto3
+from moto import mock_aws
+
+import presplit
+from presplit import split_gzip_csv
+
+BUCKET = "glue-poc-bucket"
+
+def _s3_client():
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket=BUCKET)
+    return s3_client
+
+def _read_parts(s3_client, parts):
+    return [
+        gzip.decompress(s3_client.get_object(Bucket=BUCKET, Key=part["key"])["Body"].read()).decode("utf-8")
+        for part in parts
+    ]
+
+# resource in glue_cdk/assets/etl_scripts/presplit.py
+@mock_aws
+def test_split_gzip_csv_writes_parts_with_the_header(monkeypatch):
+    monkeypatch.setattr(presplit, "DECOMPRESSED_CHUNK_BYTES", 64)
+    s3_client = _s3_client()
+    rows = [f"{i},name_{i}\n" for i in range(200)]
+    s3_client.put_object(Bucket=BUCKET, Key="data/big.csv.gz", Body=gzip.compress(("id,name\n" + "".join(rows)).encode("utf-8")))
+
+    parts = split_gzip_csv(s3_client, BUCKET, "data/big.csv.gz", BUCKET, "temp/presplit/0", part_bytes=500)
+
+    assert len(parts) > 1
+    contents = _read_parts(s3_client, parts)
+    assert all(content.startswith("id,name\n") for content in contents)
+    assert "".join(content[len("id,name\n"):] for content in contents) == "".join(rows)
+    assert [part["bytes"] for part in parts] == [len(content) for content in contents]
+
+@mock_aws
+def test_split_gzip_csv_reads_every_member_and_keeps_quoted_newlines(monkeypatch):
+    monkeypatch.setattr(presplit, "DECOMPRESSED_CHUNK_BYTES", 16)
+    s3_client = _s3_client()
+    rows = [f'{i},"line one\nline two"\n' for i in range(20)]
+    # Concatenated gzip members, as written by appending compressed chunks
+    body = gzip.compress(("id,note\n" + "".join(rows[:10])).encode("utf-8")) + gzip.compress("".join(rows[10:]).encode("utf-8"))
+    s3_client.put_object(Bucket=BUCKET, Key="data/multi.csv.gz", Body=body)
+
+    parts = split_gzip_csv(s3_client, BUCKET, "data/multi.csv.gz", BUCKET, "temp/presplit/1", part_bytes=40)
+
+    contents = _read_parts(s3_client, parts)
+    assert len(contents) > 1
+    for content in contents:
+        assert content.startswith("id,note\n")
+        assert content.count('"') % 2 == 0
+    assert "".join(content[len("id,note\n"):] for content in contents) == "".join(rows)
+
+@mock_aws
+def test_split_gzip_csv_keeps_a_header_only_file():
+    s3_client = _s3_client()
+    s3_client.put_object(Bucket=BUCKET, Key="data/empty.csv.gz", Body=gzip.compress(b"id,name"))
+
+    parts = split_gzip_csv(s3_client, BUCKET, "data/empty.csv.gz", BUCKET, "temp/presplit/2", part_bytes=500)
+
+    assert _read_parts(s3_client, parts) == ["id,name\n"]
@@ -0,0 +1,69 @@
+import pytest
+
+pytest.importorskip("pyspark")
+
+from pyspark.sql import SparkSession
+from pyspark.sql.functions import spark_partition_id
+
+from prewrite import (
+    HASH_BUCKETS, SOURCE_FILE_COLUMN, SOURCE_ROW_COLUMN, add_source_position, key_distribution, partition_skew,
+    prepare_for_write, write_partition_count
+)
+
+# resource in glue_cdk/assets/etl_scripts/prewrite.py
+def test_write_partition_count_follows_throughput_and_rows():
+    # 4000 items/s needs 4 tasks
+    assert write_partition_count(10_000, 4000, 500_000) == 4
+    # 3M rows at 500k rows per partition need 6, rounded up to 8
+    assert write_partition_count(3_000_000, 4000, 500_000) == 8
+    # Capped at the row count (then rounded) and at the hash buckets
+    assert write_partition_count(3, 4000, 500_000) == 4
+    assert write_partition_count(0, 4000, 500_000) == 1
+    assert write_partition_count(10 ** 12, 4000, 1) == HASH_BUCKETS
+
+def test_prepare_for_write_keeps_last_row_per_id_and_reports_skew():
+    spark = SparkSession.builder.master("local[2]").getOrCreate()
+    rows = [(i, f"v{i}", 0, i) for i in range(100)]
+    # id 7 appears again in a later file, id 8 later in the same file
+    rows += [(7, "late_file", 1, 0), (8, "late_row", 0, 1000)]
+    df = spark.createDataFrame(rows, ["id", "value", SOURCE_FILE_COLUMN, SOURCE_ROW_COLUMN])
+
+    distribution = key_distribution(df)
+    skew = partition_skew(distribution, 4)
+    assert skew["rows"] == 100
+    assert skew["duplicate_rows"] == 2
+    assert skew["min_rows"] <= skew["median_rows"] <= skew["max_rows"]
+
+    written = prepare_for_write(df, 4, dedup=True)
+    assert written.columns == ["id", "value"]
+    values = {row.id: row.value for row in written.collect()}
+    assert len(values) == 100
+    assert values[7] == "late_file"
+    assert values[8] == "late_row"
+
+    # The skew report predicts the partition sizes of the write
+    sizes = sorted(row["count"] for row in written.groupBy(spark_partition_id()).count().collect())
+    assert sizes[-1] == skew["max_rows"]
+    assert sum(sizes) == skew["rows"]
+
+def test_prepare_for_write_prefers_version_column():
+    spark = SparkSession.builder.master("local[1]").getOrCreate()
+    df = spark.createDataFrame(
+        [(1, "newer", 5, 0, 0), (1, "older", 3, 1, 0)],
+        ["id", "value", "version", SOURCE_FILE_COLUMN, SOURCE_ROW_COLUMN]
+    )
+
+    written = prepare_for_write(df, 1, dedup=True, version_column="version").collect()
+
+    assert [(row.id, row.value) for row in written] == [(1, "newer")]
+
+def test_add_source_position_matches_encoded_file_names(tmp_path):
+    spark = SparkSession.builder.master("local[1]").getOrCreate()
+    paths = []
+    for name in ("orders 1.csv", "orders%2.csv"):
+        (tmp_path / name).write_text("id\n1\n")
+        paths.append(str(tmp_path / name))
+
+    df = add_source_position(spark.read.option("header", "true").csv(paths), paths)
+
+    assert sorted(row[SOURCE_FILE_COLUMN] for row in df.collect()) == [0, 1]
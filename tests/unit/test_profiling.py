@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("pyspark")
+
+from pyspark.sql import SparkSession
+
+from profiling import build_metrics_record, collect_profile, observe_profile
+
+# resource in glue_cdk/assets/etl_scripts/profiling.py
+def test_profile_is_observed_in_the_write_pass():
+    spark = SparkSession.builder.master("local[2]").getOrCreate()
+    df = spark.createDataFrame([(i, None if i % 2 else f"v{i}") for i in range(10)], "id bigint, value string")
+
+    assert observe_profile(df, "off") == (df, None)
+    written, observation = observe_profile(df, "sample", fraction=1.0)
+    spark.sparkContext.setJobGroup("profile_write", "write")
+    written.write.format("noop").mode("overwrite").save()
+    jobs = spark.sparkContext.statusTracker().getJobIdsForGroup("profile_write")
+    profile = collect_profile(observation)
+    record = build_metrics_record(profile, table_name="glue_poc_orders")
+
+    assert len(jobs) == 1
+    assert written.columns == ["id", "value"]
+    assert (profile["rows"], profile["nulls"]) == (10, {"id": 0, "value": 5})
+    assert (profile["min"]["id"], profile["max"]["id"]) == (0, 9)
+    assert record["estimated_rows"] == 10
+    assert record["columns"]["value"] == {"nulls": 5, "min": "v0", "max": "v8"}
+    with pytest.raises(ValueError):
+        observe_profile(df, "full")
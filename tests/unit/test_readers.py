@@ -0,0 +1,71 @@
+import gzip
+
+import pytest
+
+pytest.importorskip("pyspark")
+
+import boto3
+from moto import mock_aws
+
+from readers import csv_header_groups, detect_format, detect_input_formats, group_files_options, read_csv_header
+
+BUCKET = "glue-poc-bucket"
+
+# resource in glue_cdk/assets/etl_scripts/readers.py
+@pytest.mark.parametrize("file_name, head, expected", [
+    ("data.csv", None, ("csv", None)),
+    ("data.CSV.GZ", None, ("csv", "gzip")),
+    ("data.gz", None, ("csv", "gzip")),
+    ("part-0001.jsonl.zst", None, ("json", "zstd")),
+    ("part-0001.snappy.parquet", None, ("parquet", None)),
+    ("export", b"PAR1\x15\x00", ("parquet", None)),
+    ("export", b"\x1f\x8b\x08\x00", ("csv", "gzip")),
+    ("export", b'\xef\xbb\xbf{"id": 1}', ("json", None)),
+    ("export", b"id,name\n1,a\n", ("csv", None)),
+])
+def test_detect_format_uses_extension_then_magic_bytes(file_name, head, expected):
+    assert detect_format(file_name, head) == expected
+
+@mock_aws
+def test_detect_input_formats_sniffs_files_without_extension():
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket=BUCKET)
+    s3_client.put_object(Bucket=BUCKET, Key="data/export", Body=b'{"id": 1}\n')
+    s3_client.put_object(Bucket=BUCKET, Key="data/packed", Body=gzip.compress(b"id\n1\n"))
+
+    formats = detect_input_formats(s3_client, [(BUCKET, "data/a.csv.gz"), (BUCKET, "data/export")])
+
+    assert formats == {(BUCKET, "data/a.csv.gz"): ("csv", "gzip"), (BUCKET, "data/export"): ("json", None)}
+    with pytest.raises(ValueError):
+        detect_input_formats(s3_client, [(BUCKET, "data/packed")])
+
+@mock_aws
+def test_read_csv_header_decompresses_gzip_prefix():
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket=BUCKET)
+    body = "id,name,amount\n" + "".join(f"{i},name_{i},{i}.5\n" for i in range(100000))
+    s3_client.put_object(Bucket=BUCKET, Key="data/a.csv.gz", Body=gzip.compress(body.encode("utf-8")))
+
+    assert read_csv_header(s3_client, BUCKET, "data/a.csv.gz", "gzip") == ["id", "name", "amount"]
+    assert read_csv_header(s3_client, BUCKET, "data/a.csv.zst", "zstd") is None
+
+@mock_aws
+def test_csv_header_groups_split_a_batch_by_header():
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket=BUCKET)
+    s3_client.put_object(Bucket=BUCKET, Key="data/a.csv", Body=b"id,name\n1,a\n")
+    s3_client.put_object(Bucket=BUCKET, Key="data/b.csv.gz", Body=gzip.compress(b"name,id,amount\nb,2,1.5\n"))
+    s3_client.put_object(Bucket=BUCKET, Key="data/c.csv", Body=b"id,name\n3,c\n")
+    files = [((BUCKET, "data/a.csv"), None), ((BUCKET, "data/b.csv.gz"), "gzip"), ((BUCKET, "data/c.csv"), None)]
+
+    groups = csv_header_groups(None, s3_client, files)
+
+    assert groups == [
+        (["id", "name"], [f"s3://{BUCKET}/data/a.csv", f"s3://{BUCKET}/data/c.csv"]),
+        (["name", "id", "amount"], [f"s3://{BUCKET}/data/b.csv.gz"]),
+    ]
+
+def test_group_files_options_only_groups_many_small_files():
+    assert group_files_options(1, 10, 128) == {}
+    assert group_files_options(10, 10 * 256, 128) == {}
+    assert group_files_options(1000, 1000 * 64, 128) == {"groupFiles": "inPartition", "groupSize": "128"}
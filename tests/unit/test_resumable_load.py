@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("pyspark")
+
+import boto3
+from moto import mock_aws
+from pyspark.sql import SparkSession
+
+from resumable_load import load_key, load_progress, mark_chunk_done, write_in_chunks
+
+BUCKET = "glue-poc-bucket"
+
+# resource in glue_cdk/assets/etl_scripts/resumable_load.py
+@mock_aws
+def test_rerun_skips_chunks_written_by_the_failed_attempt():
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket=BUCKET)
+    spark = SparkSession.builder.master("local[1]").getOrCreate()
+    df = spark.createDataFrame([(i, f"name_{i}") for i in range(200)], ["id", "name"])
+    prefix = f"temp/progress/job/{load_key([{'file_name': 'a.csv', 'size': 100}])}"
+    written = {}
+
+    def write_chunk(chunk_df, chunk):
+        if chunk == 2 and not written.get("failed"):
+            written["failed"] = True
+            raise RuntimeError("job timed out")
+        written[chunk] = sorted(row.id for row in chunk_df.collect())
+
+    def on_chunk_done(chunk):
+        mark_chunk_done(s3_client, BUCKET, prefix, chunk)
+
+    with pytest.raises(RuntimeError):
+        write_in_chunks(df, load_progress(s3_client, BUCKET, prefix, 4), write_chunk, on_chunk_done)
+    first_attempt = {chunk for chunk in written if chunk != "failed"}
+    # The retry asks for another chunk count, the plan of the first attempt wins
+    progress = load_progress(s3_client, BUCKET, prefix, 8)
+    written.clear()
+    written["failed"] = True
+    write_in_chunks(df, progress, write_chunk, on_chunk_done)
+
+    assert progress["chunk_count"] == 4
+    assert first_attempt == {0, 1}
+    assert set(written) - {"failed"} == {2, 3}
+
+def test_a_reupload_under_the_same_name_and_size_is_a_new_load():
+    first = {"file_name": "a.csv", "size": 100, "ledger_id": "glue-poc-bucket/data/a.csv#v1#etag1"}
+    retry = dict(first)
+    reupload = dict(first, ledger_id="glue-poc-bucket/data/a.csv#v2#etag2")
+
+    assert load_key([first]) == load_key([retry])
+    assert load_key([first]) != load_key([reupload])
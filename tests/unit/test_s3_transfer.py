@@ -0,0 +1,79 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+from s3_transfer import MB, move_objects
+
+BUCKET = "glue-poc-bucket"
+
+def _s3_client():
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket=BUCKET)
+    return s3_client
+
+# resource in glue_cdk/assets/etl_scripts/s3_transfer.py
+@mock_aws
+def test_move_objects_copies_and_bulk_deletes():
+    s3_client = _s3_client()
+    for i in range(3):
+        s3_client.put_object(Bucket=BUCKET, Key=f"data/file_{i}.csv", Body=b"id,name\n1,John\n")
+
+    moves = [(BUCKET, f"data/file_{i}.csv", BUCKET, f"archive/file_{i}.csv") for i in range(3)]
+    move_objects(s3_client, moves, max_workers=2)
+
+    keys = sorted(obj["Key"] for obj in s3_client.list_objects_v2(Bucket=BUCKET)["Contents"])
+    assert keys == ["archive/file_0.csv", "archive/file_1.csv", "archive/file_2.csv"]
+
+@mock_aws
+def test_move_objects_uses_multipart_copy_above_threshold():
+    s3_client = _s3_client()
+    body = b"x" * (11 * MB)
+    s3_client.put_object(Bucket=BUCKET, Key="data/big.csv", Body=body)
+
+    move_objects(s3_client, [(BUCKET, "data/big.csv", BUCKET, "archive/big.csv")],
+                 part_size=5 * MB, multipart_threshold=5 * MB)
+
+    # The ETag of a multipart object ends with its part count
+    assert s3_client.head_object(Bucket=BUCKET, Key="archive/big.csv")["ETag"].endswith('-3"')
+    assert s3_client.get_object(Bucket=BUCKET, Key="archive/big.csv")["Body"].read() == body
+    assert s3_client.list_objects_v2(Bucket=BUCKET, Prefix="data/")["KeyCount"] == 0
+
+@mock_aws
+def test_multipart_move_keeps_content_type_and_metadata():
+    s3_client = _s3_client()
+    s3_client.put_object(Bucket=BUCKET, Key="data/big.csv", Body=b"x" * (11 * MB),
+                         ContentType="text/csv", Metadata={"source": "upload"})
+
+    move_objects(s3_client, [(BUCKET, "data/big.csv", BUCKET, "archive/big.csv")],
+                 part_size=5 * MB, multipart_threshold=5 * MB)
+
+    head = s3_client.head_object(Bucket=BUCKET, Key="archive/big.csv")
+    assert head["ContentType"] == "text/csv"
+    assert head["Metadata"] == {"source": "upload"}
+
+class _FailingCopyClient:
+    # Raises a non-botocore error for one key, delegates everything else
+    def __init__(self, s3_client, failing_key):
+        self._s3_client = s3_client
+        self._failing_key = failing_key
+
+    def copy_object(self, **kwargs):
+        if kwargs["CopySource"]["Key"] == self._failing_key:
+            raise ConnectionError("connection reset")
+        return self._s3_client.copy_object(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._s3_client, name)
+
+@mock_aws
+def test_move_objects_reports_unexpected_errors_and_moves_the_rest():
+    s3_client = _s3_client()
+    for i in range(3):
+        s3_client.put_object(Bucket=BUCKET, Key=f"data/file_{i}.csv", Body=b"id\n1\n")
+
+    moves = [(BUCKET, f"data/file_{i}.csv", BUCKET, f"archive/file_{i}.csv") for i in range(3)]
+    with pytest.raises(Exception, match="Failed to move 1 of 3 objects"):
+        move_objects(_FailingCopyClient(s3_client, "data/file_1.csv"), moves, max_workers=2)
+
+    keys = sorted(obj["Key"] for obj in s3_client.list_objects_v2(Bucket=BUCKET)["Contents"])
+    assert keys == ["archive/file_0.csv", "archive/file_2.csv", "data/file_1.csv"]
@@ -0,0 +1,91 @@
+import json
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+from moto import mock_aws
+
+from schema_resolver import find_table, resolve_table_schema
+
+DATABASE = "glue_poc_db"
+BUCKET = "glue-poc-bucket"
+CACHE_KEY = f"temp/schema_cache/{DATABASE}/glue_poc_orders.json"
+
+def _table_input(name, columns):
+    return {"Name": name, "StorageDescriptor": {"Columns": [{"Name": n, "Type": t} for n, t in columns]}}
+
+class _RecordingGlueClient:
+    # Records the catalog calls, delegates everything to the moto client
+    def __init__(self, glue_client):
+        self._glue_client = glue_client
+        self.calls = []
+
+    def __getattr__(self, name):
+        self.calls.append(name)
+        return getattr(self._glue_client, name)
+
+def _clients():
+    glue_client = boto3.client("glue", region_name="us-east-1")
+    glue_client.create_database(DatabaseInput={"Name": DATABASE})
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket=BUCKET)
+    return glue_client, s3_client
+
+# resource in glue_cdk/assets/etl_scripts/schema_resolver.py
+def test_find_table_follows_every_page_of_the_prefix_expression():
+    glue_client = boto3.client("glue", region_name="us-east-1")
+    expected = {"DatabaseName": DATABASE, "Expression": "glue_poc_orders.*"}
+    table = {"Name": "glue_poc_orders_2026", "StorageDescriptor": {"Columns": []}}
+    with Stubber(glue_client) as stubber:
+        stubber.add_response("get_tables", {"TableList": [], "NextToken": "page-2"}, expected)
+        stubber.add_response("get_tables", {"TableList": [table]}, dict(expected, NextToken="page-2"))
+
+        assert find_table(glue_client, DATABASE, "glue_poc_orders")["Name"] == "glue_poc_orders_2026"
+        stubber.assert_no_pending_responses()
+
+@mock_aws
+def test_find_table_matches_the_prefix_or_the_exact_name():
+    glue_client, _ = _clients()
+    for name in ("glue_poc_customers", "glue_poc_orders_2026"):
+        glue_client.create_table(DatabaseName=DATABASE, TableInput=_table_input(name, [("id", "bigint")]))
+
+    assert find_table(glue_client, DATABASE, "glue_poc_orders")["Name"] == "glue_poc_orders_2026"
+    assert find_table(glue_client, DATABASE, "glue_poc_customers", exact_name=True)["Name"] == "glue_poc_customers"
+    with pytest.raises(Exception, match="No tables found"):
+        find_table(glue_client, DATABASE, "glue_poc_invoices")
+    with pytest.raises(Exception, match="No table 'glue_poc_orders'"):
+        find_table(glue_client, DATABASE, "glue_poc_orders", exact_name=True)
+
+@mock_aws
+def test_schema_cache_is_trusted_revalidated_and_refreshed():
+    glue_client, s3_client = _clients()
+    table_input = _table_input("glue_poc_orders_2026", [("id", "bigint")])
+    glue_client.create_table(DatabaseName=DATABASE, TableInput=table_input)
+    recording = _RecordingGlueClient(glue_client)
+
+    def resolve(ttl_seconds):
+        recording.calls.clear()
+        return resolve_table_schema(recording, s3_client, DATABASE, "glue_poc_orders", BUCKET, "temp", ttl_seconds)
+
+    first = resolve(3600)
+    assert recording.calls == ["get_paginator"]
+    assert json.loads(s3_client.get_object(Bucket=BUCKET, Key=CACHE_KEY)["Body"].read()) == first
+
+    # Within the TTL the cache is used without calling the catalog
+    table_input["StorageDescriptor"]["Columns"].append({"Name": "name", "Type": "string"})
+    glue_client.update_table(DatabaseName=DATABASE, TableInput=table_input)
+    cached = resolve(3600)
+    assert recording.calls == []
+    assert [column["Name"] for column in cached["columns"]] == ["id"]
+
+    # Past the TTL a changed version is re-fetched
+    refreshed = resolve(0)
+    assert recording.calls == ["get_table", "get_paginator"]
+    assert [column["Name"] for column in refreshed["columns"]] == ["id", "name"]
+    assert refreshed["version"] != first["version"]
+
+    # An unchanged version is revalidated with a single get_table call
+    revalidated = resolve(0)
+    assert recording.calls == ["get_table"]
+    assert revalidated["version"] == refreshed["version"]
+    assert revalidated["validated_at"] >= refreshed["validated_at"]
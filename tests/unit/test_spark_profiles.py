@@ -0,0 +1,41 @@
+import pytest
+
+from spark_profiles import GB, MB, MAX_SHUFFLE_PARTITIONS, MIN_SHUFFLE_PARTITIONS, estimate_input_bytes, parse_conf_overrides, select_spark_profile
+
+BASE_CONF = {"spark.sql.files.maxPartitionBytes": str(128 * MB)}
+
+# resource in glue_cdk/assets/etl_scripts/spark_profiles.py
+def test_auto_profile_follows_input_size():
+    small_name, small_conf = select_spark_profile("auto", 10 * MB, 50000, base_conf=BASE_CONF)
+    large_name, large_conf = select_spark_profile("auto", 100 * GB, 500000000, base_conf=BASE_CONF)
+
+    assert small_name == "small"
+    assert small_conf["spark.sql.shuffle.partitions"] == str(MIN_SHUFFLE_PARTITIONS)
+    assert small_conf["spark.sql.adaptive.enabled"] == "true"
+    assert small_conf["spark.serializer"] == "org.apache.spark.serializer.KryoSerializer"
+    assert small_conf["spark.sql.files.maxPartitionBytes"] == str(128 * MB)
+    assert large_name == "large"
+    assert large_conf["spark.sql.shuffle.partitions"] == "400"
+    assert select_spark_profile("auto", 100000 * GB, 10 ** 12)[1]["spark.sql.shuffle.partitions"] == str(MAX_SHUFFLE_PARTITIONS)
+
+def test_off_profile_keeps_base_conf_and_overrides_win():
+    assert select_spark_profile("off", 100 * GB, 10 ** 9, base_conf=BASE_CONF) == ("off", BASE_CONF)
+
+    overrides = parse_conf_overrides('{"spark.sql.shuffle.partitions": 64, "spark.sql.adaptive.enabled": "false"}')
+    _, conf = select_spark_profile("medium", 4 * GB, 2 * 10 ** 7, overrides=overrides)
+
+    assert conf["spark.sql.shuffle.partitions"] == "64"
+    assert conf["spark.sql.adaptive.enabled"] == "false"
+    with pytest.raises(ValueError):
+        select_spark_profile("huge", GB, 10 ** 6)
+    with pytest.raises(ValueError):
+        parse_conf_overrides('["spark.sql.shuffle.partitions"]')
+
+def test_estimate_input_bytes_scales_compressed_files():
+    input_files = [
+        {"file_name": "a.csv", "size": 100},
+        {"file_name": "b.csv.gz", "size": 100},
+        {"file_name": "c.csv.gz", "size": 100, "parts": [{"key": "p0", "bytes": 300}, {"key": "p1", "bytes": 200}]},
+    ]
+
+    assert estimate_input_bytes(input_files) == 100 + 400 + 500
@@ -0,0 +1,50 @@
+import pytest
+
+pytest.importorskip("pyspark")
+
+from pyspark.sql import SparkSession
+
+from readers import catalog_struct_type
+from streaming import projected_batch_writer, read_csv_stream, start_stream
+
+# resource in glue_cdk/assets/etl_scripts/streaming.py
+def test_stream_projects_and_writes_every_file_once(tmp_path):
+    source = tmp_path / "stream"
+    source.mkdir()
+    (source / "a.csv").write_text("id,name,amount\n1,John,2.5\n2,,\n")
+    (source / "b.csv").write_text("id,name,amount\n3,Jane,1\n")
+    catalog_schema = {"id": "bigint", "name": "string", "amount": "double"}
+    written = []
+
+    spark = SparkSession.builder.master("local[1]").getOrCreate()
+    df = read_csv_stream(spark, str(source), catalog_struct_type(catalog_schema, list(catalog_schema)), 1)
+    process_batch = projected_batch_writer(catalog_schema, lambda batch_df, batch_id: written.extend(batch_df.collect()))
+    checkpoint = str(tmp_path / "checkpoint")
+
+    # Trigger once reads every available file, a restart from the checkpoint reads none again
+    for _ in range(2):
+        start_stream(df, process_batch, checkpoint, 1, once=True).awaitTermination()
+
+    assert sorted((row.id, row.name, row.amount) for row in written) == [(1, "John", 2.5), (2, "", 0.0), (3, "Jane", 1.0)]
+
+def test_stream_quarantines_rejected_rows_like_the_batch_job(tmp_path):
+    source = tmp_path / "stream"
+    source.mkdir()
+    (source / "a.csv").write_text("id,name,qty\n1,John,2\n,Jane,1\n3,Bob,x\n4,Ann,99999999999\n")
+    catalog_schema = {"id": "bigint", "name": "string", "qty": "int"}
+    written, rejected = [], []
+
+    spark = SparkSession.builder.master("local[1]").getOrCreate()
+    schema = catalog_struct_type(catalog_schema, list(catalog_schema), "_corrupt_record")
+    df = read_csv_stream(spark, str(source), schema, 10, corrupt_record_column="_corrupt_record")
+    process_batch = projected_batch_writer(
+        catalog_schema,
+        lambda batch_df, batch_id: written.extend(batch_df.collect()),
+        validate=True,
+        max_error_rate=1.0,
+        write_rejects=lambda batch_df, batch_id: rejected.extend(batch_df.collect())
+    )
+    start_stream(df, process_batch, str(tmp_path / "checkpoint"), 1, once=True).awaitTermination()
+
+    assert [(row.id, row.name, row.qty) for row in written] == [(1, "John", 2)]
+    assert sorted(row._reject_reason for row in rejected) == ["malformed_record", "malformed_record", "missing_id"]
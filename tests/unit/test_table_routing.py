@@ -0,0 +1,85 @@
+import json
+
+import boto3
+from moto import mock_aws
+
+from table_routing import RouteIndex, default_table_route, load_routes, scheduler_allocation_xml
+
+BUCKET = "glue-poc-bucket"
+
+def _route(name, pattern):
+    return {
+        "name": name,
+        "pattern": pattern,
+        "catalog_table": f"glue_poc_{name}",
+        "exact_name": True,
+        "dynamodb_table_name": name,
+        "pool": name,
+    }
+
+# resource in glue_cdk/assets/etl_scripts/table_routing.py
+def test_route_index_prefers_exact_names_then_first_pattern():
+    index = RouteIndex([
+        _route("orders", "orders_*.csv"),
+        _route("all_csv", "*.csv"),
+        _route("legacy", "orders_legacy.csv"),
+    ])
+
+    assert index.lookup("orders_legacy.csv")["name"] == "legacy"
+    assert index.lookup("orders_2024.csv")["name"] == "orders"
+    assert index.lookup("customers.csv")["name"] == "all_csv"
+    assert index.lookup("customers.json") is None
+
+def test_route_index_groups_files_in_order_with_default_route():
+    index = RouteIndex([_route("orders", "orders_*.csv")])
+    default_route = default_table_route("glue_poc", "glue-poc-table")
+    files = [
+        {"file_name": "customers.csv", "size": 1},
+        {"file_name": "orders_1.csv", "size": 2},
+        {"file_name": "orders_2.csv", "size": 3},
+    ]
+
+    groups = index.group(files, default_route)
+
+    assert [(route["name"], [f["file_name"] for f in group]) for route, group in groups] == [
+        ("default", ["customers.csv"]),
+        ("orders", ["orders_1.csv", "orders_2.csv"]),
+    ]
+    assert groups[0][0]["dynamodb_table_name"] == "glue-poc-table"
+    assert groups[0][0]["exact_name"] is False
+
+@mock_aws
+def test_load_routes_reads_config_and_tolerates_missing_document():
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket=BUCKET)
+
+    assert load_routes(s3_client, f"{BUCKET}/scripts/table_routes.json") == []
+
+    s3_client.put_object(
+        Bucket=BUCKET,
+        Key="scripts/table_routes.json",
+        Body=json.dumps({"routes": [
+            {"pattern": "orders_*.csv", "catalog_table": "glue_poc_orders", "dynamodb_table_name": "orders"}
+        ]}).encode("utf-8"),
+    )
+    routes = load_routes(s3_client, f"{BUCKET}/scripts/table_routes.json")
+
+    assert routes == [{
+        "name": "glue_poc_orders",
+        "pattern": "orders_*.csv",
+        "catalog_table": "glue_poc_orders",
+        "exact_name": True,
+        "dynamodb_table_name": "orders",
+        "pool": "glue_poc_orders",
+        "weight": 1,
+        "min_share": 0,
+    }]
+
+def test_scheduler_allocation_has_one_pool_per_route_pool():
+    orders = dict(_route("orders", "orders_*.csv"), weight=3, min_share=2)
+    returns = dict(_route("returns", "returns_*.csv"), pool="orders", weight=1, min_share=0)
+
+    xml = scheduler_allocation_xml([orders, returns], default_table_route("glue_poc", "glue-poc-table"))
+
+    assert xml.count("<pool ") == 2
+    assert '<pool name="orders">\n    <schedulingMode>FIFO</schedulingMode>\n    <weight>3</weight>\n    <minShare>2</minShare>' in xml
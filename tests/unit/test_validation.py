@@ -0,0 +1,39 @@
+import pytest
+
+pytest.importorskip("pyspark")
+
+from pyspark.sql import SparkSession
+
+from projection import apply_projection
+from validation import split_rejects, validation_counts
+
+CATALOG_SCHEMA = {"id": "bigint", "qty": "int", "name": "string"}
+
+def _validated(rows):
+    spark = SparkSession.builder.master("local[1]").getOrCreate()
+    df = spark.createDataFrame(rows, ["id", "qty", "name"])
+    return apply_projection(df, CATALOG_SCHEMA, validate=True)
+
+# resource in glue_cdk/assets/etl_scripts/validation.py
+def test_validating_projection_rejects_bad_rows_with_a_reason():
+    validated = _validated([("1", "3", "a"), ("", "4", "b"), ("3", "x", "c"), ("4", "99999999999", "")])
+
+    accepted, rejected = split_rejects(validated)
+
+    assert [row.id for row in accepted.collect()] == [1]
+    assert "_reject_reason" not in accepted.columns
+    assert sorted(row._reject_reason for row in rejected.collect()) == ["invalid_qty", "invalid_qty", "missing_id"]
+    assert validation_counts(validated) == (4, 3)
+
+def test_typed_columns_of_the_catalog_read_are_validated(tmp_path):
+    spark = SparkSession.builder.master("local[1]").getOrCreate()
+    path = tmp_path / "orders.csv"
+    path.write_text("id,qty,name\n1,3,a\n2,x,b\n3,2147483648,c\n")
+    schema = "id bigint, qty bigint, name string, _corrupt_record string"
+    df = (spark.read.option("header", "true").option("mode", "PERMISSIVE")
+          .option("columnNameOfCorruptRecord", "_corrupt_record").schema(schema).csv(str(path)))
+
+    accepted, rejected = split_rejects(apply_projection(df, CATALOG_SCHEMA, validate=True).persist())
+
+    assert [row.id for row in accepted.collect()] == [1]
+    assert sorted(row._reject_reason for row in rejected.collect()) == ["invalid_qty", "malformed_record"]
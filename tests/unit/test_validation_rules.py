@@ -0,0 +1,23 @@
+import csv
+import io
+
+import pytest
+
+from validation_rules import ErrorRateExceeded, check_error_rate, reject_reason
+
+CATALOG_SCHEMA = {"id": "bigint", "qty": "int", "name": "string"}
+
+# resource in glue_cdk/assets/etl_scripts/validation_rules.py
+def test_reject_reason_matches_the_spark_rules():
+    rows = list(csv.DictReader(io.StringIO("id,qty,name\n1,3,a\n,4,b\n3,x,c\n4,99999999999,\n5,1\n6,1,f,extra\n")))
+    header = ["id", "qty", "name"]
+
+    reasons = [reject_reason(row, CATALOG_SCHEMA, header) for row in rows]
+
+    assert reasons == [None, "missing_id", "invalid_qty", "invalid_qty", "malformed_record", "malformed_record"]
+    assert reject_reason({"qty": "1"}, CATALOG_SCHEMA, ["qty"]) == "missing_id"
+
+def test_check_error_rate_fails_above_the_threshold():
+    assert check_error_rate(1000, 10, 0.01) == 0.01
+    with pytest.raises(ErrorRateExceeded):
+        check_error_rate(1000, 11, 0.01)
@@ -0,0 +1,277 @@
+"""
+Offline analyzer of the Spark event logs the ETL job writes under
+temp/spark-event-logs/ (JobStack --spark-event-logs-path).
+
+Reports every stage with its duration, task time skew (max / median task
+run time), spill, GC time and shuffle sizes, and the process_file step
+(read, key_distribution, dynamodb_write, archive, ...) and table it ran
+for, from the job descriptions script.py sets. The schema projection has
+no stage of its own: it runs in the stages of the read step, the ones with
+input bytes.
+
+Needs only the standard library, the logs are downloaded first:
+
+Usage:
+    aws s3 sync s3://<bucket>/temp/spark-event-logs/<job name>/ ./event-logs/
+    python tools/analyze_spark_events.py ./event-logs --top 20 --output report.json
+"""
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+
+# Prefix of the job descriptions set by script.describe_step
+STEP_PREFIX = "process_file:"
+UNLABELLED_STEP = "unlabelled"
+
+# A stage is flagged when its slowest task runs this many times the median
+SKEW_THRESHOLD = 3.0
+
+# A stage is flagged when GC takes this share of its task time
+GC_SHARE_THRESHOLD = 0.1
+
+def event_files(paths):
+    """
+    Returns the event log files under the given files and directories,
+    including the rolled logs Glue writes in eventlog_v2_* directories.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, _, names in os.walk(path):
+                files.extend(os.path.join(folder, name) for name in sorted(names) if not name.startswith("."))
+        else:
+            files.append(path)
+    return sorted(files)
+
+def read_events(path):
+    """
+    Yields the events of a (gzip) JSON lines event log, skipping lines that
+    do not parse, such as the last line of a log still being written.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as log:
+        for line in log:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+def parse_step(description):
+    """
+    Returns the (step, table) of a job description set by
+    script.describe_step, (UNLABELLED_STEP, None) for other jobs.
+    """
+    if not description or not description.startswith(STEP_PREFIX):
+        return UNLABELLED_STEP, None
+    step, _, table = description[len(STEP_PREFIX):].partition(":")
+    return step, table or None
+
+def _new_stage(stage_id, attempt):
+    return {
+        "stage_id": stage_id,
+        "attempt": attempt,
+        "name": None,
+        "description": None,
+        "submitted": None,
+        "completed": None,
+        "failure": None,
+        "task_ms": [],
+        "failed_tasks": 0,
+        "gc_ms": 0,
+        "memory_spill_bytes": 0,
+        "disk_spill_bytes": 0,
+        "shuffle_read_bytes": 0,
+        "shuffle_write_bytes": 0,
+        "input_bytes": 0,
+        "output_bytes": 0,
+    }
+
+def collect_stages(events):
+    """
+    Folds the listener events of one or more applications into per stage
+    attempt task statistics.
+
+    Returns:
+    - A list of stage dicts, in the order the stages were submitted.
+    """
+    stages = {}
+    job_descriptions = {}
+    application = 0
+
+    def stage_for(stage_id, attempt):
+        key = (application, stage_id, attempt)
+        if key not in stages:
+            stages[key] = _new_stage(stage_id, attempt)
+        return stages[key]
+
+    for event in events:
+        kind = event.get("Event")
+        if kind == "SparkListenerApplicationStart":
+            # Stage ids restart with every application
+            application += 1
+            job_descriptions = {}
+        elif kind == "SparkListenerJobStart":
+            description = (event.get("Properties") or {}).get("spark.job.description")
+            for stage_id in event.get("Stage IDs", []):
+                job_descriptions.setdefault(stage_id, description)
+        elif kind in ("SparkListenerStageSubmitted", "SparkListenerStageCompleted"):
+            info = event["Stage Info"]
+            stage = stage_for(info["Stage ID"], info.get("Stage Attempt ID", 0))
+            stage["name"] = info.get("Stage Name") or stage["name"]
+            stage["submitted"] = info.get("Submission Time") or stage["submitted"]
+            stage["completed"] = info.get("Completion Time") or stage["completed"]
+            stage["failure"] = info.get("Failure Reason") or stage["failure"]
+            description = (event.get("Properties") or {}).get("spark.job.description")
+            stage["description"] = description or stage["description"] or job_descriptions.get(info["Stage ID"])
+        elif kind == "SparkListenerTaskEnd":
+            stage = stage_for(event["Stage ID"], event.get("Stage Attempt ID", 0))
+            task_info = event.get("Task Info", {})
+            metrics = event.get("Task Metrics") or {}
+            if task_info.get("Failed") or task_info.get("Killed"):
+                stage["failed_tasks"] += 1
+            run_ms = metrics.get("Executor Run Time")
+            if run_ms is None:
+                run_ms = task_info.get("Finish Time", 0) - task_info.get("Launch Time", 0)
+            stage["task_ms"].append(run_ms)
+            stage["gc_ms"] += metrics.get("JVM GC Time", 0)
+            stage["memory_spill_bytes"] += metrics.get("Memory Bytes Spilled", 0)
+            stage["disk_spill_bytes"] += metrics.get("Disk Bytes Spilled", 0)
+            shuffle_read = metrics.get("Shuffle Read Metrics", {})
+            stage["shuffle_read_bytes"] += shuffle_read.get("Remote Bytes Read", 0) + shuffle_read.get("Local Bytes Read", 0)
+            stage["shuffle_write_bytes"] += metrics.get("Shuffle Write Metrics", {}).get("Shuffle Bytes Written", 0)
+            stage["input_bytes"] += metrics.get("Input Metrics", {}).get("Bytes Read", 0)
+            stage["output_bytes"] += metrics.get("Output Metrics", {}).get("Bytes Written", 0)
+
+    return sorted(stages.values(), key=lambda stage: (stage["submitted"] or 0, stage["stage_id"]))
+
+def summarize_stage(stage):
+    """
+    Returns the report row of a stage: duration, task time skew, spill, GC
+    and shuffle sizes, with its process_file step and flags for skew, spill
+    and GC pressure.
+    """
+    step, table = parse_step(stage["description"])
+    task_ms = stage["task_ms"]
+    median_ms = statistics.median(task_ms) if task_ms else 0
+    max_ms = max(task_ms) if task_ms else 0
+    total_ms = sum(task_ms)
+    skew = round(max_ms / median_ms, 2) if median_ms else None
+    duration_ms = stage["completed"] - stage["submitted"] if stage["submitted"] and stage["completed"] else None
+    flags = []
+    if skew is not None and skew >= SKEW_THRESHOLD and len(task_ms) > 1:
+        flags.append("skew")
+    if stage["disk_spill_bytes"]:
+        flags.append("spill")
+    if total_ms and stage["gc_ms"] / total_ms >= GC_SHARE_THRESHOLD:
+        flags.append("gc")
+    if stage["failure"] or stage["failed_tasks"]:
+        flags.append("failed")
+    return {
+        "stage_id": stage["stage_id"],
+        "attempt": stage["attempt"],
+        "step": step,
+        "table": table,
+        "name": stage["name"],
+        "duration_ms": duration_ms,
+        "tasks": len(task_ms),
+        "failed_tasks": stage["failed_tasks"],
+        "task_ms_total": total_ms,
+        "task_ms_median": median_ms,
+        "task_ms_max": max_ms,
+        "skew": skew,
+        "gc_ms": stage["gc_ms"],
+        "memory_spill_bytes": stage["memory_spill_bytes"],
+        "disk_spill_bytes": stage["disk_spill_bytes"],
+        "shuffle_read_bytes": stage["shuffle_read_bytes"],
+        "shuffle_write_bytes": stage["shuffle_write_bytes"],
+        "input_bytes": stage["input_bytes"],
+        "output_bytes": stage["output_bytes"],
+        "flags": flags,
+    }
+
+def summarize_steps(stage_rows):
+    """
+    Totals the stage rows per (step, table), in the order the steps ran.
+    """
+    steps = {}
+    for row in stage_rows:
+        key = (row["step"], row["table"])
+        if key not in steps:
+            steps[key] = {
+                "step": row["step"], "table": row["table"], "stages": 0, "duration_ms": 0, "task_ms_total": 0,
+                "gc_ms": 0, "disk_spill_bytes": 0, "shuffle_read_bytes": 0, "shuffle_write_bytes": 0,
+                "input_bytes": 0, "max_skew": None,
+            }
+        total = steps[key]
+        total["stages"] += 1
+        total["duration_ms"] += row["duration_ms"] or 0
+        for field in ("task_ms_total", "gc_ms", "disk_spill_bytes", "shuffle_read_bytes", "shuffle_write_bytes", "input_bytes"):
+            total[field] += row[field]
+        if row["skew"] is not None:
+            total["max_skew"] = max(total["max_skew"] or 0, row["skew"])
+    return list(steps.values())
+
+def analyze(paths):
+    """
+    Analyzes the event logs under paths.
+
+    Returns:
+    - A dict with the stage rows and the per step totals.
+    """
+    def events():
+        for path in event_files(paths):
+            yield from read_events(path)
+
+    stage_rows = [summarize_stage(stage) for stage in collect_stages(events())]
+    return {"stages": stage_rows, "steps": summarize_steps(stage_rows)}
+
+def _mb(value):
+    return f"{value / (1024 * 1024):.1f}"
+
+def format_report(report, top):
+    lines = ["Steps (time in seconds, sizes in MB):"]
+    lines.append(f"{'step':<18} {'table':<28} {'stages':>6} {'time':>8} {'task':>9} {'gc':>7} {'spill':>8} {'shuf rd':>9} {'shuf wr':>9} {'skew':>6}")
+    for step in report["steps"]:
+        lines.append(
+            f"{step['step']:<18} {str(step['table'] or '-'):<28} {step['stages']:>6} {step['duration_ms'] / 1000:>8.1f} "
+            f"{step['task_ms_total'] / 1000:>9.1f} {step['gc_ms'] / 1000:>7.1f} {_mb(step['disk_spill_bytes']):>8} "
+            f"{_mb(step['shuffle_read_bytes']):>9} {_mb(step['shuffle_write_bytes']):>9} {str(step['max_skew'] or '-'):>6}"
+        )
+    slowest = sorted(report["stages"], key=lambda row: row["duration_ms"] or 0, reverse=True)[:top]
+    lines.append("")
+    lines.append(f"Slowest {len(slowest)} stages:")
+    lines.append(f"{'stage':>7} {'step':<18} {'tasks':>6} {'time':>8} {'median':>8} {'max':>8} {'skew':>6} {'gc':>7} {'spill':>8} {'shuf rd':>9} {'shuf wr':>9}  flags / name")
+    for row in slowest:
+        lines.append(
+            f"{row['stage_id']:>5}.{row['attempt']:<1} {row['step']:<18} {row['tasks']:>6} {(row['duration_ms'] or 0) / 1000:>8.1f} "
+            f"{row['task_ms_median'] / 1000:>8.1f} {row['task_ms_max'] / 1000:>8.1f} {str(row['skew'] or '-'):>6} "
+            f"{row['gc_ms'] / 1000:>7.1f} {_mb(row['disk_spill_bytes']):>8} {_mb(row['shuffle_read_bytes']):>9} "
+            f"{_mb(row['shuffle_write_bytes']):>9}  {','.join(row['flags']) or '-'} {row['name'] or ''}"
+        )
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Event log files or directories")
+    parser.add_argument("--top", type=int, default=20, help="Slowest stages to list")
+    parser.add_argument("--output", help="Write the full report as JSON to this file")
+    options = parser.parse_args(argv)
+
+    report = analyze(options.paths)
+    if not report["stages"]:
+        print(f"No Spark stages found in {options.paths}", file=sys.stderr)
+        return 1
+    print(format_report(report, options.top))
+    if options.output:
+        with open(options.output, "w") as output:
+            json.dump(report, output, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())